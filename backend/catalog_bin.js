@@ -0,0 +1,127 @@
+const fsp = require("node:fs/promises");
+
+// reader for data/runtime/countries.v1.bin written by scripts/catalog_binary.py
+const MAGIC = "WTTCAT01";
+const VERSION = 1;
+const HEADER_SIZE = 112;
+const NONE = 0xffffffff;
+const COUNTRY_STRING_FIELDS = [
+  "country_code",
+  "country_name_ko",
+  "country_name_en",
+  "region",
+  "tourism_demand_tier",
+  "place_count_bucket",
+  "data_quality_flag",
+];
+const COUNTRY_FIELDS = COUNTRY_STRING_FIELDS.length + 6;
+const PLACE_STRING_FIELDS = ["place_id", "name_en", "country_code", "city", "source"];
+const PLACE_FIELDS = PLACE_STRING_FIELDS.length + 2;
+
+function typedView(buf, Type, offset, length) {
+  const byteOffset = buf.byteOffset + offset;
+  if (byteOffset % Type.BYTES_PER_ELEMENT === 0) {
+    return new Type(buf.buffer, byteOffset, length);
+  }
+  return new Type(buf.buffer.slice(byteOffset, byteOffset + length * Type.BYTES_PER_ELEMENT));
+}
+
+function vectorValues(view, start, dim) {
+  // float32 keeps ~7 significant digits; round back to the decimal values the JSON carried
+  const out = new Array(dim);
+  for (let i = 0; i < dim; i += 1) out[i] = Number(view[start + i].toPrecision(7));
+  return out;
+}
+
+function parseHeader(buf) {
+  if (buf.length < HEADER_SIZE || buf.toString("latin1", 0, 8) !== MAGIC) return null;
+  const u32 = (idx) => buf.readUInt32LE(8 + idx * 4);
+  if (u32(0) !== VERSION) return null;
+  const offsets = [];
+  for (let i = 0; i < 7; i += 1) offsets.push(Number(buf.readBigUInt64LE(56 + i * 8)));
+  return {
+    dim: u32(1),
+    nCountries: u32(2),
+    nPlaces: u32(3),
+    nStrings: u32(4),
+    nCityRefs: u32(5),
+    metaSid: u32(6),
+    sourceSize: buf.readBigInt64LE(40),
+    sourceMtimeNs: buf.readBigInt64LE(48),
+    offsets,
+  };
+}
+
+function decodeCatalog(buf, header) {
+  const { dim, nCountries, nPlaces, nStrings, nCityRefs, offsets } = header;
+  const [placeVecOff, countryVecOff, countryOff, cityOff, placeOff, strOff, dataOff] = offsets;
+  const placeVectors = typedView(buf, Float32Array, placeVecOff, nPlaces * dim);
+  const countryVectors = typedView(buf, Float32Array, countryVecOff, nCountries * dim);
+  const countryTable = typedView(buf, Uint32Array, countryOff, nCountries * COUNTRY_FIELDS);
+  const cityIndex = typedView(buf, Uint32Array, cityOff, nCityRefs);
+  const placeTable = typedView(buf, Uint32Array, placeOff, nPlaces * PLACE_FIELDS);
+  const stringOffsets = typedView(buf, Uint32Array, strOff, nStrings + 1);
+
+  const strings = new Array(nStrings);
+  const string = (sid) => {
+    if (sid === NONE) return undefined;
+    if (strings[sid] === undefined) {
+      strings[sid] = buf.toString("utf8", dataOff + stringOffsets[sid], dataOff + stringOffsets[sid + 1]);
+    }
+    return strings[sid];
+  };
+
+  const places = new Array(nPlaces);
+  for (let i = 0; i < nPlaces; i += 1) {
+    const base = i * PLACE_FIELDS;
+    const place = {};
+    PLACE_STRING_FIELDS.forEach((field, idx) => {
+      const sid = placeTable[base + idx];
+      if (sid !== NONE) place[field] = string(sid);
+    });
+    place.tags_vector = vectorValues(placeVectors, i * dim, dim);
+    const extras = placeTable[base + PLACE_STRING_FIELDS.length + 1];
+    if (extras !== NONE) Object.assign(place, JSON.parse(string(extras)));
+    places[i] = place;
+  }
+
+  const countries = new Array(nCountries);
+  for (let i = 0; i < nCountries; i += 1) {
+    const base = i * COUNTRY_FIELDS;
+    const country = {};
+    COUNTRY_STRING_FIELDS.forEach((field, idx) => {
+      const sid = countryTable[base + idx];
+      if (sid !== NONE) country[field] = string(sid);
+    });
+    const n = base + COUNTRY_STRING_FIELDS.length;
+    const [seedPlaceCount, placeStart, placeCount, cityStart, cityCount, extras] = countryTable.subarray(n, n + 6);
+    country.seed_place_count = seedPlaceCount;
+    country.tags_vector = vectorValues(countryVectors, i * dim, dim);
+    country.top_seed_cities = Array.from(cityIndex.subarray(cityStart, cityStart + cityCount), string);
+    if (extras !== NONE) Object.assign(country, JSON.parse(string(extras)));
+    country.places = places.slice(placeStart, placeStart + placeCount);
+    countries[i] = country;
+  }
+
+  return { meta: JSON.parse(string(header.metaSid)), countries };
+}
+
+// returns { meta, countries } shaped like countries.v1.json, or null when the binary is
+// missing, unreadable or was built from a different version of the source file
+async function loadCatalogBinary(binFile, sourceFile) {
+  let buf;
+  let source;
+  try {
+    [buf, source] = await Promise.all([fsp.readFile(binFile), fsp.stat(sourceFile, { bigint: true })]);
+  } catch {
+    return null;
+  }
+  const header = parseHeader(buf);
+  if (!header) return null;
+  if (header.sourceSize !== source.size || header.sourceMtimeNs !== source.mtimeNs) return null;
+  return decodeCatalog(buf, header);
+}
+
+module.exports = {
+  loadCatalogBinary,
+};
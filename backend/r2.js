@@ -1,6 +1,13 @@
 const fs = require("node:fs/promises");
 const path = require("node:path");
-const { S3Client, PutObjectCommand, ListObjectsV2Command, GetObjectCommand, HeadObjectCommand } = require("@aws-sdk/client-s3");
+const {
+  S3Client,
+  PutObjectCommand,
+  CopyObjectCommand,
+  ListObjectsV2Command,
+  GetObjectCommand,
+  HeadObjectCommand,
+} = require("@aws-sdk/client-s3");
 const { getSignedUrl } = require("@aws-sdk/s3-request-presigner");
 
 function normalizeKey(key) {
@@ -82,6 +89,47 @@ async function putBuffer(r2, key, body, contentType = "application/octet-stream"
   };
 }
 
+async function putStream(r2, key, stream, contentLength, contentType = "application/octet-stream", metadata = {}) {
+  ensureR2(r2);
+  const normalized = normalizeKey(key);
+  await r2.client.send(
+    new PutObjectCommand({
+      Bucket: r2.config.bucket,
+      Key: normalized,
+      Body: stream,
+      ContentLength: contentLength,
+      ContentType: contentType,
+      Metadata: metadata,
+    })
+  );
+  return {
+    key: normalized,
+    bucket: r2.config.bucket,
+    url: objectUrl(r2, normalized),
+  };
+}
+
+async function copyObject(r2, sourceKey, key) {
+  ensureR2(r2);
+  const source = normalizeKey(sourceKey);
+  const normalized = normalizeKey(key);
+  // server-side copy: the bytes never leave the bucket
+  const response = await r2.client.send(
+    new CopyObjectCommand({
+      Bucket: r2.config.bucket,
+      Key: normalized,
+      CopySource: `${r2.config.bucket}/${source.split("/").map(encodeURIComponent).join("/")}`,
+    })
+  );
+  return {
+    key: normalized,
+    source_key: source,
+    bucket: r2.config.bucket,
+    etag: response.CopyObjectResult?.ETag,
+    url: objectUrl(r2, normalized),
+  };
+}
+
 async function putJson(r2, key, value) {
   const payload = Buffer.from(JSON.stringify(value, null, 2), "utf8");
   return putBuffer(r2, key, payload, "application/json");
@@ -95,13 +143,14 @@ async function uploadLocalFile(r2, localFilePath, key, contentType = "applicatio
   });
 }
 
-async function listObjects(r2, prefix = "", maxKeys = 100) {
+async function listObjects(r2, prefix = "", maxKeys = 100, startAfter = "") {
   ensureR2(r2);
   const response = await r2.client.send(
     new ListObjectsV2Command({
       Bucket: r2.config.bucket,
       Prefix: normalizeKey(prefix),
       MaxKeys: Math.max(1, Math.min(Number(maxKeys) || 100, 1000)),
+      StartAfter: startAfter ? normalizeKey(startAfter) : undefined,
     })
   );
   return (response.Contents || []).map((item) => ({
@@ -191,6 +240,8 @@ function buildR2State() {
 module.exports = {
   buildR2State,
   putBuffer,
+  putStream,
+  copyObject,
   putJson,
   uploadLocalFile,
   listObjects,
@@ -7,6 +7,8 @@ require("dotenv").config({ quiet: true });
 const {
   buildR2State,
   putBuffer,
+  putStream,
+  copyObject,
   putJson,
   listObjects,
   getObjectText,
@@ -15,6 +17,7 @@ const {
   syncSeedData,
   objectUrl,
 } = require("./r2");
+const { loadCatalogBinary } = require("./catalog_bin");
 
 const ROOT_DIR = path.resolve(__dirname, "..");
 const DATA_DIR = path.join(ROOT_DIR, "data");
@@ -23,7 +26,10 @@ const COUNTRIES_FILE = path.join(DATA_DIR, "countries.v1.json");
 const RUNTIME_DIR = path.join(DATA_DIR, "runtime");
 const SESSIONS_DIR = path.join(RUNTIME_DIR, "sessions");
 const EVENTS_FILE = path.join(RUNTIME_DIR, "events.jsonl");
+const COUNTRIES_BIN_FILE = path.join(RUNTIME_DIR, "countries.v1.bin");
+const USE_CATALOG_BINARY = process.env.CATALOG_BINARY !== "0";
 const PORT = Number(process.env.PORT || 8787);
+const MAX_RAW_UPLOAD_BYTES = 25 * 1024 * 1024;
 
 const MIME_TYPES = {
   ".html": "text/html; charset=utf-8",
@@ -127,12 +133,12 @@ function createError(message, status = 400) {
 }
 
 async function loadData() {
-  const [taxonomyRaw, countriesRaw] = await Promise.all([
+  const [taxonomyRaw, countriesBin] = await Promise.all([
     fsp.readFile(TAXONOMY_FILE, "utf8"),
-    fsp.readFile(COUNTRIES_FILE, "utf8"),
+    USE_CATALOG_BINARY ? loadCatalogBinary(COUNTRIES_BIN_FILE, COUNTRIES_FILE) : null,
   ]);
   state.taxonomy = JSON.parse(taxonomyRaw);
-  const countriesObj = JSON.parse(countriesRaw);
+  const countriesObj = countriesBin ?? JSON.parse(await fsp.readFile(COUNTRIES_FILE, "utf8"));
   state.countries = countriesObj.countries ?? [];
   state.tags = state.taxonomy.tags ?? [];
   state.tagIndexMap = Object.fromEntries(state.tags.map((tag, idx) => [tag.id, idx]));
@@ -546,7 +552,8 @@ async function handleR2Api(req, res, url) {
   if (req.method === "GET" && pathname === "/api/r2/list") {
     const prefix = searchParams.get("prefix") || "";
     const limit = Number(searchParams.get("limit") || "100");
-    const objects = await listObjects(state.r2, prefix, limit);
+    const startAfter = searchParams.get("start_after") || "";
+    const objects = await listObjects(state.r2, prefix, limit, startAfter);
     return sendJson(res, 200, { objects });
   }
 
@@ -580,6 +587,47 @@ async function handleR2Api(req, res, url) {
     });
   }
 
+  if (req.method === "POST" && pathname === "/api/r2/upload-raw") {
+    const key = sanitizeObjectKey(searchParams.get("key") || req.headers["x-object-key"]);
+    const contentLength = Number(req.headers["content-length"]);
+    if (!Number.isFinite(contentLength) || contentLength <= 0) {
+      throw createError("content-length is required", 411);
+    }
+    if (contentLength > MAX_RAW_UPLOAD_BYTES) throw createError("body too large", 413);
+    const contentType = String(
+      searchParams.get("content_type") || req.headers["content-type"] || "application/octet-stream"
+    );
+    const uploaded = await putStream(state.r2, key, req, contentLength, contentType, {
+      source: "api_upload_raw",
+    });
+    await appendEvent("r2_upload_raw", { key, bytes: contentLength });
+    return sendJson(res, 201, {
+      message: "object uploaded",
+      bytes: contentLength,
+      ...uploaded,
+    });
+  }
+
+  if (req.method === "POST" && pathname === "/api/r2/copy") {
+    const body = await readJsonBody(req, 64 * 1024);
+    const sourceKey = sanitizeObjectKey(body.source_key);
+    const key = sanitizeObjectKey(body.key);
+    let copied;
+    try {
+      copied = await copyObject(state.r2, sourceKey, key);
+    } catch (err) {
+      if (err?.$metadata?.httpStatusCode === 404 || err?.name === "NoSuchKey") {
+        throw createError("source object not found", 404);
+      }
+      throw err;
+    }
+    await appendEvent("r2_copy", { key, source_key: sourceKey });
+    return sendJson(res, 201, {
+      message: "object copied",
+      ...copied,
+    });
+  }
+
   if (req.method === "POST" && pathname === "/api/r2/upload-image-url") {
     const body = await readJsonBody(req, 2 * 1024 * 1024);
     const key = sanitizeObjectKey(body.key);
@@ -620,6 +668,20 @@ async function handleR2Api(req, res, url) {
     });
   }
 
+  if (req.method === "GET" && pathname === "/api/r2/head") {
+    const key = sanitizeObjectKey(searchParams.get("key"));
+    let info;
+    try {
+      info = await headObject(state.r2, key);
+    } catch (err) {
+      if (err?.$metadata?.httpStatusCode === 404 || err?.name === "NotFound") {
+        throw createError("object not found", 404);
+      }
+      throw err;
+    }
+    return sendJson(res, 200, { key, info });
+  }
+
   if (req.method === "GET" && pathname === "/api/r2/signed-url") {
     const key = sanitizeObjectKey(searchParams.get("key"));
     const expires = Number(searchParams.get("expires") || "3600");
@@ -885,7 +947,7 @@ async function serveStatic(req, res, url) {
 async function requestHandler(req, res) {
   const url = new URL(req.url, `http://${req.headers.host || "localhost"}`);
   res.setHeader("Access-Control-Allow-Origin", "*");
-  res.setHeader("Access-Control-Allow-Headers", "Content-Type");
+  res.setHeader("Access-Control-Allow-Headers", "Content-Type, X-Object-Key");
   res.setHeader("Access-Control-Allow-Methods", "GET,POST,OPTIONS");
   if (req.method === "OPTIONS") {
     res.writeHead(204);
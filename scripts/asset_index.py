@@ -0,0 +1,169 @@
+import sqlite3
+import threading
+import time
+
+
+DHASH_BANDS = 4
+DHASH_BAND_BITS = 64 // DHASH_BANDS
+# two hashes within this distance share at least one band exactly (pigeonhole), so band lookups find them
+MAX_NEAR_DISTANCE = DHASH_BANDS - 1
+
+COLUMNS = (
+    "provider",
+    "asset_id",
+    "variant",
+    "key",
+    "content_type",
+    "sha256",
+    "md5",
+    "bytes",
+    "thumb_key",
+    "thumb_sha256",
+    "thumb_md5",
+    "thumb_bytes",
+    "width",
+    "height",
+    "dhash",
+    "updated_at",
+)
+
+
+def dhash_bands(value):
+    mask = (1 << DHASH_BAND_BITS) - 1
+    return [(band, (value >> (band * DHASH_BAND_BITS)) & mask) for band in range(DHASH_BANDS)]
+
+
+class AssetIndex:
+    # (provider, provider asset id, variant settings) -> the object key that already holds it, so later
+    # places (this run or the next) can copy it inside the bucket instead of downloading it again.
+    # sha256 catches the same bytes under another asset id; dhash bands find near-identical pictures
+    # (reported only: those are different photos with their own credits, so they are never aliased).
+    def __init__(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS asset_index (
+                    provider TEXT NOT NULL,
+                    asset_id TEXT NOT NULL,
+                    variant TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    content_type TEXT,
+                    sha256 TEXT NOT NULL,
+                    md5 TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    thumb_key TEXT,
+                    thumb_sha256 TEXT,
+                    thumb_md5 TEXT,
+                    thumb_bytes INTEGER,
+                    width INTEGER,
+                    height INTEGER,
+                    dhash TEXT,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (provider, asset_id, variant)
+                )
+                """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS asset_index_sha256 ON asset_index (variant, sha256)")
+        self.bands = None
+
+    def _entry(self, row):
+        if row is None:
+            return None
+        entry = dict(zip(COLUMNS, row))
+        entry["dhash"] = int(entry["dhash"], 16) if entry["dhash"] else None
+        return entry
+
+    def get(self, provider, asset_id, variant):
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM asset_index WHERE provider = ? AND asset_id = ? AND variant = ?",
+                (provider, asset_id, variant),
+            ).fetchone()
+        return self._entry(row)
+
+    def find_content(self, variant, sha256, exclude_key=None):
+        with self.lock:
+            row = self.conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM asset_index WHERE variant = ? AND sha256 = ? AND key != ? LIMIT 1",
+                (variant, sha256, exclude_key or ""),
+            ).fetchone()
+        return self._entry(row)
+
+    def _load_bands(self):
+        # (band, value) -> [(dhash, asset, key)], built on the first near-duplicate lookup
+        self.bands = {}
+        for provider, asset_id, variant, key, value in self.conn.execute(
+            "SELECT provider, asset_id, variant, key, dhash FROM asset_index WHERE dhash IS NOT NULL"
+        ):
+            self._add_bands(int(value, 16), (provider, asset_id, variant), key)
+
+    def _add_bands(self, value, asset, key):
+        for band in dhash_bands(value):
+            self.bands.setdefault(band, []).append((value, asset, key))
+
+    def _drop_bands(self, value, asset, key):
+        for band in dhash_bands(value):
+            entries = self.bands.get(band)
+            if entries:
+                entries[:] = [item for item in entries if item[1] != asset or item[2] != key]
+
+    def find_near(self, variant, value, max_distance, exclude_key=None):
+        # closest stored picture within `max_distance` bits (capped at MAX_NEAR_DISTANCE) -> (entry, distance)
+        max_distance = min(max_distance, MAX_NEAR_DISTANCE)
+        best = None
+        with self.lock:
+            if self.bands is None:
+                self._load_bands()
+            for band in dhash_bands(value):
+                for other, asset, key in self.bands.get(band, ()):
+                    if asset[2] != variant or key == exclude_key:
+                        continue
+                    distance = (other ^ value).bit_count()
+                    if distance <= max_distance and (best is None or distance < best[1]):
+                        best = (asset, distance)
+        if best is None:
+            return None, None
+        return self.get(*best[0]), best[1]
+
+    def record(self, provider, asset_id, variant, key, entry):
+        # entry: content_type, sha256, md5, bytes and optionally thumb_* / width / height / dhash
+        values = dict(entry, provider=provider, asset_id=asset_id, variant=variant, key=key, updated_at=time.time())
+        dhash = values.get("dhash")
+        values["dhash"] = f"{dhash:016x}" if dhash is not None else None
+        with self.lock, self.conn:
+            # the object at `key` now holds this asset only: rows that pointed another asset at it (or this
+            # asset at an older key) would copy the wrong photo with the wrong credit
+            stale = self.conn.execute(
+                "SELECT provider, asset_id, variant, key, dhash FROM asset_index "
+                "WHERE key = ? OR (provider = ? AND asset_id = ? AND variant = ?)",
+                (key, provider, asset_id, variant),
+            ).fetchall()
+            self.conn.execute(
+                "DELETE FROM asset_index WHERE key = ? OR (provider = ? AND asset_id = ? AND variant = ?)",
+                (key, provider, asset_id, variant),
+            )
+            if self.bands is not None:
+                for old_provider, old_asset_id, old_variant, old_key, old_dhash in stale:
+                    if old_dhash:
+                        self._drop_bands(int(old_dhash, 16), (old_provider, old_asset_id, old_variant), old_key)
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO asset_index ({', '.join(COLUMNS)}) VALUES ({', '.join('?' for _ in COLUMNS)})",
+                tuple(values.get(column) for column in COLUMNS),
+            )
+            if self.bands is not None and dhash is not None:
+                self._add_bands(dhash, (provider, asset_id, variant), key)
+
+    def forget_key(self, key):
+        # the stored object is gone (copy source 404); drop every asset pointing at it
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM asset_index WHERE key = ?", (key,))
+            self.bands = None
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,197 @@
+import asyncio
+import http.client
+import io
+import ssl
+import urllib.error
+import urllib.parse
+
+from http_pool import REDIRECT_CODES
+
+
+# asyncio counterpart of http_pool.HttpPool: HTTP/1.1 keep-alive per origin, same redirect and
+# HTTPError behaviour, but one event loop instead of one thread per in-flight request
+STALE_CONNECTION_ERRORS = (
+    asyncio.IncompleteReadError,
+    ConnectionResetError,
+    BrokenPipeError,
+    ConnectionAbortedError,
+)
+MAX_HEADER_BYTES = 64 * 1024
+
+
+class AsyncResponse:
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+
+class StaleConnection(Exception):
+    pass
+
+
+class AsyncHostPool:
+    def __init__(self, max_connections):
+        self.slots = asyncio.Semaphore(max_connections)
+        self.idle = []
+
+
+class AsyncHttpClient:
+    def __init__(self, max_per_host=64, timeout=45, user_agent=None):
+        self.max_per_host = max(1, max_per_host)
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.ssl_context = ssl.create_default_context()
+        self.hosts = {}
+        self.connections_opened = 0
+
+    def _host_pool(self, origin):
+        pool = self.hosts.get(origin)
+        if pool is None:
+            pool = AsyncHostPool(self.max_per_host)
+            self.hosts[origin] = pool
+        return pool
+
+    async def _connect(self, origin):
+        scheme, host, port = origin
+        self.connections_opened += 1
+        if scheme == "https":
+            return await asyncio.open_connection(host, port, ssl=self.ssl_context, server_hostname=host)
+        return await asyncio.open_connection(host, port)
+
+    async def _read_body(self, reader, method, status, headers):
+        if method == "HEAD" or status in {204, 304} or 100 <= status < 200:
+            return b"", True
+        if (headers.get("Transfer-Encoding") or "").lower() == "chunked":
+            chunks = []
+            while True:
+                size_line = await reader.readuntil(b"\r\n")
+                size = int(size_line.split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    # trailers, then the blank line that ends the message
+                    while (await reader.readuntil(b"\r\n")) != b"\r\n":
+                        pass
+                    return b"".join(chunks), True
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+        length = headers.get("Content-Length")
+        if length is not None:
+            return await reader.readexactly(int(length)), True
+        # no framing: the body runs until the server closes the connection
+        return await reader.read(), False
+
+    async def _exchange(self, reader, writer, method, head, body, reused):
+        try:
+            writer.write(head + (body or b""))
+            await writer.drain()
+            status_line = await reader.readuntil(b"\r\n")
+        except STALE_CONNECTION_ERRORS as ex:
+            if reused:
+                raise StaleConnection() from ex
+            raise
+        parts = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith("HTTP/"):
+            raise http.client.BadStatusLine(status_line)
+        status = int(parts[1])
+        reason = parts[2] if len(parts) > 2 else ""
+        header_lines = []
+        size = 0
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            header_lines.append(line)
+            size += len(line)
+            if size > MAX_HEADER_BYTES:
+                raise http.client.LineTooLong("header block")
+            if line == b"\r\n":
+                break
+        headers = http.client.parse_headers(io.BytesIO(b"".join(header_lines)))
+        data, framed = await self._read_body(reader, method, status, headers)
+        keep = framed and (headers.get("Connection") or "").lower() != "close" and parts[0] != "HTTP/1.0"
+        return status, reason, headers, data, keep
+
+    async def _send(self, origin, method, head, body):
+        pool = self._host_pool(origin)
+        async with pool.slots:
+            conn = pool.idle.pop() if pool.idle else None
+            reused = conn is not None
+            if conn is None:
+                conn = await self._connect(origin)
+            reader, writer = conn
+            try:
+                result = await self._exchange(reader, writer, method, head, body, reused)
+            except StaleConnection:
+                writer.close()
+                # the idle socket was closed by the server; retry exactly once on a fresh one
+                reader, writer = await self._connect(origin)
+                try:
+                    result = await self._exchange(reader, writer, method, head, body, False)
+                except BaseException:
+                    writer.close()
+                    raise
+            except BaseException:
+                writer.close()
+                raise
+            if result[4]:
+                pool.idle.append((reader, writer))
+            else:
+                writer.close()
+            return result[:4]
+
+    def _head(self, method, parts, headers, body):
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+        host = parts.hostname
+        default_port = 443 if parts.scheme == "https" else 80
+        if parts.port and parts.port != default_port:
+            host = f"{host}:{parts.port}"
+        lines = [f"{method} {target} HTTP/1.1", f"Host: {host}"]
+        names = {k.lower() for k in headers}
+        for name, value in headers.items():
+            lines.append(f"{name}: {value}")
+        if body is not None and "content-length" not in names:
+            lines.append(f"Content-Length: {len(body)}")
+        elif body is None and method in {"POST", "PUT", "PATCH"} and "content-length" not in names:
+            lines.append("Content-Length: 0")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+    async def request(self, method, url, body=None, headers=None, timeout=None, max_redirects=5):
+        timeout = self.timeout if timeout is None else timeout
+        req_headers = dict(headers or {})
+        if self.user_agent:
+            req_headers.setdefault("User-Agent", self.user_agent)
+
+        for _ in range(max_redirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            scheme = parts.scheme.lower()
+            if scheme not in {"http", "https"}:
+                raise ValueError(f"unsupported url scheme: {url}")
+            origin = (scheme, parts.hostname, parts.port or (443 if scheme == "https" else 80))
+            head = self._head(method, parts, req_headers, body)
+            status, reason, resp_headers, data = await asyncio.wait_for(
+                self._send(origin, method, head, body), timeout
+            )
+
+            location = resp_headers.get("Location")
+            if status in REDIRECT_CODES and location:
+                url = urllib.parse.urljoin(url, location)
+                if status == 303 or (status in {301, 302} and method == "POST"):
+                    method = "GET"
+                    body = None
+                    req_headers.pop("Content-Type", None)
+                    req_headers.pop("Content-Length", None)
+                continue
+
+            if status >= 400:
+                raise urllib.error.HTTPError(url, status, reason, resp_headers, io.BytesIO(data))
+            return AsyncResponse(url, status, reason, resp_headers, data)
+        raise urllib.error.HTTPError(url, 310, "too many redirects", None, io.BytesIO(b""))
+
+    async def close(self):
+        hosts, self.hosts = self.hosts, {}
+        for pool in hosts.values():
+            idle, pool.idle = pool.idle, []
+            for _reader, writer in idle:
+                writer.close()
@@ -1,104 +1,288 @@
 import json
-import re
+import os
 from collections import Counter, defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from pathlib import Path
 
+import catalog_binary
+from audit_state import AuditState
+from catalog_stream import iter_countries, walk_catalog
+from content_ledger import input_fingerprint
+from place_names import CITY_PREFIX_MAX_WORDS, GENERIC_TERMS, NAME_SUFFIX_HINTS, classify_name
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_FILE = ROOT / "data" / "countries.v1.json"
 OUT_FILE = ROOT / "data" / "runtime" / "place_catalog_audit.v1.json"
-
-SYNTHETIC_SUFFIXES = {
-    "old town quarter",
-    "national museum",
-    "art district",
-    "historic fortress",
-    "royal palace",
-    "temple complex",
-    "riverside walk",
-    "seaside promenade",
-    "city beach",
-    "island bay",
-    "mountain trail",
-    "national park",
-    "botanic garden",
-    "food street",
-    "street food alley",
-    "shopping avenue",
-    "designer mall",
-    "skyline observatory",
-    "modern marina",
-    "adventure park",
-    "diving point",
-    "surf beach",
-    "cultural village",
-    "heritage site",
-    "landmark plaza",
-    "old port",
-    "wine region",
-    "spa resort",
-    "desert camp",
-    "snow peak",
-}
+STATE_FILE = ROOT / "data" / "runtime" / "place_catalog_audit.v1.state.sqlite"
+MAX_FLAGGED_SAMPLES = 400
+AUDIT_WORKERS = int(os.getenv("AUDIT_WORKERS", "0") or "0")
+AUDIT_SHARD_PLACES = max(1, int(os.getenv("AUDIT_SHARD_PLACES", "50000") or "50000"))
+AUDIT_INCREMENTAL = os.getenv("AUDIT_INCREMENTAL", "0") == "1"
+# bump when is_synthetic/suffix logic changes so stored verdicts are thrown away
+AUDIT_RULES_VERSION = 1
 
 
 def is_synthetic(name, city):
-    n = (name or "").strip().lower()
-    c = (city or "").strip().lower()
-    if not n:
-        return True, "empty_name"
-    for suffix in SYNTHETIC_SUFFIXES:
-        if n.endswith(suffix):
-            return True, f"synthetic_suffix:{suffix}"
-    if c and n.startswith(c + " "):
-        words = re.findall(r"[a-z0-9]+", n)
-        if len(words) <= 4:
-            return True, "city_prefix_short_generic"
+    info = classify_name(name, city)
+    if info["synthetic"]:
+        return True, info["reason"]
+    if info["city_prefix_short"]:
+        return True, "city_prefix_short_generic"
     return False, ""
 
 
-def main():
-    if not DATA_FILE.exists():
-        raise SystemExit(f"missing data file: {DATA_FILE}")
+def name_suffix2(name):
+    words = name.lower().split()
+    return " ".join(words[-2:]) if len(words) >= 2 else name.lower()
 
-    data = json.loads(DATA_FILE.read_text(encoding="utf-8"))
-    countries = data.get("countries", [])
-    total_places = 0
-    flagged = []
-    reason_counter = Counter()
-    suffix_counter = Counter()
-    country_stats = defaultdict(lambda: {"total": 0, "flagged": 0})
 
-    for country in countries:
+def audit_events(events):
+    # partial audit over walk_catalog-style (country, place) / (country, None) events.
+    # only country headers, counters and the first MAX_FLAGGED_SAMPLES flagged rows are kept
+    part = {
+        "countries": [],
+        "total_places": 0,
+        "flagged_count": 0,
+        "flagged": [],
+        "reason_counter": Counter(),
+        "suffix_counter": Counter(),
+        "country_stats": defaultdict(lambda: {"total": 0, "flagged": 0}),
+    }
+    country_stats = part["country_stats"]
+    for country, place in events:
         code = country.get("country_code")
-        cname = country.get("country_name_en")
-        for place in country.get("places", []):
-            total_places += 1
-            name = place.get("name_en", "")
-            city = place.get("city", "")
-            country_stats[code]["total"] += 1
-            bad, reason = is_synthetic(name, city)
-            if bad:
-                country_stats[code]["flagged"] += 1
-                reason_counter[reason] += 1
-                words = name.lower().split()
-                suffix2 = " ".join(words[-2:]) if len(words) >= 2 else name.lower()
-                suffix_counter[suffix2] += 1
-                flagged.append(
+        if place is None:
+            part["countries"].append({"country_code": code, "country_name_en": country.get("country_name_en")})
+            continue
+        part["total_places"] += 1
+        name = place.get("name_en", "")
+        city = place.get("city", "")
+        country_stats[code]["total"] += 1
+        bad, reason = is_synthetic(name, city)
+        if bad:
+            part["flagged_count"] += 1
+            country_stats[code]["flagged"] += 1
+            part["reason_counter"][reason] += 1
+            part["suffix_counter"][name_suffix2(name)] += 1
+            if len(part["flagged"]) < MAX_FLAGGED_SAMPLES:
+                part["flagged"].append(
                     {
                         "country_code": code,
-                        "country_name_en": cname,
+                        "country_name_en": country.get("country_name_en"),
                         "city": city,
                         "place_id": place.get("place_id"),
                         "name_en": name,
                         "reason": reason,
                     }
                 )
+    part["country_stats"] = dict(country_stats)
+    return part
+
+
+def merge_partials(parts):
+    # parts must arrive in catalog order: Counter insertion order (most_common tie-break)
+    # and the flagged sample prefix then match a serial run exactly
+    merged = audit_events(())
+    stats = defaultdict(lambda: {"total": 0, "flagged": 0})
+    for part in parts:
+        merged["countries"].extend(part["countries"])
+        merged["total_places"] += part["total_places"]
+        merged["flagged_count"] += part["flagged_count"]
+        room = MAX_FLAGGED_SAMPLES - len(merged["flagged"])
+        if room > 0:
+            merged["flagged"].extend(part["flagged"][:room])
+        merged["reason_counter"].update(part["reason_counter"])
+        merged["suffix_counter"].update(part["suffix_counter"])
+        for code, row in part["country_stats"].items():
+            stats[code]["total"] += row["total"]
+            stats[code]["flagged"] += row["flagged"]
+    merged["country_stats"] = stats
+    return merged
+
+
+def audit_binary_shard(shard):
+    start, end = shard
+    catalog = catalog_binary.CatalogBinary(catalog_binary.OUT_FILE)
+    try:
+        return audit_events(catalog.walk_catalog(start, end))
+    finally:
+        catalog.close()
 
+
+def audit_country_shard(countries):
+    def events():
+        for country in countries:
+            for place in country.get("places") or []:
+                yield country, place
+            yield country, None
+
+    return audit_events(events())
+
+
+def binary_shards(catalog, shard_places):
+    # contiguous country ranges of roughly shard_places places each
+    shards = []
+    start = 0
+    size = 0
+    for ci in range(catalog.n_countries):
+        size += catalog.country_place_range(ci)[1]
+        if size >= shard_places:
+            shards.append((start, ci + 1))
+            start = ci + 1
+            size = 0
+    if start < catalog.n_countries:
+        shards.append((start, catalog.n_countries))
+    return shards
+
+
+def json_shards(shard_places):
+    shard = []
+    size = 0
+    for country in iter_countries(DATA_FILE):
+        shard.append(country)
+        size += len(country.get("places") or [])
+        if size >= shard_places:
+            yield shard
+            shard = []
+            size = 0
+    if shard:
+        yield shard
+
+
+def run_sharded(workers):
+    # with a fresh binary catalog every worker maps the file and reads its own country range;
+    # otherwise the parent streams the JSON and hands out country batches. at most
+    # workers * 2 shards are in flight, so memory stays bounded by the shard size.
+    catalog = catalog_binary.open_fresh(DATA_FILE) if catalog_binary.USE_BINARY else None
+    if catalog is not None:
+        try:
+            shards = binary_shards(catalog, AUDIT_SHARD_PLACES)
+        finally:
+            catalog.close()
+        fn = audit_binary_shard
+    else:
+        shards = json_shards(AUDIT_SHARD_PLACES)
+        fn = audit_country_shard
+
+    parts = {}
+    next_idx = 0
+    submitted = 0
+    pending = {}
+    it = iter(shards)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            while len(pending) < workers * 2:
+                shard = next(it, None)
+                if shard is None:
+                    break
+                pending[pool.submit(fn, shard)] = submitted
+                submitted += 1
+            if not pending:
+                break
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                parts[pending.pop(fut)] = fut.result()
+            # hand back finished shards in order so only out-of-order ones are held
+            while next_idx in parts:
+                yield parts.pop(next_idx)
+                next_idx += 1
+
+
+def audit_rules_hash():
+    return input_fingerprint(
+        AUDIT_RULES_VERSION, sorted(NAME_SUFFIX_HINTS), CITY_PREFIX_MAX_WORDS, sorted(GENERIC_TERMS)
+    )
+
+
+def place_fingerprint(place):
+    return input_fingerprint(place.get("place_id"), place.get("name_en", ""), place.get("city", ""))
+
+
+def run_incremental():
+    # still one streaming pass to fingerprint every place, but only added or changed
+    # places are classified; the aggregates are patched with +/- deltas
+    state = AuditState(STATE_FILE, audit_rules_hash())
+    counts = {"added": 0, "changed": 0, "unchanged": 0, "removed": 0}
+    try:
+        countries = []
+        country_names = {}
+        seen = set()
+        ord_ = 0
+        for country, place in walk_catalog(DATA_FILE):
+            code = country.get("country_code")
+            if place is None:
+                countries.append({"country_code": code, "country_name_en": country.get("country_name_en")})
+                country_names.setdefault(code, country.get("country_name_en"))
+                continue
+            key = str(place.get("place_id"))
+            dup = 1
+            while key in seen:
+                dup += 1
+                key = f"{place.get('place_id')}#{dup}"
+            seen.add(key)
+
+            fingerprint = place_fingerprint(place)
+            old = state.get(key)
+            if old is not None and old["fingerprint"] == fingerprint and old["country_code"] == code:
+                if old["ord"] != ord_:
+                    state.move(key, ord_)
+                counts["unchanged"] += 1
+                ord_ += 1
+                continue
+
+            name = place.get("name_en", "")
+            city = place.get("city", "")
+            bad, reason = is_synthetic(name, city)
+            entry = {
+                "fingerprint": fingerprint,
+                "ord": ord_,
+                "country_code": code,
+                "place_id": place.get("place_id"),
+                "name_en": name,
+                "city": city,
+                "flagged": bad,
+                "reason": reason if bad else None,
+                "suffix": name_suffix2(name) if bad else None,
+            }
+            state.put(key, entry, old)
+            counts["changed" if old is not None else "added"] += 1
+            ord_ += 1
+        counts["removed"] = state.remove_missing(seen)
+        state.flush()
+
+        flagged = [
+            {
+                "country_code": code,
+                "country_name_en": country_names.get(code),
+                "city": city,
+                "place_id": place_id,
+                "name_en": name,
+                "reason": reason,
+            }
+            for code, city, place_id, name, reason in state.flagged_samples(MAX_FLAGGED_SAMPLES)
+        ]
+        merged = {
+            "countries": countries,
+            "total_places": state.total_places,
+            "flagged_count": state.flagged_count,
+            "flagged": flagged,
+            "reason_counter": state.ordered_counter("reason", state.reason_counts),
+            "suffix_counter": state.ordered_counter("suffix", state.suffix_counts),
+            "country_stats": state.country_stats,
+        }
+        state.commit()
+        counts["rebuilt"] = state.rebuilt
+        return merged, counts
+    finally:
+        state.close()
+
+
+def build_report(merged):
     country_rows = []
-    for c in countries:
+    for c in merged["countries"]:
         code = c.get("country_code")
-        row = country_stats[code]
+        row = merged["country_stats"].get(code) or {"total": 0, "flagged": 0}
         total = row["total"] or 1
         ratio = row["flagged"] / total
         country_rows.append(
@@ -112,19 +296,35 @@ def main():
         )
     country_rows.sort(key=lambda x: x["flagged_ratio"], reverse=True)
 
-    report = {
+    total_places = merged["total_places"]
+    flagged_count = merged["flagged_count"]
+    return {
         "summary": {
-            "countries": len(countries),
+            "countries": len(merged["countries"]),
             "places": total_places,
-            "flagged_places": len(flagged),
-            "flagged_ratio": round((len(flagged) / total_places) if total_places else 0, 4),
+            "flagged_places": flagged_count,
+            "flagged_ratio": round((flagged_count / total_places) if total_places else 0, 4),
         },
-        "top_reasons": reason_counter.most_common(20),
-        "top_suffixes": suffix_counter.most_common(30),
+        "top_reasons": merged["reason_counter"].most_common(20),
+        "top_suffixes": merged["suffix_counter"].most_common(30),
         "countries_by_flagged_ratio": country_rows[:100],
-        "flagged_samples": flagged[:400],
+        "flagged_samples": merged["flagged"],
     }
 
+
+def main():
+    if not DATA_FILE.exists():
+        raise SystemExit(f"missing data file: {DATA_FILE}")
+
+    delta = None
+    if AUDIT_INCREMENTAL:
+        merged, delta = run_incremental()
+    elif AUDIT_WORKERS > 1:
+        merged = merge_partials(run_sharded(AUDIT_WORKERS))
+    else:
+        merged = merge_partials([audit_events(walk_catalog(DATA_FILE))])
+    report = build_report(merged)
+
     OUT_FILE.parent.mkdir(parents=True, exist_ok=True)
     OUT_FILE.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
 
@@ -133,6 +333,11 @@ def main():
         f"summary: countries={report['summary']['countries']} places={report['summary']['places']} "
         f"flagged={report['summary']['flagged_places']} ratio={report['summary']['flagged_ratio']}"
     )
+    if delta is not None:
+        print(
+            f"incremental: added={delta['added']} changed={delta['changed']} removed={delta['removed']} "
+            f"unchanged={delta['unchanged']} rebuilt={'yes' if delta['rebuilt'] else 'no'}"
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,171 @@
+import json
+import sqlite3
+from collections import Counter
+
+
+class AuditState:
+    # per-place audit results plus the aggregates derived from them, so a later run only
+    # re-evaluates places whose fingerprint changed and patches the aggregates with deltas
+    def __init__(self, path, rules_hash):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS audit_places (
+                    key TEXT PRIMARY KEY,
+                    fingerprint TEXT NOT NULL,
+                    ord INTEGER NOT NULL,
+                    country_code TEXT,
+                    place_id TEXT,
+                    name_en TEXT,
+                    city TEXT,
+                    flagged INTEGER NOT NULL,
+                    reason TEXT,
+                    suffix TEXT
+                )
+                """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS audit_places_flagged ON audit_places (flagged, ord)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS audit_places_reason ON audit_places (reason, ord)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS audit_places_suffix ON audit_places (suffix, ord)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS audit_meta (name TEXT PRIMARY KEY, value TEXT)")
+        stored = self._meta("rules_hash")
+        self.rebuilt = stored != rules_hash
+        if self.rebuilt:
+            # classification rules changed: every stored verdict is suspect
+            with self.conn:
+                self.conn.execute("DELETE FROM audit_places")
+                self.conn.execute("DELETE FROM audit_meta")
+                self._set_meta("rules_hash", rules_hash)
+        aggregates = json.loads(self._meta("aggregates") or "{}")
+        self.total_places = aggregates.get("total_places", 0)
+        self.flagged_count = aggregates.get("flagged_count", 0)
+        self.reason_counts = Counter(aggregates.get("reasons", {}))
+        self.suffix_counts = Counter(aggregates.get("suffixes", {}))
+        self.country_stats = {code: dict(row) for code, row in aggregates.get("countries", {}).items()}
+        self.pending = []
+        self.moves = []
+
+    def _meta(self, name):
+        row = self.conn.execute("SELECT value FROM audit_meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name, value):
+        self.conn.execute("INSERT OR REPLACE INTO audit_meta (name, value) VALUES (?, ?)", (name, value))
+
+    def get(self, key):
+        row = self.conn.execute(
+            "SELECT fingerprint, ord, country_code, flagged, reason, suffix FROM audit_places WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "fingerprint": row[0],
+            "ord": row[1],
+            "country_code": row[2],
+            "flagged": row[3],
+            "reason": row[4],
+            "suffix": row[5],
+        }
+
+    def _apply(self, entry, sign):
+        stats = self.country_stats.setdefault(entry["country_code"], {"total": 0, "flagged": 0})
+        stats["total"] += sign
+        self.total_places += sign
+        if entry["flagged"]:
+            stats["flagged"] += sign
+            self.flagged_count += sign
+            self.reason_counts[entry["reason"]] += sign
+            self.suffix_counts[entry["suffix"]] += sign
+
+    def put(self, key, entry, old=None):
+        if old is not None:
+            self._apply(old, -1)
+        self._apply(entry, 1)
+        self.pending.append(
+            (
+                key,
+                entry["fingerprint"],
+                entry["ord"],
+                entry["country_code"],
+                entry["place_id"],
+                entry["name_en"],
+                entry["city"],
+                1 if entry["flagged"] else 0,
+                entry["reason"],
+                entry["suffix"],
+            )
+        )
+        if len(self.pending) >= 5000:
+            self.flush()
+
+    def move(self, key, ord_):
+        self.moves.append((ord_, key))
+        if len(self.moves) >= 5000:
+            self.flush()
+
+    def remove_missing(self, seen):
+        # places that were not in this run's catalog: subtract them and drop their rows
+        self.flush()
+        gone = []
+        for key, country_code, flagged, reason, suffix in self.conn.execute(
+            "SELECT key, country_code, flagged, reason, suffix FROM audit_places"
+        ):
+            if key not in seen:
+                gone.append(key)
+                self._apply({"country_code": country_code, "flagged": flagged, "reason": reason, "suffix": suffix}, -1)
+        self.conn.executemany("DELETE FROM audit_places WHERE key = ?", ((k,) for k in gone))
+        return len(gone)
+
+    def flush(self):
+        # writes stay in one open transaction until commit(), so an interrupted run
+        # leaves the previous rows and aggregates untouched
+        if self.pending:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO audit_places "
+                "(key, fingerprint, ord, country_code, place_id, name_en, city, flagged, reason, suffix) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self.pending,
+            )
+            self.pending = []
+        if self.moves:
+            self.conn.executemany("UPDATE audit_places SET ord = ? WHERE key = ?", self.moves)
+            self.moves = []
+
+    def ordered_counter(self, column, counts):
+        # Counter in first-appearance (catalog) order, so most_common() breaks ties like a full run
+        first = {}
+        for name, n in counts.items():
+            if n <= 0:
+                continue
+            row = self.conn.execute(
+                f"SELECT MIN(ord) FROM audit_places WHERE {column} = ? AND flagged = 1", (name,)
+            ).fetchone()
+            first[name] = row[0] if row and row[0] is not None else 0
+        return Counter({name: counts[name] for name in sorted(first, key=first.get)})
+
+    def flagged_samples(self, limit):
+        return self.conn.execute(
+            "SELECT country_code, city, place_id, name_en, reason FROM audit_places "
+            "WHERE flagged = 1 ORDER BY ord LIMIT ?",
+            (limit,),
+        ).fetchall()
+
+    def commit(self):
+        self.flush()
+        aggregates = {
+            "total_places": self.total_places,
+            "flagged_count": self.flagged_count,
+            "reasons": {k: v for k, v in self.reason_counts.items() if v > 0},
+            "suffixes": {k: v for k, v in self.suffix_counts.items() if v > 0},
+            "countries": {k: v for k, v in self.country_stats.items() if v["total"] > 0},
+        }
+        self._set_meta("aggregates", json.dumps(aggregates, ensure_ascii=False))
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
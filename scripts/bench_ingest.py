@@ -0,0 +1,416 @@
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+from array import array
+from pathlib import Path
+
+from catalog_stream import iter_country_places
+from ingest_metrics import percentile
+from manifest_store import ManifestStore
+from mock_services import MockConfig, MockServerThread
+from place_names import NAME_SUFFIX_HINTS
+from query_plan import build_query_profiles, tokenize
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_FILE = ROOT / "data" / "countries.v1.json"
+BENCH_DIR = ROOT / "data" / "runtime" / "bench"
+BENCH_SCALES = [int(x) for x in os.getenv("BENCH_SCALES", "10000,100000,1000000").split(",") if x.strip()]
+BENCH_STAGES = [x.strip() for x in os.getenv("BENCH_STAGES", "").split(",") if x.strip()]
+BENCH_MEMORY = os.getenv("BENCH_MEMORY", "1") == "1"
+BENCH_TEXT_SAMPLES = int(os.getenv("BENCH_TEXT_SAMPLES", "20000") or "20000")
+BENCH_RENDER_SAMPLES = int(os.getenv("BENCH_RENDER_SAMPLES", "200") or "200")
+BENCH_INGEST_SAMPLES = int(os.getenv("BENCH_INGEST_SAMPLES", "500") or "500")
+BENCH_SEED = int(os.getenv("BENCH_SEED", "1234") or "1234")
+BENCH_OUT = os.getenv("BENCH_OUT", "").strip()
+BENCH_BASELINE = os.getenv("BENCH_BASELINE", "").strip()
+BENCH_REGRESSION_PCT = float(os.getenv("BENCH_REGRESSION_PCT", "20") or "20")
+
+REAL_NAME_WORDS = ["Cathedral", "Grand Bazaar", "Lighthouse", "Hot Springs", "Citadel", "Waterfall", "Canyon", "Bridge"]
+
+
+def synthetic_catalog(n_places, seed=BENCH_SEED):
+    # real country headers and cities, generated places; cached per (size, seed)
+    path = BENCH_DIR / f"catalog_{n_places}_{seed}.json"
+    if path.exists():
+        return path
+    BENCH_DIR.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(seed)
+    headers = []
+    for country, place in iter_country_places(DATA_FILE):
+        if not headers or headers[-1]["country_code"] != country.get("country_code"):
+            headers.append({k: v for k, v in country.items() if k != "places"})
+    suffixes = sorted(NAME_SUFFIX_HINTS)
+    per_country = [n_places // len(headers)] * len(headers)
+    for i in range(n_places - sum(per_country)):
+        per_country[i] += 1
+
+    tmp = path.with_suffix(".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        meta = {"version": "bench", "total_countries": len(headers), "total_places": n_places, "vector_dimension": 12}
+        f.write('{"meta": ' + json.dumps(meta) + ', "countries": [')
+        for ci, (header, count) in enumerate(zip(headers, per_country)):
+            country = dict(header)
+            country["seed_place_count"] = count
+            cities = country.get("top_seed_cities") or [country.get("country_name_en") or "City"]
+            head = json.dumps(country, ensure_ascii=False)[:-1]
+            f.write(("," if ci else "") + head + ', "places": [')
+            for pi in range(count):
+                city = cities[pi % len(cities)]
+                if rng.random() < 0.8:
+                    name = f"{city} {rng.choice(suffixes).title()}"
+                else:
+                    name = f"{rng.choice(REAL_NAME_WORDS)} of {city} {pi}"
+                place = {
+                    "place_id": f"{country['country_code'].lower()}-bench-{pi}",
+                    "name_en": name,
+                    "country_code": country["country_code"],
+                    "city": city,
+                    "tags_vector": [round(rng.random(), 3) for _ in range(12)],
+                    "source": "manual_review",
+                }
+                f.write(("," if pi else "") + json.dumps(place, ensure_ascii=False))
+            f.write("]}")
+        f.write("]}")
+    os.replace(tmp, path)
+    return path
+
+
+def measure(fn, make_items):
+    # timing pass: per-op latency around fn only (item production is excluded), then an
+    # optional second pass under tracemalloc for the stage's peak traced memory
+    latencies = array("d")
+    started = time.perf_counter()
+    for item in make_items():
+        t0 = time.perf_counter_ns()
+        fn(item)
+        latencies.append(time.perf_counter_ns() - t0)
+    wall = time.perf_counter() - started
+
+    mem_peak = None
+    if BENCH_MEMORY:
+        tracemalloc.start()
+        try:
+            for item in make_items():
+                fn(item)
+            mem_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    ordered = sorted(latencies)
+    busy = sum(ordered) / 1e9
+    return {
+        "ops": len(ordered),
+        "wall_sec": round(wall, 4),
+        "ops_per_sec": round(len(ordered) / busy, 1) if busy else 0.0,
+        "latency_us": {
+            "p50": round(percentile(ordered, 50) / 1000.0, 2),
+            "p95": round(percentile(ordered, 95) / 1000.0, 2),
+            "p99": round(percentile(ordered, 99) / 1000.0, 2),
+            "max": round(ordered[-1] / 1000.0, 2) if ordered else 0.0,
+        },
+        "mem_peak_kb": round(mem_peak / 1024.0, 1) if mem_peak is not None else None,
+    }
+
+
+def country_name(country):
+    return country.get("country_name_en") or country.get("country_code")
+
+
+def candidate_text(place, profiles):
+    # what a provider hit looks like: some required and optional tokens plus noise
+    tokens = profiles[0]["required_tokens"][:1] + profiles[0]["optional_tokens"][:2] if profiles else []
+    return " ".join(tokens + ["travel", "photo", place.get("place_id", "")])
+
+
+def start_mock_services():
+    # no injected faults here: the bench measures the client side, not retries
+    config = MockConfig(latency_ms=0, jitter_ms=0, error_rate=0, rate_429=0, image_size="400x250")
+    return MockServerThread(config).start()
+
+
+def import_ingest(base_url):
+    # the ingest script reads its configuration at import time
+    os.environ.update(
+        {
+            "BACKEND_URL": base_url,
+            "START_SERVER": "0",
+            "PIXABAY_API_KEY": "bench",
+            "PEXELS_API_KEY": "",
+            "UNSPLASH_ACCESS_KEY": "",
+            "PIXABAY_API_URL": f"{base_url}/pixabay/api/",
+            "PIXABAY_RATE_PER_SEC": "1000000",
+            "PIXABAY_RATE_PER_HOUR": "1000000000",
+            "PROVIDER_PRIORITY": "pixabay",
+            "SEARCH_CACHE": "0",
+            "SKIP_UNCHANGED": "0",
+            "QUERY_PLAN": "0",
+        }
+    )
+    import fetch_real_images_and_upload as ingest
+
+    return ingest
+
+
+def import_placeholders():
+    try:
+        import generate_placeholders_and_upload as placeholders
+    except ImportError as ex:
+        print(f"skip render stages: {ex}")
+        return None
+    return placeholders
+
+
+def catalog_stages(path, ingest, workdir):
+    places = lambda: iter_country_places(path)
+    stages = {}
+
+    def stream_items():
+        # the timed op is the parser producing the next place
+        state = {"rows": iter_country_places(path), "done": False}
+        while not state["done"]:
+            yield state
+
+    def pull(state):
+        if next(state["rows"], None) is None:
+            state["done"] = True
+
+    stages["catalog_stream"] = (pull, stream_items)
+    stages["tokenize"] = (
+        lambda row: tokenize(f"{row[1].get('name_en')} {row[1].get('city')} {country_name(row[0])}"),
+        places,
+    )
+    stages["build_query_profiles"] = (lambda row: build_query_profiles(row[1], country_name(row[0])), places)
+
+    def scored_items():
+        for idx, (country, place) in enumerate(iter_country_places(path)):
+            profiles = build_query_profiles(place, country_name(country))
+            req = profiles[0]["required_tokens"] if profiles else []
+            opt = profiles[0]["optional_tokens"] if profiles else []
+            yield idx % 8, 4000 * 2500, candidate_text(place, profiles), req, opt
+
+    stages["score_candidate"] = (lambda args: ingest.score_candidate(*args), scored_items)
+
+    def page_items():
+        # one 30-hit provider page per place, scored against profiles compiled once per place
+        for country, place in iter_country_places(path):
+            profiles = build_query_profiles(place, country_name(country))
+            text = candidate_text(place, profiles)
+            yield profiles[0] if profiles else {"required_tokens": [], "optional_tokens": []}, [
+                (rank, 4000 * 2500, text) for rank in range(30)
+            ]
+
+    stages["score_page"] = (lambda args: ingest.best_on_page(*args), page_items)
+
+    def manifest_rows():
+        for country, place in iter_country_places(path):
+            yield {
+                "country_code": country.get("country_code"),
+                "place_id": place.get("place_id"),
+                "key": f"images/placeholders/{country.get('country_code')}/{place.get('place_id')}.jpg",
+                "status": "uploaded",
+            }
+
+    def manifest_append_items():
+        db = workdir / "manifest.sqlite"
+        for p in workdir.glob("manifest.sqlite*"):
+            p.unlink()
+        store = ManifestStore(db, batch_size=500)
+        try:
+            for row in manifest_rows():
+                yield store, row
+            store.flush()
+        finally:
+            store.close()
+
+    stages["manifest_append"] = (lambda args: args[0].append(args[1]), manifest_append_items)
+
+    def manifest_lookup_items():
+        store = ManifestStore(workdir / "manifest.sqlite", batch_size=500)
+        try:
+            if not len(store):
+                # manifest_append was not selected; seed the store untimed
+                for row in manifest_rows():
+                    store.append(row)
+                store.flush()
+            for row in manifest_rows():
+                yield store, row["key"]
+        finally:
+            store.close()
+
+    stages["manifest_resume_lookup"] = (lambda args: args[1] in args[0], manifest_lookup_items)
+
+    def manifest_jsonl_items():
+        jsonl = workdir / "manifest.jsonl"
+        if not jsonl.exists():
+            with jsonl.open("w", encoding="utf-8") as f:
+                for row in manifest_rows():
+                    f.write(json.dumps(row) + "\n")
+        yield jsonl
+
+    def load_jsonl(jsonl):
+        saved = ingest.MANIFEST_FILE, ingest.manifest_store, ingest.RESUME_FROM_MANIFEST
+        ingest.MANIFEST_FILE, ingest.manifest_store, ingest.RESUME_FROM_MANIFEST = jsonl, None, True
+        try:
+            ingest.load_uploaded_keys_from_manifest()
+        finally:
+            ingest.MANIFEST_FILE, ingest.manifest_store, ingest.RESUME_FROM_MANIFEST = saved
+
+    stages["manifest_resume_jsonl"] = (load_jsonl, manifest_jsonl_items)
+    return stages
+
+
+def fixed_stages(path, ingest, placeholders):
+    stages = {}
+
+    def sample_rows(limit):
+        for i, row in enumerate(iter_country_places(path)):
+            if i >= limit:
+                return
+            yield row
+
+    if placeholders is not None:
+        font = placeholders.load_font(44, bold=True)
+
+        def wrap_items():
+            placeholders.text_width.cache_clear()
+            for _country, place in sample_rows(BENCH_TEXT_SAMPLES):
+                yield place.get("name_en") or ""
+
+        stages["text_wrap"] = (
+            lambda text: placeholders.text_wrap(placeholders.MEASURE_DRAW, text, font, 1100),
+            wrap_items,
+        )
+        stages["render_placeholder"] = (
+            lambda row: placeholders.render_placeholder(
+                row[1].get("name_en"), row[1].get("city"), country_name(row[0]), row[0].get("country_code")
+            ),
+            lambda: sample_rows(BENCH_RENDER_SAMPLES),
+        )
+
+    def ingest_items():
+        for idx, (country, place) in enumerate(sample_rows(BENCH_INGEST_SAMPLES), start=1):
+            yield idx, country, place, ingest.place_object_key(country, place)
+
+    def ingest_one(job):
+        row = ingest.ingest_place(job[0], BENCH_INGEST_SAMPLES, *job[1:])
+        if row["status"] != "uploaded":
+            raise RuntimeError(f"bench ingest failed: {row.get('errors')}")
+
+    stages["ingest_place_stub"] = (ingest_one, ingest_items)
+    return stages
+
+
+def selected(name):
+    return not BENCH_STAGES or name in BENCH_STAGES
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=str(ROOT), capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def compare_with_baseline(results, baseline_path):
+    baseline = json.loads(Path(baseline_path).read_text(encoding="utf-8"))
+    index = {(r["scale"], r["stage"]): r for r in baseline.get("results", [])}
+    slack = BENCH_REGRESSION_PCT / 100.0
+    regressions = []
+    for row in results:
+        base = index.get((row["scale"], row["stage"]))
+        if not base:
+            continue
+        if base["ops_per_sec"] and row["ops_per_sec"] < base["ops_per_sec"] * (1 - slack):
+            regressions.append(f"{row['stage']}@{row['scale']}: ops/s {base['ops_per_sec']} -> {row['ops_per_sec']}")
+        if base["latency_us"]["p95"] and row["latency_us"]["p95"] > base["latency_us"]["p95"] * (1 + slack):
+            regressions.append(
+                f"{row['stage']}@{row['scale']}: p95 {base['latency_us']['p95']}us -> {row['latency_us']['p95']}us"
+            )
+    return regressions
+
+
+def print_row(row):
+    lat = row["latency_us"]
+    mem = f" mem_peak={row['mem_peak_kb']}KB" if row["mem_peak_kb"] is not None else ""
+    print(
+        f"  {row['stage']:<24} ops={row['ops']:<8} ops/s={row['ops_per_sec']:<12} "
+        f"p50={lat['p50']}us p95={lat['p95']}us p99={lat['p99']}us{mem}"
+    )
+
+
+def main():
+    if not DATA_FILE.exists():
+        print(f"data file not found: {DATA_FILE}")
+        return 1
+
+    server = start_mock_services()
+    ingest = import_ingest(server.base_url)
+    placeholders = import_placeholders()
+    workdir = BENCH_DIR / "work"
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    try:
+        for scale in BENCH_SCALES:
+            path = synthetic_catalog(scale)
+            print(f"scale={scale} catalog={path.name}")
+            for stale in workdir.iterdir():
+                if stale.is_file():
+                    stale.unlink()
+            stages = catalog_stages(path, ingest, workdir)
+            if scale == BENCH_SCALES[0]:
+                stages.update(fixed_stages(path, ingest, placeholders))
+            for name, (fn, make_items) in stages.items():
+                if not selected(name):
+                    continue
+                row = {"scale": scale, "stage": name, **measure(fn, make_items)}
+                results.append(row)
+                print_row(row)
+    finally:
+        server.stop()
+        ingest.HTTP_POOL.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    try:
+        import PIL
+
+        pillow = PIL.__version__
+    except ImportError:
+        pillow = None
+    report = {
+        "meta": {
+            "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "pillow": pillow,
+            "seed": BENCH_SEED,
+            "memory_pass": BENCH_MEMORY,
+        },
+        "results": results,
+    }
+    out = Path(BENCH_OUT) if BENCH_OUT else BENCH_DIR / f"bench_ingest.{time.strftime('%Y%m%dT%H%M%S')}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"results written: {out}")
+
+    if BENCH_BASELINE:
+        regressions = compare_with_baseline(results, BENCH_BASELINE)
+        for line in regressions:
+            print(f"regression: {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
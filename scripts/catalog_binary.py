@@ -0,0 +1,353 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+import catalog_stream
+from catalog_stream import read_meta, walk_catalog
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_FILE = ROOT / "data" / "countries.v1.json"
+OUT_FILE = ROOT / "data" / "runtime" / "countries.v1.bin"
+USE_BINARY = os.getenv("CATALOG_BINARY", "1").strip() != "0"
+
+# layout (little-endian), every section 16-byte aligned:
+#   header            HEADER_STRUCT
+#   place vectors     float32[n_places * dim]
+#   country vectors   float32[n_countries * dim]
+#   country table     uint32[n_countries * COUNTRY_FIELDS]
+#   city index        uint32[n_city_refs]              (top_seed_cities string ids)
+#   place table       uint32[n_places * PLACE_FIELDS]
+#   string offsets    uint32[n_strings + 1]
+#   string data       utf-8
+MAGIC = b"WTTCAT01"
+VERSION = 1
+HEADER_STRUCT = struct.Struct("<8sIIIIIIIIqq" + "Q" * 7)
+NONE = 0xFFFFFFFF
+
+COUNTRY_STRING_FIELDS = (
+    "country_code",
+    "country_name_ko",
+    "country_name_en",
+    "region",
+    "tourism_demand_tier",
+    "place_count_bucket",
+    "data_quality_flag",
+)
+# string fields, seed_place_count, place_start, place_count, city_start, city_count, extras
+COUNTRY_FIELDS = len(COUNTRY_STRING_FIELDS) + 6
+PLACE_STRING_FIELDS = ("place_id", "name_en", "country_code", "city", "source")
+# string fields, country index, extras
+PLACE_FIELDS = len(PLACE_STRING_FIELDS) + 2
+
+COUNTRY_KNOWN = set(COUNTRY_STRING_FIELDS) | {"seed_place_count", "tags_vector", "top_seed_cities", "places"}
+PLACE_KNOWN = set(PLACE_STRING_FIELDS) | {"tags_vector"}
+
+
+class StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.offsets = array("I", [0])
+        self.data = bytearray()
+
+    def intern(self, value):
+        if value is None:
+            return NONE
+        value = str(value)
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = len(self.ids)
+            self.ids[value] = sid
+            self.data += value.encode("utf-8")
+            self.offsets.append(len(self.data))
+        return sid
+
+
+def extras_json(record, known):
+    extra = {k: v for k, v in record.items() if k not in known}
+    return json.dumps(extra, ensure_ascii=False, separators=(",", ":")) if extra else None
+
+
+def pad16(n):
+    return (n + 15) & ~15
+
+
+def as_le(arr):
+    if sys.byteorder != "little":
+        arr = array(arr.typecode, arr)
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def build(src=DATA_FILE, out=OUT_FILE):
+    meta = read_meta(src)
+    dim = int(meta.get("vector_dimension") or 12)
+    strings = StringTable()
+    place_vectors = array("f")
+    country_vectors = array("f")
+    country_table = array("I")
+    city_index = array("I")
+    place_table = array("I")
+    n_countries = 0
+    n_places = 0
+    country_start = 0
+
+    for country, place in walk_catalog(src):
+        if place is not None:
+            vec = list(place.get("tags_vector") or [])
+            if len(vec) != dim:
+                raise ValueError(f"place {place.get('place_id')}: tags_vector length {len(vec)} != {dim}")
+            place_vectors.extend(vec)
+            for field in PLACE_STRING_FIELDS:
+                place_table.append(strings.intern(place.get(field)))
+            place_table.append(n_countries)
+            place_table.append(strings.intern(extras_json(place, PLACE_KNOWN)))
+            n_places += 1
+            continue
+
+        vec = list(country.get("tags_vector") or [])
+        if len(vec) != dim:
+            raise ValueError(f"country {country.get('country_code')}: tags_vector length {len(vec)} != {dim}")
+        country_vectors.extend(vec)
+        for field in COUNTRY_STRING_FIELDS:
+            country_table.append(strings.intern(country.get(field)))
+        cities = country.get("top_seed_cities") or []
+        country_table.extend(
+            [
+                int(country.get("seed_place_count") or 0),
+                country_start,
+                n_places - country_start,
+                len(city_index),
+                len(cities),
+                strings.intern(extras_json(country, COUNTRY_KNOWN)),
+            ]
+        )
+        city_index.extend(strings.intern(c) for c in cities)
+        n_countries += 1
+        country_start = n_places
+
+    meta_sid = strings.intern(json.dumps(meta, ensure_ascii=False, separators=(",", ":")))
+    sections = [
+        as_le(place_vectors),
+        as_le(country_vectors),
+        as_le(country_table),
+        as_le(city_index),
+        as_le(place_table),
+        as_le(strings.offsets),
+        bytes(strings.data),
+    ]
+    offsets = []
+    pos = pad16(HEADER_STRUCT.size)
+    for blob in sections:
+        offsets.append(pos)
+        pos = pad16(pos + len(blob))
+
+    st = os.stat(src)
+    header = HEADER_STRUCT.pack(
+        MAGIC,
+        VERSION,
+        dim,
+        n_countries,
+        n_places,
+        len(strings.ids),
+        len(city_index),
+        meta_sid,
+        0,
+        st.st_size,
+        st.st_mtime_ns,
+        *offsets,
+    )
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    with tmp.open("wb") as f:
+        f.write(header)
+        for offset, blob in zip(offsets, sections):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(blob)
+    os.replace(tmp, out)
+    return {"countries": n_countries, "places": n_places, "strings": len(strings.ids), "bytes": out.stat().st_size}
+
+
+class CatalogBinary:
+    # read-only view over a built artifact; vectors and tables are zero-copy
+    # memoryviews into the mmap, strings are decoded on access
+    def __init__(self, path=OUT_FILE):
+        self.path = path
+        self.file = open(path, "rb")
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (
+            magic,
+            version,
+            self.dim,
+            self.n_countries,
+            self.n_places,
+            self.n_strings,
+            n_city_refs,
+            meta_sid,
+            _reserved,
+            self.source_size,
+            self.source_mtime_ns,
+            *offsets,
+        ) = HEADER_STRUCT.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"not a catalog binary: {path}")
+        if sys.byteorder != "little":
+            self.close()
+            raise ValueError("catalog binary reader requires a little-endian host")
+        view = memoryview(self.mm)
+        place_vec_off, country_vec_off, country_off, city_off, place_off, str_off, data_off = offsets
+        self.place_vectors = view[place_vec_off : place_vec_off + self.n_places * self.dim * 4].cast("f")
+        self.country_vectors = view[country_vec_off : country_vec_off + self.n_countries * self.dim * 4].cast("f")
+        self.country_table = view[country_off : country_off + self.n_countries * COUNTRY_FIELDS * 4].cast("I")
+        self.city_index = view[city_off : city_off + n_city_refs * 4].cast("I")
+        self.place_table = view[place_off : place_off + self.n_places * PLACE_FIELDS * 4].cast("I")
+        self.string_offsets = view[str_off : str_off + (self.n_strings + 1) * 4].cast("I")
+        self.string_data = view[data_off:]
+        self.meta = json.loads(self.string(meta_sid))
+
+    def string(self, sid):
+        if sid == NONE:
+            return None
+        start, end = self.string_offsets[sid], self.string_offsets[sid + 1]
+        return bytes(self.string_data[start:end]).decode("utf-8")
+
+    def place_vector(self, idx):
+        return self.place_vectors[idx * self.dim : (idx + 1) * self.dim]
+
+    def vector_matrix(self):
+        # (n_places, dim) float32 array when numpy is installed, else the flat memoryview
+        try:
+            import numpy as np
+        except ImportError:
+            return self.place_vectors
+        return np.frombuffer(self.place_vectors, dtype=np.float32).reshape(self.n_places, self.dim)
+
+    def country(self, idx, with_places=False):
+        base = idx * COUNTRY_FIELDS
+        row = self.country_table[base : base + COUNTRY_FIELDS].tolist()
+        n = len(COUNTRY_STRING_FIELDS)
+        out = {}
+        for field, sid in zip(COUNTRY_STRING_FIELDS, row[:n]):
+            if sid != NONE:
+                out[field] = self.string(sid)
+        seed_place_count, place_start, place_count, city_start, city_count, extras_sid = row[n:]
+        out["seed_place_count"] = seed_place_count
+        out["tags_vector"] = vector_values(self.country_vectors[idx * self.dim : (idx + 1) * self.dim])
+        out["top_seed_cities"] = [self.string(sid) for sid in self.city_index[city_start : city_start + city_count]]
+        if extras_sid != NONE:
+            out.update(json.loads(self.string(extras_sid)))
+        if with_places:
+            out["places"] = [self.place(i) for i in range(place_start, place_start + place_count)]
+        return out
+
+    def country_place_range(self, idx):
+        base = idx * COUNTRY_FIELDS + len(COUNTRY_STRING_FIELDS)
+        return self.country_table[base + 1], self.country_table[base + 2]
+
+    def place(self, idx):
+        base = idx * PLACE_FIELDS
+        row = self.place_table[base : base + PLACE_FIELDS].tolist()
+        n = len(PLACE_STRING_FIELDS)
+        out = {}
+        for field, sid in zip(PLACE_STRING_FIELDS, row[:n]):
+            if sid != NONE:
+                out[field] = self.string(sid)
+        out["tags_vector"] = vector_values(self.place_vector(idx))
+        if row[n + 1] != NONE:
+            out.update(json.loads(self.string(row[n + 1])))
+        return out
+
+    def place_country_index(self, idx):
+        return self.place_table[idx * PLACE_FIELDS + len(PLACE_STRING_FIELDS)]
+
+    def walk_catalog(self, start_country=0, end_country=None):
+        # same events as catalog_stream.walk_catalog, optionally for a slice of countries
+        end_country = self.n_countries if end_country is None else min(end_country, self.n_countries)
+        for ci in range(start_country, end_country):
+            country = self.country(ci)
+            start, count = self.country_place_range(ci)
+            for pi in range(start, start + count):
+                yield country, self.place(pi)
+            yield country, None
+
+    def iter_country_places(self):
+        for country, place in self.walk_catalog():
+            if place is not None:
+                yield country, place
+
+    def is_fresh(self, src=DATA_FILE):
+        try:
+            st = os.stat(src)
+        except OSError:
+            return False
+        return st.st_size == self.source_size and st.st_mtime_ns == self.source_mtime_ns
+
+    def close(self):
+        for name in ("place_vectors", "country_vectors", "country_table", "city_index", "place_table", "string_offsets", "string_data"):
+            view = getattr(self, name, None)
+            if view is not None:
+                view.release()
+        self.mm.close()
+        self.file.close()
+
+
+def vector_values(view):
+    # float32 keeps ~7 significant digits; round back to the decimal values the JSON carried
+    return [float(f"{v:.7g}") for v in view]
+
+
+def open_fresh(src=DATA_FILE, path=OUT_FILE):
+    if not path.exists():
+        return None
+    try:
+        catalog = CatalogBinary(path)
+    except (OSError, ValueError, struct.error):
+        return None
+    if not catalog.is_fresh(src):
+        catalog.close()
+        return None
+    return catalog
+
+
+def iter_country_places(src=DATA_FILE, path=OUT_FILE):
+    # drop-in for catalog_stream.iter_country_places: reads the binary when it is fresh
+    catalog = open_fresh(src, path) if USE_BINARY else None
+    if catalog is None:
+        yield from catalog_stream.iter_country_places(src)
+        return
+    try:
+        yield from catalog.iter_country_places()
+    finally:
+        catalog.close()
+
+
+def place_total(src=DATA_FILE, path=OUT_FILE):
+    catalog = open_fresh(src, path) if USE_BINARY else None
+    if catalog is None:
+        total = read_meta(src).get("total_places")
+        return total if isinstance(total, int) else sum(1 for _ in catalog_stream.iter_country_places(src))
+    try:
+        return catalog.n_places
+    finally:
+        catalog.close()
+
+
+def main():
+    if not DATA_FILE.exists():
+        raise SystemExit(f"missing data file: {DATA_FILE}")
+    stats = build()
+    print(f"catalog binary written: {OUT_FILE}")
+    print(
+        f"summary: countries={stats['countries']} places={stats['places']} "
+        f"strings={stats['strings']} bytes={stats['bytes']}"
+    )
+
+
+if __name__ == "__main__":
+    main()
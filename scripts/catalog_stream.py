@@ -0,0 +1,148 @@
+import json
+
+
+CHUNK_SIZE = 1 << 16
+WHITESPACE = " \t\r\n"
+
+
+class CatalogStreamError(ValueError):
+    pass
+
+
+class JsonStream:
+    # minimal pull reader over a text file: enough structure to walk
+    # {"countries": [{..., "places": [...]}, ...]} without loading the document
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        if self.eof:
+            return False
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos :] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch):
+        got = self.peek()
+        if got != ch:
+            raise CatalogStreamError(f"expected {ch!r}, got {got!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                obj, end = self.decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # a number/literal cut at the buffer edge decodes "successfully"; make sure it ended
+            if end >= len(self.buf) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return obj
+
+    def skip_comma(self, close):
+        ch = self.peek()
+        if ch == ",":
+            self.pos += 1
+            return True
+        if ch == close:
+            self.pos += 1
+            return False
+        raise CatalogStreamError(f"expected ',' or {close!r}, got {ch!r}")
+
+    def iter_object_keys(self):
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if not self.skip_comma("}"):
+                return
+
+    def iter_array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield
+            if not self.skip_comma("]"):
+                return
+
+
+def walk_catalog(path):
+    # yields (country, place) for every place in file order, then (country, None) once the
+    # country object is closed. the same country dict is shared by all of its places and
+    # only holds the fields read so far (in countries.v1.json every header field precedes
+    # "places", so it is complete by the first place).
+    with open(path, "r", encoding="utf-8") as f:
+        stream = JsonStream(f)
+        for key in stream.iter_object_keys():
+            if key != "countries":
+                stream.value()
+                continue
+            for _ in stream.iter_array():
+                country = {}
+                for ckey in stream.iter_object_keys():
+                    if ckey != "places":
+                        country[ckey] = stream.value()
+                        continue
+                    for _ in stream.iter_array():
+                        yield country, stream.value()
+                yield country, None
+
+
+def iter_country_places(path):
+    for country, place in walk_catalog(path):
+        if place is not None:
+            yield country, place
+
+
+def iter_countries(path, with_places=True):
+    # one country at a time; memory is bounded by the largest country, not the catalog
+    places = []
+    for country, place in walk_catalog(path):
+        if place is not None:
+            if with_places:
+                places.append(place)
+            continue
+        row = dict(country)
+        if with_places:
+            row["places"] = places
+        else:
+            row.pop("places", None)
+        places = []
+        yield row
+
+
+def read_meta(path):
+    with open(path, "r", encoding="utf-8") as f:
+        stream = JsonStream(f)
+        for key in stream.iter_object_keys():
+            if key == "meta":
+                return stream.value()
+            stream.value()
+    return {}
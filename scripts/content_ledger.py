@@ -0,0 +1,75 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+def input_fingerprint(*parts):
+    raw = json.dumps(parts, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def normalize_etag(etag):
+    return str(etag or "").strip().strip('"').lower()
+
+
+class ContentLedger:
+    # object key -> what produced it (input hash) and what was stored (sha256/md5 of the bytes).
+    # md5 doubles as the ETag R2 returns for single-part uploads.
+    def __init__(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS object_ledger (
+                    key TEXT PRIMARY KEY,
+                    input_hash TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    md5 TEXT NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+
+    def get(self, key):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT input_hash, sha256, md5, bytes FROM object_ledger WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"input_hash": row[0], "sha256": row[1], "md5": row[2], "bytes": row[3]}
+
+    def is_current(self, key, input_hash, remote_etag=None):
+        entry = self.get(key)
+        if entry is None or entry["input_hash"] != input_hash:
+            return False
+        if remote_etag is not None and normalize_etag(remote_etag) != entry["md5"]:
+            return False
+        return True
+
+    def record(self, key, input_hash, data, sha256=None, md5=None, size=None):
+        if data is not None:
+            sha256 = hashlib.sha256(data).hexdigest()
+            md5 = hashlib.md5(data).hexdigest()
+            size = len(data)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO object_ledger (key, input_hash, sha256, md5, bytes, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, input_hash, sha256, md5, size, time.time()),
+            )
+
+    def forget(self, key):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM object_ledger WHERE key = ?", (key,))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,20 +1,42 @@
+import asyncio
 import base64
+import hashlib
+import itertools
 import json
 import os
 import re
 import subprocess
 import sys
+import tempfile
+import threading
 import time
 import urllib.error
 import urllib.parse
-import urllib.request
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
 
+from asset_index import AssetIndex
+from async_http import AsyncHttpClient
+from catalog_binary import iter_country_places, place_total
+from content_ledger import ContentLedger, input_fingerprint
+from http_pool import HttpPool
+from ingest_metrics import IngestMetrics
+from manifest_store import ManifestStore
+from provider_rate_limit import ProviderBudget
+from query_plan import PLAN_FILE, build_query_profiles, ensure_plan, iter_with_plan, tokenize
+from search_cache import SearchCache, search_cache_key
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_FILE = ROOT / "data" / "countries.v1.json"
 RUNTIME_DIR = ROOT / "data" / "runtime"
 MANIFEST_FILE = RUNTIME_DIR / "image_ingest_manifest.v1.jsonl"
+MANIFEST_DB_FILE = RUNTIME_DIR / "image_ingest_manifest.v1.sqlite"
+LEDGER_FILE = RUNTIME_DIR / "object_ledger.v1.sqlite"
+ASSET_INDEX_FILE = RUNTIME_DIR / "asset_index.v1.sqlite"
+SEARCH_CACHE_FILE = RUNTIME_DIR / "provider_search_cache.v1.sqlite"
+METRICS_FILE = RUNTIME_DIR / "ingest_metrics.v1.jsonl"
 
 
 def load_env_file(path):
@@ -39,13 +61,61 @@ load_env_file(ROOT / ".env.example")
 BASE_URL = os.getenv("BACKEND_URL", "http://localhost:8787").rstrip("/")
 START_SERVER = os.getenv("START_SERVER", "1") == "1"
 MAX_PLACES = int(os.getenv("MAX_PLACES", "0") or "0")
-REQUEST_DELAY_MS = int(os.getenv("REQUEST_DELAY_MS", "180") or "180")
 PROVIDER_PRIORITY = [
     x.strip().lower()
     for x in os.getenv("PROVIDER_PRIORITY", "unsplash,pexels,pixabay").split(",")
     if x.strip()
 ]
 RESUME_FROM_MANIFEST = os.getenv("RESUME_FROM_MANIFEST", "1") == "1"
+MANIFEST_BACKEND = os.getenv("MANIFEST_BACKEND", "sqlite").strip().lower()
+MANIFEST_BATCH_SIZE = int(os.getenv("MANIFEST_BATCH_SIZE", "50") or "50")
+MANIFEST_COMPACT = os.getenv("MANIFEST_COMPACT", "0") == "1"
+MANIFEST_EXPORT_JSONL = os.getenv("MANIFEST_EXPORT_JSONL", "1") == "1"
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16") or "16")
+HTTP_TIMEOUT_SEC = float(os.getenv("HTTP_TIMEOUT_SEC", "45") or "45")
+SKIP_UNCHANGED = os.getenv("SKIP_UNCHANGED", "1") == "1"
+UPLOAD_MODE = os.getenv("UPLOAD_MODE", "raw").strip().lower()
+# raw uploads pipe the provider download straight into upload-raw in chunks instead of buffering it
+STREAM_TRANSFER = os.getenv("STREAM_TRANSFER", "1") == "1"
+STREAM_CHUNK_BYTES = max(4096, int(os.getenv("STREAM_CHUNK_KB", "64") or "64") * 1024)
+# downloads without Content-Length are spooled (memory up to this size, then a temp file)
+STREAM_SPOOL_BYTES = int(float(os.getenv("STREAM_SPOOL_MB", "2") or "2") * 1024 * 1024)
+# the backend rejects raw uploads over 25MB
+MAX_IMAGE_BYTES = int(float(os.getenv("MAX_IMAGE_MB", "24") or "24") * 1024 * 1024)
+# downscale + re-encode each original and add a thumbnail at a sibling key (needs Pillow);
+# decoding needs the whole body, so this replaces the streaming pass-through when enabled
+IMAGE_VARIANTS = os.getenv("IMAGE_VARIANTS", "0") == "1"
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "jpeg").strip().lower()
+IMAGE_MAX_WIDTH = int(os.getenv("IMAGE_MAX_WIDTH", "1600") or "1600")
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "82") or "82")
+THUMB_WIDTH = int(os.getenv("THUMB_WIDTH", "480") or "480")
+THUMB_QUALITY = int(os.getenv("THUMB_QUALITY", "75") or "75")
+IMAGE_WORKERS = max(1, int(os.getenv("IMAGE_WORKERS", "0") or "0") or (os.cpu_count() or 1))
+# places that pick an asset some earlier place already stored get a bucket-side copy instead of a transfer
+ASSET_DEDUP = os.getenv("ASSET_DEDUP", "1") == "1"
+# flag downloads whose dhash is within NEAR_DUP_DISTANCE bits (at most 3) of a picture another place stored;
+# they are still uploaded as-is, since copying the other photo would break the provider credits
+NEAR_DUP = os.getenv("NEAR_DUP", "0") == "1"
+NEAR_DUP_DISTANCE = int(os.getenv("NEAR_DUP_DISTANCE", "3") or "3")
+# score penalty for hits another place already used this run, so equally good unused hits win
+DEDUP_DIVERSIFY = os.getenv("DEDUP_DIVERSIFY", "0") == "1"
+DIVERSIFY_PENALTY = float(os.getenv("DIVERSIFY_PENALTY", "3") or "3")
+INGEST_WORKERS = max(1, int(os.getenv("INGEST_WORKERS", "1") or "1"))
+RESOLVE_MODE = os.getenv("RESOLVE_MODE", "serial").strip().lower()
+FANOUT_PROFILES = int(os.getenv("FANOUT_PROFILES", "3") or "3")
+FANOUT_WORKERS = max(1, int(os.getenv("FANOUT_WORKERS", "16") or "16"))
+RESOLVE_BUDGET_SEC = float(os.getenv("RESOLVE_BUDGET_SEC", "20") or "20")
+QUERY_PLAN = os.getenv("QUERY_PLAN", "1") == "1"
+# threads: INGEST_WORKERS blocking workers; async: one event loop with a bounded queue per stage
+INGEST_RUNNER = os.getenv("INGEST_RUNNER", "threads").strip().lower()
+ASYNC_SEARCH_CONCURRENCY = max(1, int(os.getenv("ASYNC_SEARCH_CONCURRENCY", "64") or "64"))
+ASYNC_DOWNLOAD_CONCURRENCY = max(1, int(os.getenv("ASYNC_DOWNLOAD_CONCURRENCY", "32") or "32"))
+ASYNC_UPLOAD_CONCURRENCY = max(1, int(os.getenv("ASYNC_UPLOAD_CONCURRENCY", "16") or "16"))
+ASYNC_QUEUE_SIZE = max(1, int(os.getenv("ASYNC_QUEUE_SIZE", "64") or "64"))
+ASYNC_HTTP_PER_HOST = max(1, int(os.getenv("ASYNC_HTTP_PER_HOST", "64") or "64"))
+INGEST_METRICS = os.getenv("INGEST_METRICS", "1") == "1"
+METRICS_INTERVAL_SEC = float(os.getenv("METRICS_INTERVAL_SEC", "30") or "30")
+CONFIDENT_MATCH_SCORE = 12
 
 PIXABAY_API_KEY = os.getenv("PIXABAY_API_KEY", "").strip()
 PEXELS_API_KEY = os.getenv("PEXELS_API_KEY", "").strip()
@@ -55,105 +125,32 @@ UNSPLASH_ACCESS_KEY = (
     or os.getenv("UNSPLASH_APP_ID", "").strip()
 )
 UNSPLASH_SECRET_KEY = os.getenv("UNSPLASH_SECRET_KEY", "").strip()
-
-SYNTHETIC_SUFFIXES = {
-    "old town quarter",
-    "national museum",
-    "art district",
-    "historic fortress",
-    "royal palace",
-    "temple complex",
-    "riverside walk",
-    "seaside promenade",
-    "city beach",
-    "island bay",
-    "mountain trail",
-    "national park",
-    "botanic garden",
-    "food street",
-    "street food alley",
-    "shopping avenue",
-    "designer mall",
-    "skyline observatory",
-    "modern marina",
-    "adventure park",
-    "diving point",
-    "surf beach",
-    "cultural village",
-    "heritage site",
-    "landmark plaza",
-    "old port",
-    "wine region",
-    "spa resort",
-    "desert camp",
-    "snow peak",
-}
-
-NAME_SUFFIX_HINTS = {
-    "old town quarter": ["old town", "historic center"],
-    "national museum": ["museum", "heritage"],
-    "art district": ["art", "gallery"],
-    "historic fortress": ["fortress", "castle"],
-    "royal palace": ["palace", "historic"],
-    "temple complex": ["temple", "shrine"],
-    "riverside walk": ["river", "waterfront"],
-    "seaside promenade": ["seaside", "coast"],
-    "city beach": ["beach", "coast"],
-    "island bay": ["bay", "island"],
-    "mountain trail": ["mountain", "hiking"],
-    "national park": ["national park", "nature"],
-    "botanic garden": ["garden", "nature"],
-    "food street": ["food market", "street food"],
-    "street food alley": ["street food", "market"],
-    "shopping avenue": ["shopping street", "market"],
-    "designer mall": ["shopping mall", "shopping"],
-    "skyline observatory": ["skyline", "city view"],
-    "modern marina": ["marina", "waterfront"],
-    "adventure park": ["adventure", "outdoor"],
-    "diving point": ["diving", "sea"],
-    "surf beach": ["surf", "beach"],
-    "cultural village": ["cultural village", "heritage"],
-    "heritage site": ["heritage", "historical"],
-    "landmark plaza": ["landmark", "architecture"],
-    "old port": ["port", "harbor"],
-    "wine region": ["vineyard", "countryside"],
-    "spa resort": ["resort", "spa"],
-    "desert camp": ["desert", "camp"],
-    "snow peak": ["snow mountain", "peak"],
-}
-
-STOPWORDS = {
-    "the",
-    "and",
-    "for",
-    "with",
-    "from",
-    "into",
-    "near",
-    "city",
-    "town",
-    "district",
-    "travel",
-    "destination",
-    "tourism",
-}
-
-TAG_HINTS = {
-    0: ["forest", "nature", "mountain"],
-    1: ["beach", "coast", "sea", "river"],
-    2: ["city", "downtown", "skyline"],
-    3: ["relax", "resort", "scenic"],
-    4: ["historical", "heritage", "temple", "museum"],
-    5: ["food", "market", "street food"],
-    6: ["night", "neon", "nightlife"],
-    7: ["hiking", "adventure", "outdoor"],
-    8: ["shopping", "mall", "market"],
-    9: ["luxury", "hotel"],
-    10: ["exotic", "tropical"],
-    11: ["landmark", "architecture", "monument"],
+# search endpoints; overridable so the pipeline can run against a local stand-in
+PIXABAY_API_URL = os.getenv("PIXABAY_API_URL", "https://pixabay.com/api/").strip()
+PEXELS_API_URL = os.getenv("PEXELS_API_URL", "https://api.pexels.com/v1/search").strip()
+UNSPLASH_API_URL = os.getenv("UNSPLASH_API_URL", "https://api.unsplash.com/search/photos").strip()
+
+# defaults follow each provider's free tier; raise them for approved/production keys
+PROVIDER_RATE_LIMITS = {
+    "unsplash": (
+        float(os.getenv("UNSPLASH_RATE_PER_SEC", "1") or "1"),
+        float(os.getenv("UNSPLASH_RATE_PER_HOUR", "50") or "50"),
+    ),
+    "pexels": (
+        float(os.getenv("PEXELS_RATE_PER_SEC", "2") or "2"),
+        float(os.getenv("PEXELS_RATE_PER_HOUR", "200") or "200"),
+    ),
+    "pixabay": (
+        float(os.getenv("PIXABAY_RATE_PER_SEC", "1.5") or "1.5"),
+        float(os.getenv("PIXABAY_RATE_PER_HOUR", "6000") or "6000"),
+    ),
 }
+RATE_LIMIT_MAX_RETRIES = int(os.getenv("RATE_LIMIT_MAX_RETRIES", "3") or "3")
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE", "1") == "1"
+SEARCH_CACHE_TTL_HOURS = float(os.getenv("SEARCH_CACHE_TTL_HOURS", "168") or "168")
+SEARCH_CACHE_MAX_MB = float(os.getenv("SEARCH_CACHE_MAX_MB", "256") or "256")
 
-BAD_IMAGE_TERMS = {
+BAD_IMAGE_TERMS = frozenset({
     "map",
     "illustration",
     "drawing",
@@ -164,30 +161,124 @@ BAD_IMAGE_TERMS = {
     "diagram",
     "chart",
     "icon",
+})
+# results requested per search; the best-scoring hit on the page wins, so a deeper page finds better matches
+# at the cost of a bigger response (clamped to each provider's own maximum)
+PROVIDER_PER_PAGE = int(os.getenv("PROVIDER_PER_PAGE", "8") or "8")
+PROVIDER_MAX_PER_PAGE = {"pixabay": 200, "pexels": 80, "unsplash": 30}
+
+
+PROVIDER_BUDGETS = {
+    name: ProviderBudget(name, per_sec, per_hour) for name, (per_sec, per_hour) in PROVIDER_RATE_LIMITS.items()
 }
 
 
-def http_json(method, url, payload=None, headers=None, timeout=45):
+HTTP_POOL = HttpPool(
+    max_per_host=HTTP_POOL_SIZE,
+    timeout=HTTP_TIMEOUT_SEC,
+    user_agent="wheretotravel-image-ingest/2.0",
+)
+# streamed uploads run while their download still holds a HTTP_POOL slot; when the image host and the
+# backend share an origin, drawing both from one pool deadlocks once every slot is a waiting download
+UPLOAD_POOL = HttpPool(
+    max_per_host=HTTP_POOL_SIZE,
+    timeout=HTTP_TIMEOUT_SEC,
+    user_agent="wheretotravel-image-ingest/2.0",
+)
+
+
+# in-memory until main() swaps in one that also streams to METRICS_FILE
+metrics = IngestMetrics()
+
+
+def http_json_response(method, url, payload=None, headers=None, timeout=None):
     data = None
     req_headers = dict(headers or {})
-    req_headers.setdefault("User-Agent", "wheretotravel-image-ingest/2.0")
     if payload is not None:
         data = json.dumps(payload).encode("utf-8")
         req_headers["Content-Type"] = "application/json"
-    req = urllib.request.Request(url, method=method, data=data, headers=req_headers)
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        body = resp.read().decode("utf-8")
-        return json.loads(body) if body else {}
+    resp = HTTP_POOL.request(method, url, body=data, headers=req_headers, timeout=timeout)
+    body = resp.body.decode("utf-8")
+    return (json.loads(body) if body else {}), resp.headers
 
 
-def http_bytes(url, headers=None, timeout=45):
-    req_headers = dict(headers or {})
-    req_headers.setdefault("User-Agent", "wheretotravel-image-ingest/2.0")
-    req = urllib.request.Request(url, method="GET", headers=req_headers)
-    with urllib.request.urlopen(req, timeout=timeout) as resp:
-        content_type = resp.headers.get("Content-Type", "")
-        body = resp.read()
-        return content_type, body
+def http_json(method, url, payload=None, headers=None, timeout=None):
+    data, _headers = http_json_response(method, url, payload=payload, headers=headers, timeout=timeout)
+    return data
+
+
+search_cache = None
+
+
+def open_search_cache():
+    global search_cache
+    if SEARCH_CACHE_ENABLED and search_cache is None:
+        search_cache = SearchCache(
+            SEARCH_CACHE_FILE,
+            ttl_sec=SEARCH_CACHE_TTL_HOURS * 3600.0,
+            max_bytes=int(SEARCH_CACHE_MAX_MB * 1024 * 1024),
+        )
+    return search_cache
+
+
+class SearchStopped(Exception):
+    pass
+
+
+def provider_get_json(provider, url, headers=None, stop=None):
+    if search_cache is None:
+        return fetch_provider_json(provider, url, headers=headers, stop=stop)
+    cache_key = search_cache_key(provider, url)
+    while True:
+        data, flight, leader = search_cache.lookup(cache_key)
+        if leader:
+            break
+        if flight is not None:
+            # the same query is already out for another place or fan-out task: share its answer
+            data = flight.result()
+            if data is None:
+                continue
+        metrics.count(provider, "cache_hits")
+        return data
+
+    try:
+        data = fetch_provider_json(provider, url, headers=headers, stop=stop)
+    except SearchStopped:
+        search_cache.settle(cache_key, flight)
+        raise
+    except Exception as ex:
+        search_cache.settle(cache_key, flight, error=ex)
+        raise
+    search_cache.settle(cache_key, flight, provider, data)
+    return data
+
+
+def fetch_provider_json(provider, url, headers=None, stop=None):
+    budget = PROVIDER_BUDGETS[provider]
+    attempt = 0
+    while True:
+        # a fan-out search still waiting for quota is dropped once its place is resolved or out of time
+        if not budget.acquire(stop):
+            raise SearchStopped(provider)
+        metrics.count(provider, "calls")
+        try:
+            resp = HTTP_POOL.request("GET", url, headers=headers)
+        except urllib.error.HTTPError as ex:
+            if ex.code != 429:
+                metrics.count(provider, "errors")
+                raise
+            metrics.count(provider, "rate_limited")
+            if attempt >= RATE_LIMIT_MAX_RETRIES:
+                raise
+            budget.on_429(ex.headers)
+            attempt += 1
+            continue
+        except Exception:
+            metrics.count(provider, "errors")
+            raise
+        metrics.count(provider, "bytes", len(resp.body))
+        budget.observe(resp.headers)
+        return json.loads(resp.body.decode("utf-8")) if resp.body else {}
 
 
 def request_api_json(method, path, payload=None):
@@ -211,164 +302,145 @@ def ensure_runtime_dir():
     RUNTIME_DIR.mkdir(parents=True, exist_ok=True)
 
 
+manifest_store = None
+
+
+def open_manifest_store():
+    global manifest_store
+    if MANIFEST_BACKEND == "sqlite" and manifest_store is None:
+        manifest_store = ManifestStore(MANIFEST_DB_FILE, batch_size=MANIFEST_BATCH_SIZE)
+        imported = manifest_store.import_jsonl(MANIFEST_FILE)
+        if imported:
+            print(f"manifest: imported {imported} rows from {MANIFEST_FILE}")
+    return manifest_store
+
+
+def close_manifest_store():
+    global manifest_store
+    if manifest_store is None:
+        return
+    if MANIFEST_COMPACT:
+        removed = manifest_store.compact()
+        print(f"manifest compacted: removed={removed} rows")
+    if MANIFEST_EXPORT_JSONL:
+        manifest_store.export_jsonl(MANIFEST_FILE)
+    manifest_store.close()
+    manifest_store = None
+
+
 def append_manifest(row):
+    if manifest_store is not None:
+        manifest_store.append(row)
+        return
     ensure_runtime_dir()
     with MANIFEST_FILE.open("a", encoding="utf-8") as f:
         f.write(json.dumps(row, ensure_ascii=False) + "\n")
 
 
 def load_uploaded_keys_from_manifest():
-    if not RESUME_FROM_MANIFEST or not MANIFEST_FILE.exists():
+    if not RESUME_FROM_MANIFEST:
+        return set()
+    if manifest_store is not None:
+        # indexed lookups; supports `key in ...` and len()
+        return manifest_store
+    if not MANIFEST_FILE.exists():
         return set()
     uploaded = set()
-    for raw in MANIFEST_FILE.read_text(encoding="utf-8").splitlines():
-        if not raw.strip():
-            continue
-        try:
-            row = json.loads(raw)
-        except Exception:
-            continue
-        if row.get("status") == "uploaded" and row.get("key"):
-            uploaded.add(row["key"])
+    with MANIFEST_FILE.open("r", encoding="utf-8") as f:
+        for raw in f:
+            if not raw.strip():
+                continue
+            try:
+                row = json.loads(raw)
+            except Exception:
+                continue
+            if row.get("status") == "uploaded" and row.get("key"):
+                uploaded.add(row["key"])
     return uploaded
 
 
-def tokenize(text):
-    tokens = re.findall(r"[a-z0-9]+", (text or "").lower())
-    out = []
-    for t in tokens:
-        if len(t) <= 2:
-            continue
-        if t in STOPWORDS:
-            continue
-        out.append(t)
-    return out
+class ProfileTerms:
+    # a profile's tokens as sets, built once per profile instead of once per candidate;
+    # multi-word tokens are matched against the candidate's n-grams
+    def __init__(self, required_tokens, optional_tokens):
+        self.required = frozenset(required_tokens)
+        self.optional = frozenset(optional_tokens)
+        self.has_required = bool(required_tokens)
+        self.max_n = max([1] + [len(token.split()) for token in self.required | self.optional])
 
 
-def unique_keep_order(items):
-    out = []
-    seen = set()
-    for x in items:
-        if x in seen:
-            continue
-        seen.add(x)
-        out.append(x)
-    return out
+def profile_terms(profile):
+    terms = profile.get("terms")
+    if terms is None:
+        terms = profile["terms"] = ProfileTerms(profile["required_tokens"], profile["optional_tokens"])
+    return terms
 
 
-def is_synthetic_name(place):
-    name = (place.get("name_en") or "").strip().lower()
-    city = (place.get("city") or "").strip().lower()
-    if not name:
-        return True
+def candidate_terms(text, max_n=1):
+    tokens = tokenize(text)
+    terms = set(tokens)
+    for n in range(2, max_n + 1):
+        terms.update(" ".join(tokens[i : i + n]) for i in range(len(tokens) - n + 1))
+    return terms
 
-    for suffix in SYNTHETIC_SUFFIXES:
-        if name.endswith(suffix):
-            return True
 
-    # very short "City + generic noun" shape is often synthetic in current seed
-    words = name.split()
-    if city and name.startswith(city + " ") and len(words) <= 4:
-        generic_terms = {"park", "beach", "mall", "walk", "museum", "palace", "port", "bay"}
-        if any(w in generic_terms for w in words):
-            return True
+def score_terms(index, area, text_terms, terms):
+    req = len(terms.required & text_terms)
+    opt = len(terms.optional & text_terms)
+    area_m = max(0.0, float(area) / 1_000_000.0)
+    rank_bonus = max(0, 5 - index)
+    score = req * 6.0 + opt * 2.0 + rank_bonus + min(area_m, 6.0)
+    if terms.has_required and req == 0:
+        score -= 2.5
+    if not BAD_IMAGE_TERMS.isdisjoint(text_terms):
+        score -= 4.0
+    return score, req, opt
 
-    return False
 
+def score_candidate(index, area, text, required_tokens, optional_tokens):
+    terms = ProfileTerms(required_tokens, optional_tokens)
+    return score_terms(index, area, candidate_terms(text, terms.max_n), terms)
 
-def top_tag_keywords(place, limit=2):
-    vec = place.get("tags_vector") or []
-    if not vec:
-        return []
-    indexed = list(enumerate(vec))
-    indexed.sort(key=lambda x: x[1], reverse=True)
-    kws = []
-    for idx, _score in indexed[:limit]:
-        kws.extend(TAG_HINTS.get(idx, []))
-    return unique_keep_order(kws)
-
-
-def name_suffix_keywords(place_name):
-    n = (place_name or "").strip().lower()
-    if not n:
-        return []
-    kws = []
-    for suffix, hints in NAME_SUFFIX_HINTS.items():
-        if n.endswith(suffix):
-            kws.extend(hints)
-    return unique_keep_order(kws)
-
-
-def build_query_profiles(place, country_name):
-    city = (place.get("city") or "").strip()
-    place_name = (place.get("name_en") or "").strip()
-    base = " ".join(x for x in [city, country_name] if x).strip()
-    if not base:
-        base = country_name.strip()
-
-    required_tokens = unique_keep_order(tokenize(f"{city} {country_name}"))
-    keyword_tokens = unique_keep_order(top_tag_keywords(place, limit=2) + name_suffix_keywords(place_name))
-
-    candidates = []
-    for kw in keyword_tokens[:2]:
-        candidates.append({"query": f"{base} {kw}", "strategy": f"city_country_semantic_{kw}"})
-    candidates.extend(
-        [
-            {"query": f"{base} travel", "strategy": "city_country_travel"},
-            {"query": f"{base} landmarks", "strategy": "city_country_landmarks"},
-            {"query": f"{base} tourism", "strategy": "city_country_tourism"},
-        ]
-    )
-    for kw in keyword_tokens[2:5]:
-        candidates.append({"query": f"{base} {kw}", "strategy": f"city_country_tag_{kw}"})
 
-    if place_name and not is_synthetic_name(place):
-        candidates.insert(0, {"query": f"{place_name} {country_name}".strip(), "strategy": "trusted_place_name"})
+def score_page(profile, page):
+    # page: [(rank, area, text), ...] for one provider response -> [(score, req, opt), ...]
+    terms = profile_terms(profile)
+    return [score_terms(rank, area, candidate_terms(text, terms.max_n), terms) for rank, area, text in page]
 
-    out = []
-    seen = set()
-    for row in candidates:
-        q = " ".join(row["query"].split())
-        if not q:
-            continue
-        qk = q.lower()
-        if qk in seen:
-            continue
-        seen.add(qk)
-        out.append(
-            {
-                "query": q,
-                "strategy": row["strategy"],
-                "required_tokens": required_tokens,
-                "optional_tokens": keyword_tokens,
-            }
-        )
-    return out
+
+def best_on_page(profile, page, penalties=None):
+    # index into `page` of the best-scoring hit (first one wins ties), with its (score, req, opt)
+    best = None
+    for pos, (score, req, opt) in enumerate(score_page(profile, page)):
+        if penalties:
+            score -= penalties[pos]
+        if best is None or round(score, 3) > round(best[1][0], 3):
+            best = (pos, (score, req, opt))
+    return best
 
 
-def text_match_score(text, required_tokens, optional_tokens):
-    t = " " + " ".join(tokenize(text)) + " "
-    req = sum(1 for token in required_tokens if f" {token} " in t)
-    opt = sum(1 for token in optional_tokens if f" {token} " in t)
-    return req, opt
+used_assets = set()
+used_assets_lock = threading.Lock()
 
 
-def score_candidate(index, area, text, required_tokens, optional_tokens):
-    t_tokens = tokenize(text)
-    req, opt = text_match_score(text, required_tokens, optional_tokens)
-    area_m = max(0.0, float(area) / 1_000_000.0)
-    rank_bonus = max(0, 5 - index)
-    score = req * 6.0 + opt * 2.0 + rank_bonus + min(area_m, 6.0)
-    if required_tokens and req == 0:
-        score -= 2.5
-    if any(term in t_tokens for term in BAD_IMAGE_TERMS):
-        score -= 4.0
-    return score, req, opt
+def mark_asset_used(provider, asset_id):
+    if DEDUP_DIVERSIFY:
+        with used_assets_lock:
+            used_assets.add((provider, asset_id))
 
 
-def query_pixabay(profile):
-    if not PIXABAY_API_KEY:
+def asset_penalties(provider, asset_ids):
+    if not DEDUP_DIVERSIFY:
         return None
+    with used_assets_lock:
+        return [DIVERSIFY_PENALTY if (provider, asset_id) in used_assets else 0.0 for asset_id in asset_ids]
+
+
+def provider_per_page(provider):
+    return max(3, min(PROVIDER_PER_PAGE, PROVIDER_MAX_PER_PAGE[provider]))
+
+
+def pixabay_search_request(profile):
     params = urllib.parse.urlencode(
         {
             "key": PIXABAY_API_KEY,
@@ -376,60 +448,66 @@ def query_pixabay(profile):
             "image_type": "photo",
             "orientation": "horizontal",
             "safesearch": "true",
-            "per_page": 8,
+            "per_page": provider_per_page("pixabay"),
         }
     )
-    url = f"https://pixabay.com/api/?{params}"
-    data = http_json("GET", url)
+    return f"{PIXABAY_API_URL}?{params}", None
+
+
+def pick_pixabay(data, profile):
     hits = data.get("hits") or []
     if not hits:
         return None
 
-    best = None
+    usable = []
+    page = []
     for idx, hit in enumerate(hits):
         image_url = hit.get("largeImageURL") or hit.get("webformatURL")
         if not image_url:
             continue
         area = (hit.get("imageWidth", 0) or 0) * (hit.get("imageHeight", 0) or 0)
         text = " ".join([str(hit.get("tags", "")), str(hit.get("type", "")), str(hit.get("user", ""))])
-        score, req, opt = score_candidate(
-            idx, area, text, profile["required_tokens"], profile["optional_tokens"]
-        )
-        cand = {
-            "provider": "pixabay",
-            "provider_asset_id": str(hit.get("id", "")),
-            "image_url": image_url,
-            "photographer_name": hit.get("user"),
-            "attribution_url": hit.get("pageURL"),
-            "license_label": "Pixabay License",
-            "match_score": round(score, 3),
-            "required_token_hits": req,
-            "optional_token_hits": opt,
-            "query": profile["query"],
-            "query_strategy": profile["strategy"],
-        }
-        if not best or cand["match_score"] > best["match_score"]:
-            best = cand
-    return best
+        usable.append((hit, image_url))
+        page.append((idx, area, text))
+    penalties = asset_penalties("pixabay", [str(hit.get("id", "")) for hit, _url in usable])
+    best = best_on_page(profile, page, penalties)
+    if best is None:
+        return None
+    pos, (score, req, opt) = best
+    hit, image_url = usable[pos]
+    return {
+        "provider": "pixabay",
+        "provider_asset_id": str(hit.get("id", "")),
+        "image_url": image_url,
+        "photographer_name": hit.get("user"),
+        "attribution_url": hit.get("pageURL"),
+        "license_label": "Pixabay License",
+        "match_score": round(score, 3),
+        "required_token_hits": req,
+        "optional_token_hits": opt,
+        "query": profile["query"],
+        "query_strategy": profile["strategy"],
+    }
 
 
-def query_pexels(profile):
-    if not PEXELS_API_KEY:
-        return None
+def pexels_search_request(profile):
     params = urllib.parse.urlencode(
         {
             "query": profile["query"],
-            "per_page": 8,
+            "per_page": provider_per_page("pexels"),
             "orientation": "landscape",
         }
     )
-    url = f"https://api.pexels.com/v1/search?{params}"
-    data = http_json("GET", url, headers={"Authorization": PEXELS_API_KEY})
+    return f"{PEXELS_API_URL}?{params}", {"Authorization": PEXELS_API_KEY}
+
+
+def pick_pexels(data, profile):
     photos = data.get("photos") or []
     if not photos:
         return None
 
-    best = None
+    usable = []
+    page = []
     for idx, photo in enumerate(photos):
         src = photo.get("src") or {}
         image_url = src.get("large2x") or src.get("large") or src.get("original")
@@ -437,53 +515,54 @@ def query_pexels(profile):
             continue
         area = (photo.get("width", 0) or 0) * (photo.get("height", 0) or 0)
         text = " ".join([str(photo.get("alt", "")), str(photo.get("photographer", ""))])
-        score, req, opt = score_candidate(
-            idx, area, text, profile["required_tokens"], profile["optional_tokens"]
-        )
-        cand = {
-            "provider": "pexels",
-            "provider_asset_id": str(photo.get("id", "")),
-            "image_url": image_url,
-            "photographer_name": photo.get("photographer"),
-            "attribution_url": photo.get("url"),
-            "license_label": "Pexels License",
-            "match_score": round(score, 3),
-            "required_token_hits": req,
-            "optional_token_hits": opt,
-            "query": profile["query"],
-            "query_strategy": profile["strategy"],
-        }
-        if not best or cand["match_score"] > best["match_score"]:
-            best = cand
-    return best
+        usable.append((photo, image_url))
+        page.append((idx, area, text))
+    penalties = asset_penalties("pexels", [str(photo.get("id", "")) for photo, _url in usable])
+    best = best_on_page(profile, page, penalties)
+    if best is None:
+        return None
+    pos, (score, req, opt) = best
+    photo, image_url = usable[pos]
+    return {
+        "provider": "pexels",
+        "provider_asset_id": str(photo.get("id", "")),
+        "image_url": image_url,
+        "photographer_name": photo.get("photographer"),
+        "attribution_url": photo.get("url"),
+        "license_label": "Pexels License",
+        "match_score": round(score, 3),
+        "required_token_hits": req,
+        "optional_token_hits": opt,
+        "query": profile["query"],
+        "query_strategy": profile["strategy"],
+    }
 
 
-def query_unsplash(profile):
-    if not UNSPLASH_ACCESS_KEY:
-        return None
+def unsplash_search_request(profile):
     params = urllib.parse.urlencode(
         {
             "query": profile["query"],
-            "per_page": 8,
+            "per_page": provider_per_page("unsplash"),
             "orientation": "landscape",
             "content_filter": "high",
             "client_id": UNSPLASH_ACCESS_KEY,
         }
     )
-    url = f"https://api.unsplash.com/search/photos?{params}"
-    data = http_json("GET", url)
+    return f"{UNSPLASH_API_URL}?{params}", None
+
+
+def pick_unsplash(data, profile):
     results = data.get("results") or []
     if not results:
         return None
 
-    best = None
+    usable = []
+    page = []
     for idx, item in enumerate(results):
         urls = item.get("urls") or {}
         image_url = urls.get("regular") or urls.get("full")
         if not image_url:
             continue
-        user = item.get("user") or {}
-        links = item.get("links") or {}
         area = (item.get("width", 0) or 0) * (item.get("height", 0) or 0)
         tag_titles = " ".join(str((tag.get("title") if isinstance(tag, dict) else tag) or "") for tag in (item.get("tags") or []))
         location = item.get("location") or {}
@@ -496,79 +575,1168 @@ def query_unsplash(profile):
                 tag_titles,
             ]
         )
-        score, req, opt = score_candidate(
-            idx, area, text, profile["required_tokens"], profile["optional_tokens"]
-        )
-        cand = {
-            "provider": "unsplash",
-            "provider_asset_id": str(item.get("id", "")),
-            "image_url": image_url,
-            "photographer_name": user.get("name"),
-            "attribution_url": links.get("html"),
-            "license_label": "Unsplash License",
-            "match_score": round(score, 3),
-            "required_token_hits": req,
-            "optional_token_hits": opt,
-            "query": profile["query"],
-            "query_strategy": profile["strategy"],
-        }
-        if not best or cand["match_score"] > best["match_score"]:
-            best = cand
-    return best
+        usable.append((item, image_url))
+        page.append((idx, area, text))
+    penalties = asset_penalties("unsplash", [str(item.get("id", "")) for item, _url in usable])
+    best = best_on_page(profile, page, penalties)
+    if best is None:
+        return None
+    pos, (score, req, opt) = best
+    item, image_url = usable[pos]
+    user = item.get("user") or {}
+    links = item.get("links") or {}
+    return {
+        "provider": "unsplash",
+        "provider_asset_id": str(item.get("id", "")),
+        "image_url": image_url,
+        "photographer_name": user.get("name"),
+        "attribution_url": links.get("html"),
+        "license_label": "Unsplash License",
+        "match_score": round(score, 3),
+        "required_token_hits": req,
+        "optional_token_hits": opt,
+        "query": profile["query"],
+        "query_strategy": profile["strategy"],
+    }
+
+
+def enabled_providers():
+    enabled = []
+    if PIXABAY_API_KEY:
+        enabled.append("pixabay")
+    if PEXELS_API_KEY:
+        enabled.append("pexels")
+    if UNSPLASH_ACCESS_KEY:
+        enabled.append("unsplash")
+    return enabled
 
 
-def provider_search(provider, profile):
-    if provider == "pixabay":
-        return query_pixabay(profile)
-    if provider == "pexels":
-        return query_pexels(profile)
-    if provider == "unsplash":
-        return query_unsplash(profile)
-    return None
+# provider -> (api key, build the search request, pick the best candidate from its response);
+# the blocking and the async runner share everything but the HTTP call
+PROVIDER_SEARCH = {
+    "pixabay": (PIXABAY_API_KEY, pixabay_search_request, pick_pixabay),
+    "pexels": (PEXELS_API_KEY, pexels_search_request, pick_pexels),
+    "unsplash": (UNSPLASH_ACCESS_KEY, unsplash_search_request, pick_unsplash),
+}
+
+
+def provider_search(provider, profile, timings=None, stop=None):
+    api_key, build_request, pick = PROVIDER_SEARCH.get(provider, (None, None, None))
+    if not api_key:
+        return None
+    with metrics.timed(f"search.{provider}", timings):
+        url, headers = build_request(profile)
+        return pick(provider_get_json(provider, url, headers=headers, stop=stop), profile)
+
 
+def search_error(provider, profile, ex):
+    if isinstance(ex, urllib.error.HTTPError):
+        return f"{provider}:{profile['query']}:HTTP{ex.code}"
+    return f"{provider}:{profile['query']}:{type(ex).__name__}"
+
+
+def resolve_image_meta(place, country_name, profiles=None, timings=None):
+    if profiles is None:
+        profiles = build_query_profiles(place, country_name)
+    if RESOLVE_MODE == "fanout":
+        return resolve_image_meta_fanout(profiles, timings)
 
-def resolve_image_meta(place, country_name):
-    profiles = build_query_profiles(place, country_name)
     errors = []
     best = None
 
     for provider in PROVIDER_PRIORITY:
         for profile in profiles:
             try:
-                meta = provider_search(provider, profile)
+                meta = provider_search(provider, profile, timings)
                 if not meta:
                     continue
                 if not best or meta["match_score"] > best["match_score"]:
                     best = meta
                 # enough confidence, stop early
-                if meta["match_score"] >= 12:
+                if meta["match_score"] >= CONFIDENT_MATCH_SCORE:
                     return meta, errors
-            except urllib.error.HTTPError as ex:
-                errors.append(f"{provider}:{profile['query']}:HTTP{ex.code}")
             except Exception as ex:
-                errors.append(f"{provider}:{profile['query']}:{type(ex).__name__}")
-            time.sleep(REQUEST_DELAY_MS / 1000.0)
+                errors.append(search_error(provider, profile, ex))
     return best, errors
 
 
-def upload_binary(key, content_type, raw_bytes):
+fanout_pool = None
+fanout_pool_lock = threading.Lock()
+
+
+def get_fanout_pool():
+    global fanout_pool
+    with fanout_pool_lock:
+        if fanout_pool is None:
+            fanout_pool = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="fanout")
+        return fanout_pool
+
+
+def fanout_search(stop, provider, profile, timings=None):
+    # a confident match elsewhere may have landed while this task was queued
+    if stop.is_set():
+        return None
+    try:
+        return provider_search(provider, profile, timings, stop)
+    except SearchStopped:
+        metrics.count(provider, "searches_dropped")
+        return None
+
+
+def resolve_image_meta_fanout(profiles, timings=None):
+    providers = [p for p in PROVIDER_PRIORITY if p in enabled_providers()]
+    errors = []
+    best = None
+    stop = threading.Event()
+    deadline = time.monotonic() + RESOLVE_BUDGET_SEC
+    pool = get_fanout_pool()
+
+    # profiles go out in waves of FANOUT_PROFILES; every provider gets each wave at once
+    for start in range(0, len(profiles), max(1, FANOUT_PROFILES)):
+        wave = profiles[start : start + max(1, FANOUT_PROFILES)]
+        pending = {}
+        for profile in wave:
+            for provider in providers:
+                pending[pool.submit(fanout_search, stop, provider, profile, timings)] = (provider, profile)
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            finished, _ = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                provider, profile = pending.pop(fut)
+                try:
+                    meta = fut.result()
+                except Exception as ex:
+                    errors.append(search_error(provider, profile, ex))
+                    continue
+                if meta and (not best or meta["match_score"] > best["match_score"]):
+                    best = meta
+            if best and best["match_score"] >= CONFIDENT_MATCH_SCORE:
+                break
+
+        if pending:
+            # queued searches are dropped; in-flight ones finish in the background and are ignored
+            stop.set()
+            for fut in pending:
+                fut.cancel()
+        if best and best["match_score"] >= CONFIDENT_MATCH_SCORE:
+            return best, errors
+        if time.monotonic() >= deadline:
+            errors.append(f"resolve budget exceeded ({RESOLVE_BUDGET_SEC}s)")
+            return best, errors
+    return best, errors
+
+
+def http_post_bytes(url, body, content_type, timeout=60):
+    req_headers = {"Content-Type": content_type, "Content-Length": str(len(body))}
+    resp = HTTP_POOL.request("POST", url, body=body, headers=req_headers, timeout=timeout)
+    data = resp.body.decode("utf-8")
+    return json.loads(data) if data else {}
+
+
+def upload_request(key, content_type, raw_bytes):
+    # (url, body, body content-type) for the configured UPLOAD_MODE
+    content_type = content_type or "application/octet-stream"
+    if UPLOAD_MODE == "raw":
+        query = urllib.parse.urlencode({"key": key})
+        return f"{BASE_URL}/api/r2/upload-raw?{query}", raw_bytes, content_type
     payload = {
         "key": key,
         "content_base64": base64.b64encode(raw_bytes).decode("ascii"),
-        "content_type": content_type or "application/octet-stream",
+        "content_type": content_type,
     }
-    return request_api_json("POST", "/api/r2/upload-base64", payload)
+    return f"{BASE_URL}/api/r2/upload-base64", json.dumps(payload).encode("utf-8"), "application/json"
+
+
+def upload_binary(key, content_type, raw_bytes):
+    url, body, body_type = upload_request(key, content_type, raw_bytes)
+    return http_post_bytes(url, body, body_type)
+
+
+class ImageRejected(ValueError):
+    pass
+
+
+class TransferDigest:
+    # size and hashes of a body as it passes through, failing once it exceeds the limit
+    def __init__(self, limit=MAX_IMAGE_BYTES):
+        self.limit = limit
+        self.size = 0
+        self.sha256 = hashlib.sha256()
+        self.md5 = hashlib.md5()
+
+    def wrap(self, chunks):
+        for chunk in chunks:
+            self.size += len(chunk)
+            if self.size > self.limit:
+                raise ImageRejected(f"image larger than {self.limit} bytes")
+            self.sha256.update(chunk)
+            self.md5.update(chunk)
+            yield chunk
+
+
+def check_image_headers(headers):
+    ctype = headers.get("Content-Type", "")
+    if not ctype.startswith("image/"):
+        raise ImageRejected(f"downloaded non-image content-type: {ctype}")
+    length = headers.get("Content-Length")
+    length = int(length) if length and length.strip().isdigit() else None
+    if length is not None and length > MAX_IMAGE_BYTES:
+        raise ImageRejected(f"image larger than {MAX_IMAGE_BYTES} bytes ({length})")
+    return ctype, length
+
+
+def upload_stream(key, content_type, chunks, length):
+    query = urllib.parse.urlencode({"key": key})
+    req_headers = {"Content-Type": content_type, "Content-Length": str(length)}
+    resp = UPLOAD_POOL.request(
+        "POST", f"{BASE_URL}/api/r2/upload-raw?{query}", body=chunks, headers=req_headers, timeout=60
+    )
+    data = resp.body.decode("utf-8")
+    return json.loads(data) if data else {}
+
+
+def stream_image_to_r2(key, image_url):
+    # at most one chunk of the image is in memory: the response body is read and forwarded piecewise
+    digest = TransferDigest()
+    with HTTP_POOL.stream("GET", image_url) as resp:
+        ctype, length = check_image_headers(resp.headers)
+        chunks = digest.wrap(resp.iter_chunks(STREAM_CHUNK_BYTES))
+        if length is not None:
+            upload_stream(key, ctype, chunks, length)
+        else:
+            # upload-raw needs Content-Length up front
+            with tempfile.SpooledTemporaryFile(max_size=STREAM_SPOOL_BYTES) as spool:
+                for chunk in chunks:
+                    spool.write(chunk)
+                spool.seek(0)
+                upload_stream(key, ctype, iter(lambda: spool.read(STREAM_CHUNK_BYTES), b""), digest.size)
+    return ctype, digest
+
+
+def bytes_digest(data):
+    digest = TransferDigest()
+    for _chunk in digest.wrap([data]):
+        pass
+    return digest
+
+
+class Transfer:
+    # what one place ended up storing: the main object, plus the thumbnail when variants are on
+    def __init__(self, content_type, sha256, md5, size, original_bytes):
+        self.content_type = content_type
+        self.sha256 = sha256
+        self.md5 = md5
+        self.size = size
+        # bytes downloaded from the provider; 0 when the object was copied inside the bucket
+        self.original_bytes = original_bytes
+        self.width = None
+        self.height = None
+        self.thumb_key = None
+        self.thumb_sha256 = None
+        self.thumb_md5 = None
+        self.thumb_size = None
+        self.dhash = None
+        self.reused_from = None
+        self.dedup = None
+        self.near_duplicate_of = None
+        self.near_duplicate_bits = None
+
+    def set_thumb(self, key, digest):
+        self.thumb_key = key
+        self.thumb_sha256 = digest.sha256.hexdigest()
+        self.thumb_md5 = digest.md5.hexdigest()
+        self.thumb_size = digest.size
+
+    def index_entry(self):
+        return {
+            "content_type": self.content_type,
+            "sha256": self.sha256,
+            "md5": self.md5,
+            "bytes": self.size,
+            "thumb_key": self.thumb_key,
+            "thumb_sha256": self.thumb_sha256,
+            "thumb_md5": self.thumb_md5,
+            "thumb_bytes": self.thumb_size,
+            "width": self.width,
+            "height": self.height,
+            "dhash": self.dhash,
+        }
+
+
+def digest_transfer(content_type, digest, original_bytes):
+    return Transfer(content_type, digest.sha256.hexdigest(), digest.md5.hexdigest(), digest.size, original_bytes)
+
+
+VARIANT_CONTENT_TYPE = "image/webp" if IMAGE_FORMAT == "webp" else "image/jpeg"
+VARIANT_EXT = "webp" if IMAGE_FORMAT == "webp" else "jpg"
+# what the stored bytes depend on besides the provider asset
+VARIANT_SIGNATURE = (
+    f"variants:{IMAGE_FORMAT}:{IMAGE_MAX_WIDTH}:{IMAGE_QUALITY}:{THUMB_WIDTH}:{THUMB_QUALITY}"
+    if IMAGE_VARIANTS
+    else "original"
+)
+variant_pool = None
+variant_pool_lock = threading.Lock()
+
+
+def thumb_object_key(key):
+    return f"{key.rsplit('.', 1)[0]}.thumb.{VARIANT_EXT}"
+
+
+def get_variant_pool():
+    global variant_pool
+    with variant_pool_lock:
+        if variant_pool is None:
+            variant_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+        return variant_pool
+
+
+def submit_variants(data):
+    # resize/encode is cpu-bound, so it runs in worker processes rather than the ingest threads
+    from image_variants import build_variants
+
+    return get_variant_pool().submit(
+        build_variants, data, IMAGE_MAX_WIDTH, THUMB_WIDTH, IMAGE_FORMAT, IMAGE_QUALITY, THUMB_QUALITY
+    )
+
+
+def submit_dhash(data):
+    from image_variants import image_dhash
+
+    return get_variant_pool().submit(image_dhash, data)
+
+
+def variant_uploads(key, original_bytes, variants):
+    # -> (Transfer, [(key, content_type, data), ...]); the main image keeps the key the web app builds
+    transfer = digest_transfer(VARIANT_CONTENT_TYPE, bytes_digest(variants["main"]), original_bytes)
+    transfer.width = variants["width"]
+    transfer.height = variants["height"]
+    transfer.dhash = variants["dhash"]
+    transfer.set_thumb(thumb_object_key(key), bytes_digest(variants["thumb"]))
+    uploads = [
+        (key, VARIANT_CONTENT_TYPE, variants["main"]),
+        (transfer.thumb_key, VARIANT_CONTENT_TYPE, variants["thumb"]),
+    ]
+    return transfer, uploads
+
+
+def download_image(image_url, provider, timings):
+    try:
+        with metrics.timed("download", timings):
+            resp = HTTP_POOL.request("GET", image_url)
+    except Exception:
+        metrics.count(provider, "download_errors")
+        raise
+    check_image_headers(resp.headers)
+    if len(resp.body) > MAX_IMAGE_BYTES:
+        raise ImageRejected(f"image larger than {MAX_IMAGE_BYTES} bytes")
+    return resp
+
+
+def buffered_image_to_r2(key, image_url, provider, timings):
+    resp = download_image(image_url, provider, timings)
+    if IMAGE_VARIANTS:
+        with metrics.timed("resize", timings):
+            variants = submit_variants(resp.body).result()
+        transfer, uploads = variant_uploads(key, len(resp.body), variants)
+    else:
+        ctype = resp.headers.get("Content-Type", "")
+        transfer = digest_transfer(ctype, bytes_digest(resp.body), len(resp.body))
+        if NEAR_DUP and asset_index is not None:
+            with metrics.timed("resize", timings):
+                transfer.dhash = submit_dhash(resp.body).result()
+        uploads = [(key, ctype, resp.body)]
+    entry, reason = stored_match(key, transfer)
+    if entry is not None:
+        copied = copy_stored(key, entry, timings)
+        if copied is not None:
+            return downloaded_copy(copied, transfer, reason)
+    flag_near_duplicate(key, transfer, provider)
+    try:
+        with metrics.timed("upload", timings):
+            for upload_key, ctype, data in uploads:
+                upload_binary(upload_key, ctype, data)
+    except Exception:
+        metrics.count("r2", "errors")
+        raise
+    return transfer
+
+
+def transfer_image(key, meta, timings):
+    provider = meta.get("provider")
+    if STREAM_TRANSFER and UPLOAD_MODE == "raw" and not IMAGE_VARIANTS and not NEAR_DUP:
+        try:
+            with metrics.timed("transfer", timings):
+                ctype, digest = stream_image_to_r2(key, meta["image_url"])
+        except Exception:
+            metrics.count(provider, "transfer_errors")
+            raise
+        transfer = digest_transfer(ctype, digest, digest.size)
+    else:
+        transfer = buffered_image_to_r2(key, meta["image_url"], provider, timings)
+    count_transfer(provider, transfer)
+    return transfer
+
+
+def count_transfer(provider, transfer):
+    if transfer.original_bytes:
+        metrics.count(provider, "downloads")
+        metrics.count(provider, "download_bytes", transfer.original_bytes)
+    objects = 2 if transfer.thumb_key else 1
+    if transfer.reused_from:
+        metrics.count("r2", "copies", objects)
+        metrics.count(provider, f"dedup_{transfer.dedup.split(':')[0]}")
+        return
+    metrics.count("r2", "calls", objects)
+    metrics.count("r2", "bytes", transfer.size + (transfer.thumb_size or 0))
+
+
+def record_transfer(row, key, asset_hash, transfer):
+    if ledger is not None:
+        for object_key, sha256, md5, size in (
+            (key, transfer.sha256, transfer.md5, transfer.size),
+            (transfer.thumb_key, transfer.thumb_sha256, transfer.thumb_md5, transfer.thumb_size),
+        ):
+            if object_key:
+                ledger.record(object_key, asset_hash, None, sha256=sha256, md5=md5, size=size)
+    row["status"] = "uploaded"
+    row["bytes"] = transfer.size
+    row["content_type"] = transfer.content_type
+    if transfer.thumb_key:
+        row["original_bytes"] = transfer.original_bytes
+        row["width"] = transfer.width
+        row["height"] = transfer.height
+        row["thumb_key"] = transfer.thumb_key
+        row["thumb_url"] = object_public_url(transfer.thumb_key)
+        row["thumb_bytes"] = transfer.thumb_size
+    if transfer.reused_from:
+        row["reused_from"] = transfer.reused_from
+        row["dedup"] = transfer.dedup
+    if transfer.near_duplicate_of:
+        row["near_duplicate_of"] = transfer.near_duplicate_of
+        row["near_duplicate_bits"] = transfer.near_duplicate_bits
+
+
+asset_index = None
+asset_claims = {}
+asset_claims_lock = threading.Lock()
+
+
+def asset_identity(meta):
+    return meta.get("provider"), str(meta.get("provider_asset_id") or ""), VARIANT_SIGNATURE
+
+
+def claim_asset(asset):
+    # the first place needing an asset transfers it; places picking it meanwhile wait on the
+    # returned future and then copy, instead of racing to download the same bytes
+    with asset_claims_lock:
+        claim = asset_claims.get(asset)
+        if claim is not None:
+            return claim, False
+        claim = asset_claims[asset] = Future()
+        return claim, True
+
+
+def release_asset(asset, claim):
+    with asset_claims_lock:
+        asset_claims.pop(asset, None)
+    claim.set_result(None)
+
+
+def index_transfer(asset, key, transfer):
+    if asset_index is not None and asset[1]:
+        asset_index.record(*asset, key, transfer.index_entry())
+
+
+def stored_match(key, transfer):
+    # an object already holding exactly these bytes -> (entry, reason)
+    if asset_index is None:
+        return None, None
+    entry = asset_index.find_content(VARIANT_SIGNATURE, transfer.sha256, exclude_key=key)
+    if entry is not None:
+        return entry, "content"
+    return None, None
+
+
+def flag_near_duplicate(key, transfer, provider):
+    # a different photo that looks the same: keep this one (and its credits), only record the overlap
+    if asset_index is None or not NEAR_DUP or transfer.dhash is None:
+        return
+    entry, distance = asset_index.find_near(VARIANT_SIGNATURE, transfer.dhash, NEAR_DUP_DISTANCE, exclude_key=key)
+    if entry is not None:
+        transfer.near_duplicate_of = entry["key"]
+        transfer.near_duplicate_bits = distance
+        metrics.count(provider, "near_duplicates")
+
+
+def copy_pairs(key, entry):
+    pairs = [(entry["key"], key)]
+    if entry["thumb_key"]:
+        pairs.append((entry["thumb_key"], thumb_object_key(key)))
+    return pairs
+
+
+def stored_transfer(key, entry, reason):
+    transfer = Transfer(entry["content_type"], entry["sha256"], entry["md5"], entry["bytes"], 0)
+    transfer.width = entry["width"]
+    transfer.height = entry["height"]
+    transfer.dhash = entry["dhash"]
+    if entry["thumb_key"]:
+        transfer.thumb_key = thumb_object_key(key)
+        transfer.thumb_sha256 = entry["thumb_sha256"]
+        transfer.thumb_md5 = entry["thumb_md5"]
+        transfer.thumb_size = entry["thumb_bytes"]
+    transfer.reused_from = entry["key"]
+    transfer.dedup = reason
+    return transfer
+
+
+def downloaded_copy(copied, transfer, reason):
+    # content matches are only found after the download, so that part still counts
+    copied.original_bytes = transfer.original_bytes
+    copied.dedup = reason
+    return copied
+
+
+def copy_source_gone(entry, ex):
+    if isinstance(ex, urllib.error.HTTPError) and ex.code == 404:
+        # deleted from the bucket since it was indexed; transfer normally from now on
+        asset_index.forget_key(entry["key"])
+        return True
+    metrics.count("r2", "errors")
+    return False
+
+
+def copy_stored(key, entry, timings, reason="asset"):
+    # -> Transfer for `key` copied from `entry`, or None when the source object is gone
+    try:
+        with metrics.timed("copy", timings):
+            for source_key, target_key in copy_pairs(key, entry):
+                http_json("POST", f"{BASE_URL}/api/r2/copy", {"source_key": source_key, "key": target_key})
+    except Exception as ex:
+        if copy_source_gone(entry, ex):
+            return None
+        raise
+    return stored_transfer(key, entry, reason)
+
+
+def dedup_transfer(key, meta, timings):
+    if asset_index is None:
+        return transfer_image(key, meta, timings)
+    asset = asset_identity(meta)
+    claim, owner = claim_asset(asset)
+    try:
+        if not owner:
+            with metrics.timed("dedup_wait", timings):
+                claim.result()
+        entry = asset_index.get(*asset)
+        if entry is not None and entry["key"] != key:
+            transfer = copy_stored(key, entry, timings)
+            if transfer is not None:
+                count_transfer(meta.get("provider"), transfer)
+                return transfer
+        transfer = transfer_image(key, meta, timings)
+        index_transfer(asset, key, transfer)
+        return transfer
+    finally:
+        if owner:
+            release_asset(asset, claim)
 
 
 def flatten_places(countries):
-    out = []
     for country in countries:
         for place in country.get("places", []):
-            out.append((country, place))
-    return out
+            yield country, place
+
+
+def iter_catalog_places():
+    rows = iter_country_places(DATA_FILE)
+    if MAX_PLACES > 0:
+        rows = itertools.islice(rows, MAX_PLACES)
+    return rows
+
+
+def catalog_place_total():
+    total = place_total(DATA_FILE)
+    return min(total, MAX_PLACES) if MAX_PLACES > 0 else total
+
+
+def iter_planned_places():
+    # (country, place, profiles); profiles come from the precomputed query plan when enabled
+    rows = iter_catalog_places()
+    if not QUERY_PLAN:
+        return ((country, place, None) for country, place in rows)
+    return iter_with_plan(rows, PLAN_FILE)
+
+
+def iter_ingest_jobs(rows, already_uploaded, counts):
+    for idx, (country, place, profiles) in enumerate(rows, start=1):
+        key = place_object_key(country, place)
+        if key in already_uploaded:
+            counts["skipped"] += 1
+            continue
+        yield idx, country, place, key, profiles
+
+
+ledger = None
+
+
+def place_object_key(country, place):
+    # always the .jpg key app.js and /img build; a webp variant is served by its Content-Type
+    return f"images/placeholders/{country.get('country_code')}/{place.get('place_id')}.jpg"
+
+
+public_base_url = None
+
+
+def resolve_public_base_url():
+    # the backend owns the bucket's public URL layout; ask it once for a probe key and keep the prefix
+    global public_base_url
+    probe = "probe"
+    try:
+        url = request_api_json("GET", f"/api/r2/public-url?{urllib.parse.urlencode({'key': probe})}").get("url") or ""
+    except Exception:
+        url = ""
+    if url.endswith(f"/{probe}"):
+        public_base_url = url[: -len(probe) - 1]
+    return public_base_url
+
+
+def object_public_url(key):
+    if public_base_url is None:
+        return None
+    return f"{public_base_url}/{key}"
+
+
+def new_place_row(idx, total, country, place, key):
+    return {
+        "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "index": idx,
+        "total": total,
+        "country_code": country.get("country_code"),
+        "place_id": place.get("place_id"),
+        "place_name_en": place.get("name_en"),
+        "key": key,
+        "status": "failed",
+    }
+
+
+def country_display_name(country):
+    return country.get("country_name_en") or country.get("country_code")
+
+
+def place_profiles(country, place, profiles, timings):
+    if profiles is None:
+        with metrics.timed("profiles", timings):
+            profiles = build_query_profiles(place, country_display_name(country))
+    return profiles
+
+
+def check_ledger(row, key, meta):
+    # returns the asset hash, or None after filling `row` when the same provider asset is already stored
+    parts = ["provider-asset", meta.get("provider"), meta.get("provider_asset_id")]
+    if IMAGE_VARIANTS:
+        # new variant settings re-process every asset once
+        parts.append(VARIANT_SIGNATURE)
+    asset_hash = input_fingerprint(*parts)
+    if ledger is not None and ledger.is_current(key, asset_hash):
+        entry = ledger.get(key)
+        row["status"] = "uploaded"
+        row["unchanged"] = True
+        row["bytes"] = entry["bytes"]
+        if IMAGE_VARIANTS:
+            row["thumb_key"] = thumb_object_key(key)
+            row["thumb_url"] = object_public_url(row["thumb_key"])
+        fill_meta_fields(row, meta)
+        mark_asset_used(meta.get("provider"), str(meta.get("provider_asset_id") or ""))
+        return None
+    return asset_hash
+
+
+def place_error(ex):
+    if isinstance(ex, ImageRejected):
+        return str(ex)
+    if isinstance(ex, urllib.error.HTTPError):
+        return f"HTTPError {ex.code}"
+    return f"{type(ex).__name__}: {ex}"
+
+
+def finish_place_row(row, timings, started):
+    metrics.observe("place", (time.perf_counter() - started) * 1000.0, timings)
+    # copied: fanout searches abandoned by this place can still report into `timings`
+    row["timings_ms"] = metrics.copy_timings(timings)
+    return row
+
+
+def ingest_place(idx, total, country, place, key, profiles=None):
+    row = new_place_row(idx, total, country, place, key)
+    timings = {}
+    started = time.perf_counter()
+
+    try:
+        profiles = place_profiles(country, place, profiles, timings)
+        meta, errors = resolve_image_meta(place, country_display_name(country), profiles, timings)
+        if not meta:
+            row["errors"] = errors[:10]
+            return row
+
+        asset_hash = check_ledger(row, key, meta)
+        if asset_hash is None:
+            return row
+
+        record_transfer(row, key, asset_hash, dedup_transfer(key, meta, timings))
+        fill_meta_fields(row, meta)
+        mark_asset_used(meta.get("provider"), str(meta.get("provider_asset_id") or ""))
+    except Exception as ex:
+        row["errors"] = [place_error(ex)]
+    finally:
+        finish_place_row(row, timings, started)
+    return row
+
+
+def fill_meta_fields(row, meta):
+    row["provider"] = meta.get("provider")
+    row["provider_asset_id"] = meta.get("provider_asset_id")
+    row["provider_query"] = meta.get("query")
+    row["query_strategy"] = meta.get("query_strategy")
+    row["match_score"] = meta.get("match_score")
+    row["required_token_hits"] = meta.get("required_token_hits")
+    row["optional_token_hits"] = meta.get("optional_token_hits")
+    row["attribution_url"] = meta.get("attribution_url")
+    row["photographer_name"] = meta.get("photographer_name")
+
+
+class OrderedManifestWriter:
+    # workers finish out of order; rows are held back until every earlier
+    # index has been written so the manifest keeps catalog order
+    def __init__(self):
+        self.order = deque()
+        self.pending = {}
+
+    def track(self, jobs):
+        for job in jobs:
+            self.order.append(job[0])
+            yield job
+
+    def add(self, idx, row):
+        self.pending[idx] = row
+        while self.order and self.order[0] in self.pending:
+            append_manifest(self.pending.pop(self.order.popleft()))
+
+
+def run_ingest_jobs(jobs, total):
+    if INGEST_WORKERS <= 1:
+        for job in jobs:
+            yield job[0], ingest_place(job[0], total, *job[1:])
+        return
+
+    window = INGEST_WORKERS * 4
+    pending = {}
+    it = iter(jobs)
+    with ThreadPoolExecutor(max_workers=INGEST_WORKERS, thread_name_prefix="ingest") as pool:
+        while True:
+            while len(pending) < window:
+                job = next(it, None)
+                if job is None:
+                    break
+                idx = job[0]
+                pending[pool.submit(ingest_place, idx, total, *job[1:])] = idx
+            if not pending:
+                return
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                yield pending.pop(fut), fut.result()
+
+
+async def async_provider_json(client, provider, url, headers=None):
+    if search_cache is None:
+        return await async_fetch_provider_json(client, provider, url, headers=headers)
+    cache_key = search_cache_key(provider, url)
+    while True:
+        data, flight, leader = search_cache.lookup(cache_key)
+        if leader:
+            break
+        if flight is not None:
+            data = await asyncio.wrap_future(flight)
+            if data is None:
+                continue
+        metrics.count(provider, "cache_hits")
+        return data
+
+    try:
+        data = await async_fetch_provider_json(client, provider, url, headers=headers)
+    except asyncio.CancelledError:
+        search_cache.settle(cache_key, flight)
+        raise
+    except Exception as ex:
+        search_cache.settle(cache_key, flight, error=ex)
+        raise
+    search_cache.settle(cache_key, flight, provider, data)
+    return data
+
+
+async def async_fetch_provider_json(client, provider, url, headers=None):
+    budget = PROVIDER_BUDGETS[provider]
+    attempt = 0
+    while True:
+        wait_for = budget.reserve()
+        if wait_for > 0:
+            await asyncio.sleep(wait_for)
+            continue
+        metrics.count(provider, "calls")
+        try:
+            resp = await client.request("GET", url, headers=headers)
+        except urllib.error.HTTPError as ex:
+            if ex.code != 429:
+                metrics.count(provider, "errors")
+                raise
+            metrics.count(provider, "rate_limited")
+            if attempt >= RATE_LIMIT_MAX_RETRIES:
+                raise
+            budget.on_429(ex.headers)
+            attempt += 1
+            continue
+        except Exception:
+            metrics.count(provider, "errors")
+            raise
+        metrics.count(provider, "bytes", len(resp.body))
+        budget.observe(resp.headers)
+        return json.loads(resp.body.decode("utf-8")) if resp.body else {}
+
+
+async def async_provider_search(client, provider, profile, timings=None):
+    api_key, build_request, pick = PROVIDER_SEARCH.get(provider, (None, None, None))
+    if not api_key:
+        return None
+    with metrics.timed(f"search.{provider}", timings):
+        url, headers = build_request(profile)
+        return pick(await async_provider_json(client, provider, url, headers=headers), profile)
+
+
+async def async_resolve_image_meta(client, profiles, timings=None):
+    errors = []
+    best = None
+    if RESOLVE_MODE != "fanout":
+        for provider in PROVIDER_PRIORITY:
+            for profile in profiles:
+                try:
+                    meta = await async_provider_search(client, provider, profile, timings)
+                except Exception as ex:
+                    errors.append(search_error(provider, profile, ex))
+                    continue
+                if not meta:
+                    continue
+                if not best or meta["match_score"] > best["match_score"]:
+                    best = meta
+                if meta["match_score"] >= CONFIDENT_MATCH_SCORE:
+                    return meta, errors
+        return best, errors
+
+    # same waves as resolve_image_meta_fanout, as tasks on the loop instead of pool threads
+    providers = [p for p in PROVIDER_PRIORITY if p in enabled_providers()]
+    deadline = time.monotonic() + RESOLVE_BUDGET_SEC
+    for start in range(0, len(profiles), max(1, FANOUT_PROFILES)):
+        wave = profiles[start : start + max(1, FANOUT_PROFILES)]
+        pending = {}
+        for profile in wave:
+            for provider in providers:
+                task = asyncio.ensure_future(async_provider_search(client, provider, profile, timings))
+                pending[task] = (provider, profile)
+        try:
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                finished, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    provider, profile = pending.pop(task)
+                    try:
+                        meta = task.result()
+                    except Exception as ex:
+                        errors.append(search_error(provider, profile, ex))
+                        continue
+                    if meta and (not best or meta["match_score"] > best["match_score"]):
+                        best = meta
+                if best and best["match_score"] >= CONFIDENT_MATCH_SCORE:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+            # reap abandoned searches so their errors are not logged as never retrieved
+            await asyncio.gather(*pending, return_exceptions=True)
+        if best and best["match_score"] >= CONFIDENT_MATCH_SCORE:
+            return best, errors
+        if time.monotonic() >= deadline:
+            errors.append(f"resolve budget exceeded ({RESOLVE_BUDGET_SEC}s)")
+            return best, errors
+    return best, errors
+
+
+class AsyncPlace:
+    # one place moving through the async stages
+    def __init__(self, job, total):
+        self.idx, self.country, self.place, self.key, self.profiles = job
+        self.row = new_place_row(self.idx, total, self.country, self.place, self.key)
+        self.timings = {}
+        self.started = time.perf_counter()
+        self.meta = None
+        self.asset_hash = None
+        self.original = None
+        self.transfer = None
+        self.uploads = None
+        self.asset = None
+        self.claim = None
+
+
+async def async_copy_stored(client, key, entry, timings, reason="asset"):
+    try:
+        with metrics.timed("copy", timings):
+            for source_key, target_key in copy_pairs(key, entry):
+                payload = json.dumps({"source_key": source_key, "key": target_key}).encode("utf-8")
+                await client.request(
+                    "POST", f"{BASE_URL}/api/r2/copy", body=payload, headers={"Content-Type": "application/json"}
+                )
+    except Exception as ex:
+        if copy_source_gone(entry, ex):
+            return None
+        raise
+    return stored_transfer(key, entry, reason)
+
+
+async def run_stage(inbox, handle, workers):
+    # `workers` consumers on one bounded queue; a None per worker closes the stage
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is None:
+                return
+            await handle(item)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+async def async_ingest(jobs, total, results):
+    client = AsyncHttpClient(
+        max_per_host=ASYNC_HTTP_PER_HOST,
+        timeout=HTTP_TIMEOUT_SEC,
+        user_agent="wheretotravel-image-ingest/2.0",
+    )
+    profile_q = asyncio.Queue(maxsize=ASYNC_QUEUE_SIZE)
+    search_q = asyncio.Queue(maxsize=ASYNC_QUEUE_SIZE)
+    download_q = asyncio.Queue(maxsize=ASYNC_QUEUE_SIZE)
+    resize_q = asyncio.Queue(maxsize=ASYNC_QUEUE_SIZE)
+    upload_q = asyncio.Queue(maxsize=ASYNC_QUEUE_SIZE)
+
+    async def finish(item, error=None):
+        if error is not None:
+            item.row["errors"] = [place_error(error)]
+        item.original = None
+        item.uploads = None
+        if item.claim is not None:
+            release_asset(item.asset, item.claim)
+            item.claim = None
+        await results.put((item.idx, finish_place_row(item.row, item.timings, item.started)))
+
+    async def complete(item, transfer):
+        count_transfer(item.meta.get("provider"), transfer)
+        record_transfer(item.row, item.key, item.asset_hash, transfer)
+        if transfer.dedup != "asset" and item.asset is not None:
+            index_transfer(item.asset, item.key, transfer)
+        fill_meta_fields(item.row, item.meta)
+        mark_asset_used(item.meta.get("provider"), str(item.meta.get("provider_asset_id") or ""))
+        await finish(item)
+
+    async def reuse_asset(item):
+        # True when the place was finished with a copy of an asset an earlier place stored
+        item.asset = asset_identity(item.meta)
+        claim, owner = claim_asset(item.asset)
+        if owner:
+            item.claim = claim
+        else:
+            with metrics.timed("dedup_wait", item.timings):
+                await asyncio.wrap_future(claim)
+        entry = asset_index.get(*item.asset)
+        if entry is None or entry["key"] == item.key:
+            return False
+        transfer = await async_copy_stored(client, item.key, entry, item.timings)
+        if transfer is None:
+            return False
+        await complete(item, transfer)
+        return True
+
+    async def profile_one(item):
+        # cpu-only (usually a no-op with the query plan), so a single consumer
+        try:
+            item.profiles = place_profiles(item.country, item.place, item.profiles, item.timings)
+        except Exception as ex:
+            return await finish(item, ex)
+        await search_q.put(item)
+
+    async def search_one(item):
+        try:
+            item.meta, errors = await async_resolve_image_meta(client, item.profiles, item.timings)
+            if not item.meta:
+                item.row["errors"] = errors[:10]
+                return await finish(item)
+            item.asset_hash = check_ledger(item.row, item.key, item.meta)
+        except Exception as ex:
+            return await finish(item, ex)
+        if item.asset_hash is None:
+            return await finish(item)
+        if asset_index is not None:
+            try:
+                if await reuse_asset(item):
+                    return
+            except Exception as ex:
+                return await finish(item, ex)
+        await download_q.put(item)
+
+    async def download_one(item):
+        provider = item.meta.get("provider")
+        try:
+            with metrics.timed("download", item.timings):
+                resp = await client.request("GET", item.meta["image_url"])
+        except Exception as ex:
+            metrics.count(provider, "download_errors")
+            return await finish(item, ex)
+        try:
+            ctype, _length = check_image_headers(resp.headers)
+            if len(resp.body) > MAX_IMAGE_BYTES:
+                raise ImageRejected(f"image larger than {MAX_IMAGE_BYTES} bytes")
+        except ImageRejected as ex:
+            return await finish(item, ex)
+        if IMAGE_VARIANTS:
+            item.original = resp.body
+            return await resize_q.put(item)
+        item.transfer = digest_transfer(ctype, bytes_digest(resp.body), len(resp.body))
+        item.uploads = [(item.key, ctype, resp.body)]
+        if NEAR_DUP and asset_index is not None:
+            item.original = resp.body
+            return await resize_q.put(item)
+        await upload_q.put(item)
+
+    async def resize_one(item):
+        try:
+            with metrics.timed("resize", item.timings):
+                if IMAGE_VARIANTS:
+                    variants = await asyncio.wrap_future(submit_variants(item.original))
+                    item.transfer, item.uploads = variant_uploads(item.key, len(item.original), variants)
+                else:
+                    item.transfer.dhash = await asyncio.wrap_future(submit_dhash(item.original))
+        except Exception as ex:
+            return await finish(item, ex)
+        item.original = None
+        await upload_q.put(item)
+
+    async def upload_one(item):
+        try:
+            entry, reason = stored_match(item.key, item.transfer)
+            if entry is not None:
+                copied = await async_copy_stored(client, item.key, entry, item.timings)
+                if copied is not None:
+                    return await complete(item, downloaded_copy(copied, item.transfer, reason))
+            flag_near_duplicate(item.key, item.transfer, item.meta.get("provider"))
+        except Exception as ex:
+            return await finish(item, ex)
+        try:
+            with metrics.timed("upload", item.timings):
+                for upload_key, ctype, data in item.uploads:
+                    url, body, body_type = upload_request(upload_key, ctype, data)
+                    await client.request("POST", url, body=body, headers={"Content-Type": body_type})
+        except Exception as ex:
+            metrics.count("r2", "errors")
+            return await finish(item, ex)
+        await complete(item, item.transfer)
+
+    stages = [
+        (profile_q, profile_one, 1),
+        (search_q, search_one, ASYNC_SEARCH_CONCURRENCY),
+        (download_q, download_one, ASYNC_DOWNLOAD_CONCURRENCY),
+        # one in flight per worker process; more would only queue inside the pool
+        (resize_q, resize_one, IMAGE_WORKERS),
+        (upload_q, upload_one, ASYNC_UPLOAD_CONCURRENCY),
+    ]
+    runners = [asyncio.ensure_future(run_stage(q, handle, n)) for q, handle, n in stages]
+    try:
+        for job in jobs:
+            await profile_q.put(AsyncPlace(job, total))
+        # close stages front to back: a stage only feeds the ones after it
+        for (inbox, _handle, workers), runner in zip(stages, runners):
+            for _ in range(workers):
+                await inbox.put(None)
+            await runner
+    finally:
+        for runner in runners:
+            runner.cancel()
+        await asyncio.gather(*runners, return_exceptions=True)
+        await client.close()
+
+
+class AsyncIngestRunner:
+    # runs async_ingest on its own event loop thread and hands (idx, row) results to the
+    # caller, which stays the manifest writer; the bounded result queue backpressures the pipeline
+    def __init__(self, jobs, total):
+        self.jobs = jobs
+        self.total = total
+        self.loop = asyncio.new_event_loop()
+        self.results = None
+        self.task = None
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="async-ingest", daemon=True)
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.results = asyncio.Queue(maxsize=ASYNC_QUEUE_SIZE)
+        self.task = self.loop.create_task(self._pipeline())
+        self.ready.set()
+        # keeps running after the pipeline ends so the caller can drain the result queue;
+        # the caller stops the loop once it is done (or gives up early)
+        self.loop.run_forever()
+        if not self.task.done():
+            self.task.cancel()
+            self.loop.run_until_complete(asyncio.gather(self.task, return_exceptions=True))
+        self.loop.close()
+
+    async def _pipeline(self):
+        try:
+            await async_ingest(self.jobs, self.total, self.results)
+        except Exception as ex:
+            await self.results.put(ex)
+            return
+        await self.results.put(None)
+
+    def __iter__(self):
+        self.thread.start()
+        self.ready.wait()
+        try:
+            while True:
+                item = asyncio.run_coroutine_threadsafe(self.results.get(), self.loop).result()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+
+def print_metrics_summary(summary):
+    print("----- stage timings (ms) -----")
+    for stage, s in sorted(summary["stages"].items()):
+        print(
+            f"{stage}: count={s['count']} p50={s['p50_ms']} p95={s['p95_ms']} p99={s['p99_ms']} "
+            f"max={s['max_ms']} total={round(s['total_ms'] / 1000.0, 1)}s"
+        )
+    for provider, counters in summary["providers"].items():
+        print(f"{provider}: " + " ".join(f"{k}={v}" for k, v in counters.items()))
 
 
 def main():
+    global ledger, asset_index, metrics
     if not DATA_FILE.exists():
         print(f"data file not found: {DATA_FILE}")
         return 1
@@ -577,22 +1745,23 @@ def main():
         print("missing provider keys. set PIXABAY_API_KEY and/or PEXELS_API_KEY and/or UNSPLASH_ACCESS_KEY")
         return 2
 
-    enabled = []
-    if PIXABAY_API_KEY:
-        enabled.append("pixabay")
-    if PEXELS_API_KEY:
-        enabled.append("pexels")
-    if UNSPLASH_ACCESS_KEY:
-        enabled.append("unsplash")
+    enabled = enabled_providers()
     print(f"enabled providers: {','.join(enabled)}")
     if UNSPLASH_SECRET_KEY:
         print("unsplash secret key detected (not required for current search API flow)")
 
-    countries = json.loads(DATA_FILE.read_text(encoding="utf-8")).get("countries", [])
-    all_rows = flatten_places(countries)
-    if MAX_PLACES > 0:
-        all_rows = all_rows[:MAX_PLACES]
-
+    cache = open_search_cache()
+    if cache is not None:
+        cache_stats = cache.stats()
+        print(f"search cache: entries={cache_stats['entries']} bytes={cache_stats['bytes']} file={SEARCH_CACHE_FILE}")
+
+    if INGEST_METRICS:
+        metrics = IngestMetrics(METRICS_FILE, METRICS_INTERVAL_SEC)
+    open_manifest_store()
+    if SKIP_UNCHANGED:
+        ledger = ContentLedger(LEDGER_FILE)
+    if ASSET_DEDUP:
+        asset_index = AssetIndex(ASSET_INDEX_FILE)
     already_uploaded = load_uploaded_keys_from_manifest()
     if already_uploaded:
         print(f"resume mode: skip already uploaded keys from manifest ({len(already_uploaded)})")
@@ -619,90 +1788,85 @@ def main():
         if not r2_status.get("configured"):
             print("r2 is not configured in backend")
             return 4
+        if IMAGE_VARIANTS and resolve_public_base_url() is None:
+            print("public url: backend did not report one, rows get thumb_key without thumb_url")
 
-        total = len(all_rows)
-        print(f"start ingest: places={total}, providers={','.join(PROVIDER_PRIORITY)}")
+        if QUERY_PLAN and ensure_plan(DATA_FILE, PLAN_FILE):
+            print(f"query plan rebuilt: {PLAN_FILE}")
+
+        total = catalog_place_total()
+        print(
+            f"start ingest: places={total}, providers={','.join(PROVIDER_PRIORITY)}, "
+            f"workers={INGEST_WORKERS}, resolve_mode={RESOLVE_MODE}, runner={INGEST_RUNNER}"
+        )
+        if INGEST_RUNNER == "async":
+            print(
+                f"async stages: search={ASYNC_SEARCH_CONCURRENCY} download={ASYNC_DOWNLOAD_CONCURRENCY} "
+                f"upload={ASYNC_UPLOAD_CONCURRENCY} queue={ASYNC_QUEUE_SIZE} per_host={ASYNC_HTTP_PER_HOST}"
+            )
 
         success = 0
         failed = 0
-        skipped = 0
+        done = 0
+        counts = {"skipped": 0}
         started = time.time()
 
-        for idx, (country, place) in enumerate(all_rows, start=1):
-            country_code = country.get("country_code")
-            country_name = country.get("country_name_en") or country_code
-            place_id = place.get("place_id")
-            key = f"images/placeholders/{country_code}/{place_id}.jpg"
-
-            if key in already_uploaded:
-                skipped += 1
-                continue
-
-            row = {
-                "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
-                "index": idx,
-                "total": total,
-                "country_code": country_code,
-                "place_id": place_id,
-                "place_name_en": place.get("name_en"),
-                "key": key,
-                "status": "failed",
-            }
-
-            try:
-                meta, errors = resolve_image_meta(place, country_name)
-                if not meta:
-                    row["errors"] = errors[:10]
-                    append_manifest(row)
-                    failed += 1
-                    continue
-
-                ctype, raw = http_bytes(meta["image_url"])
-                if not ctype.startswith("image/"):
-                    row["errors"] = [f"downloaded non-image content-type: {ctype}"]
-                    append_manifest(row)
-                    failed += 1
-                    continue
-
-                upload_binary(key, ctype, raw)
-                row["status"] = "uploaded"
-                row["bytes"] = len(raw)
-                row["content_type"] = ctype
-                row["provider"] = meta.get("provider")
-                row["provider_asset_id"] = meta.get("provider_asset_id")
-                row["provider_query"] = meta.get("query")
-                row["query_strategy"] = meta.get("query_strategy")
-                row["match_score"] = meta.get("match_score")
-                row["required_token_hits"] = meta.get("required_token_hits")
-                row["optional_token_hits"] = meta.get("optional_token_hits")
-                row["attribution_url"] = meta.get("attribution_url")
-                row["photographer_name"] = meta.get("photographer_name")
-                append_manifest(row)
+        writer = OrderedManifestWriter()
+        jobs = writer.track(iter_ingest_jobs(iter_planned_places(), already_uploaded, counts))
+        if INGEST_RUNNER == "async":
+            results = AsyncIngestRunner(jobs, total)
+        else:
+            results = run_ingest_jobs(jobs, total)
+        for idx, row in results:
+            with metrics.timed("manifest_write"):
+                writer.add(idx, row)
+            metrics.place_done(row["status"])
+            metrics.maybe_emit()
+            done += 1
+            if row["status"] == "uploaded":
                 success += 1
-            except urllib.error.HTTPError as ex:
-                row["errors"] = [f"HTTPError {ex.code}"]
-                append_manifest(row)
-                failed += 1
-            except Exception as ex:
-                row["errors"] = [f"{type(ex).__name__}: {ex}"]
-                append_manifest(row)
+            else:
                 failed += 1
 
-            if idx % 25 == 0 or idx == total:
+            if done % 25 == 0 or done + counts["skipped"] == total:
                 elapsed = int(time.time() - started)
                 print(
-                    f"progress: {idx}/{total} success={success} failed={failed} skipped={skipped} elapsed={elapsed}s"
+                    f"progress: {done + counts['skipped']}/{total} success={success} failed={failed} "
+                    f"skipped={counts['skipped']} elapsed={elapsed}s"
                 )
-
-            time.sleep(REQUEST_DELAY_MS / 1000.0)
+        skipped = counts["skipped"]
 
         print("----- result -----")
         print(f"success={success}")
         print(f"failed={failed}")
         print(f"skipped={skipped}")
-        print(f"manifest={MANIFEST_FILE}")
+        print(f"manifest={MANIFEST_DB_FILE if manifest_store is not None else MANIFEST_FILE}")
+        if search_cache is not None:
+            cache_stats = search_cache.stats()
+            print(
+                f"search_cache: hits={cache_stats['hits']} misses={cache_stats['misses']} "
+                f"shared={cache_stats['shared']} hit_ratio={cache_stats['hit_ratio']} "
+                f"evictions={cache_stats['evictions']}"
+            )
+        print_metrics_summary(metrics.summary())
+        if INGEST_METRICS:
+            print(f"metrics={METRICS_FILE}")
         return 0 if failed == 0 else 5
     finally:
+        metrics.close()
+        if fanout_pool is not None:
+            fanout_pool.shutdown(wait=False, cancel_futures=True)
+        if variant_pool is not None:
+            variant_pool.shutdown(cancel_futures=True)
+        if search_cache is not None:
+            search_cache.close()
+        close_manifest_store()
+        if ledger is not None:
+            ledger.close()
+        if asset_index is not None:
+            asset_index.close()
+        HTTP_POOL.close()
+        UPLOAD_POOL.close()
         if server_proc is not None:
             server_proc.terminate()
             try:
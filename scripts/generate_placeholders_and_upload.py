@@ -2,23 +2,48 @@ import base64
 import io
 import json
 import os
+import queue
 import subprocess
 import sys
+import threading
 import time
+import urllib.error
 import urllib.parse
 import urllib.request
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 from PIL import Image, ImageDraw, ImageFont
 
+from catalog_stream import iter_countries, read_meta
+from content_ledger import ContentLedger, input_fingerprint
+from http_pool import HttpPool
+
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_FILE = ROOT / "data" / "countries.v1.json"
+LEDGER_FILE = ROOT / "data" / "runtime" / "object_ledger.v1.sqlite"
 BASE_URL = os.getenv("BACKEND_URL", "http://localhost:8787").rstrip("/")
 START_SERVER = os.getenv("START_SERVER", "1") == "1"
+UPLOAD_MODE = os.getenv("UPLOAD_MODE", "raw").strip().lower()
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "8") or "8")
+HTTP_TIMEOUT_SEC = float(os.getenv("HTTP_TIMEOUT_SEC", "60") or "60")
+# RENDER_PROCESSES=0 keeps the original render-then-upload loop on the main thread
+RENDER_PROCESSES = int(os.getenv("RENDER_PROCESSES", "0") or "0")
+UPLOAD_WORKERS = max(1, int(os.getenv("UPLOAD_WORKERS", "4") or "4"))
+SKIP_UNCHANGED = os.getenv("SKIP_UNCHANGED", "1") == "1"
+PLACEHOLDER_VERIFY = os.getenv("PLACEHOLDER_VERIFY", "none").strip().lower()
+# bump whenever render_placeholder output changes so every key is re-rendered once
+PLACEHOLDER_RENDER_VERSION = "placeholder-v1"
+RENDER_QUEUE_SIZE = max(1, int(os.getenv("RENDER_QUEUE_SIZE", "32") or "32"))
 SAMPLE_NAME = "Kharkhorin Safari Reserve"
 
 
+HTTP_POOL = HttpPool(max_per_host=HTTP_POOL_SIZE, timeout=HTTP_TIMEOUT_SEC)
+
+
 def request_json(method, path, payload=None):
     url = f"{BASE_URL}{path}"
     data = None
@@ -26,12 +51,19 @@ def request_json(method, path, payload=None):
     if payload is not None:
         data = json.dumps(payload).encode("utf-8")
         headers["Content-Type"] = "application/json"
-    req = urllib.request.Request(url, method=method, data=data, headers=headers)
-    with urllib.request.urlopen(req, timeout=60) as resp:
-        body = resp.read().decode("utf-8")
-        if not body:
-            return {}
-        return json.loads(body)
+    body = HTTP_POOL.request(method, url, body=data, headers=headers).body.decode("utf-8")
+    if not body:
+        return {}
+    return json.loads(body)
+
+
+def request_raw(path, body, content_type):
+    url = f"{BASE_URL}{path}"
+    headers = {"Content-Type": content_type, "Content-Length": str(len(body))}
+    raw = HTTP_POOL.request("POST", url, body=body, headers=headers).body.decode("utf-8")
+    if not raw:
+        return {}
+    return json.loads(raw)
 
 
 def wait_for_health(timeout_sec=30):
@@ -47,7 +79,8 @@ def wait_for_health(timeout_sec=30):
     return False
 
 
-def load_font(size, bold=False):
+@lru_cache(maxsize=None)
+def font_candidates(bold=False):
     candidates = []
     if os.name == "nt":
         if bold:
@@ -67,15 +100,28 @@ def load_font(size, bold=False):
                 ]
             )
 
-    for path in candidates:
-        if Path(path).exists():
-            try:
-                return ImageFont.truetype(path, size=size)
-            except Exception:
-                continue
+    return tuple(path for path in candidates if Path(path).exists())
+
+
+# fonts are resolved once per process and shared by every render
+@lru_cache(maxsize=None)
+def load_font(size, bold=False):
+    for path in font_candidates(bold):
+        try:
+            return ImageFont.truetype(path, size=size)
+        except Exception:
+            continue
     return ImageFont.load_default()
 
 
+MEASURE_DRAW = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+
+
+@lru_cache(maxsize=65536)
+def text_width(font, text):
+    return MEASURE_DRAW.textbbox((0, 0), text, font=font)[2]
+
+
 def text_wrap(draw, text, font, max_width):
     words = text.split()
     if not words:
@@ -84,7 +130,7 @@ def text_wrap(draw, text, font, max_width):
     line = words[0]
     for word in words[1:]:
         test = f"{line} {word}"
-        w = draw.textbbox((0, 0), test, font=font)[2]
+        w = text_width(font, test)
         if w <= max_width:
             line = test
         else:
@@ -129,7 +175,7 @@ def render_placeholder(place_name, city, country_name, code):
 
     footer = "wheretotravel.dev placeholder"
     footer_font = load_font(24, bold=False)
-    fw = draw.textbbox((0, 0), footer, font=footer_font)[2]
+    fw = text_width(footer_font, footer)
     draw.text((width - fw - 88, height - 86), footer, fill=(120, 108, 58), font=footer_font)
 
     output = io.BytesIO()
@@ -138,6 +184,8 @@ def render_placeholder(place_name, city, country_name, code):
 
 
 def upload_placeholder(key, jpg_bytes):
+    if UPLOAD_MODE == "raw":
+        return request_raw(f"/api/r2/upload-raw?{urllib.parse.urlencode({'key': key})}", jpg_bytes, "image/jpeg")
     payload = {
         "key": key,
         "content_base64": base64.b64encode(jpg_bytes).decode("ascii"),
@@ -146,7 +194,186 @@ def upload_placeholder(key, jpg_bytes):
     return request_json("POST", "/api/r2/upload-base64", payload)
 
 
+def iter_placeholder_jobs(countries, sample=None):
+    for country in countries:
+        code = country["country_code"]
+        country_name = country["country_name_en"]
+        for place in country["places"]:
+            key = f"images/placeholders/{code}/{place['place_id']}.jpg"
+            if sample is not None and place["name_en"] == SAMPLE_NAME:
+                sample["key"] = key
+            yield key, place["name_en"], place.get("city", ""), country_name, code
+
+
+def render_job(job):
+    key, place_name, city, country_name, code = job
+    return key, render_placeholder(place_name=place_name, city=city, country_name=country_name, code=code)
+
+
+def catalog_totals():
+    meta = read_meta(DATA_FILE)
+    countries, places = meta.get("total_countries"), meta.get("total_places")
+    if not isinstance(countries, int) or not isinstance(places, int):
+        countries = places = 0
+        for country in iter_countries(DATA_FILE):
+            countries += 1
+            places += len(country["places"])
+    return countries, places
+
+
+ledger = None
+remote_etags = None
+
+
+def placeholder_input_hash(job):
+    _key, place_name, city, country_name, code = job
+    return input_fingerprint(PLACEHOLDER_RENDER_VERSION, place_name, city, country_name, code)
+
+
+def list_remote_etags(prefix):
+    etags = {}
+    start_after = ""
+    while True:
+        params = {"prefix": prefix, "limit": 1000}
+        if start_after:
+            params["start_after"] = start_after
+        objects = request_json("GET", f"/api/r2/list?{urllib.parse.urlencode(params)}").get("objects", [])
+        for obj in objects:
+            etags[obj["key"]] = obj.get("etag")
+        if len(objects) < 1000:
+            return etags
+        start_after = objects[-1]["key"]
+
+
+def head_remote_etag(key):
+    try:
+        resp = request_json("GET", f"/api/r2/head?{urllib.parse.urlencode({'key': key})}")
+    except urllib.error.HTTPError as ex:
+        if ex.code == 404:
+            return ""
+        raise
+    return (resp.get("info") or {}).get("etag") or ""
+
+
+def is_unchanged(job):
+    if ledger is None:
+        return False
+    key = job[0]
+    input_hash = placeholder_input_hash(job)
+    if not ledger.is_current(key, input_hash):
+        return False
+    if PLACEHOLDER_VERIFY == "list":
+        return ledger.is_current(key, input_hash, remote_etag=remote_etags.get(key, ""))
+    if PLACEHOLDER_VERIFY == "head":
+        return ledger.is_current(key, input_hash, remote_etag=head_remote_etag(key))
+    return True
+
+
+def remember_upload(job, jpg):
+    if ledger is not None:
+        ledger.record(job[0], placeholder_input_hash(job), jpg)
+
+
+def select_changed_jobs(jobs, counts):
+    for job in jobs:
+        if is_unchanged(job):
+            counts["skipped"] += 1
+            continue
+        yield job
+
+
+def run_serial_upload(countries, total_countries, t0, sample=None):
+    success = 0
+    failed = 0
+    skipped = 0
+    for ci, country in enumerate(countries, start=1):
+        for job in iter_placeholder_jobs([country], sample):
+            if is_unchanged(job):
+                skipped += 1
+                continue
+            key, jpg = render_job(job)
+            try:
+                upload_placeholder(key, jpg)
+                remember_upload(job, jpg)
+                success += 1
+            except Exception as ex:
+                failed += 1
+                print(f"upload failed: {key} :: {ex}")
+
+        if ci % 10 == 0:
+            elapsed = int(time.time() - t0)
+            print(
+                f"progress: {ci}/{total_countries} countries, success={success}, failed={failed}, "
+                f"skipped={skipped}, elapsed={elapsed}s"
+            )
+    return success, failed, skipped
+
+
+def run_render_pipeline(jobs, total):
+    # renderer processes -> bounded queue -> uploader threads; a full queue stalls
+    # the render side, so at most RENDER_QUEUE_SIZE encoded images wait in memory
+    upload_queue = queue.Queue(maxsize=RENDER_QUEUE_SIZE)
+    counts = {"success": 0, "failed": 0, "skipped": 0}
+    lock = threading.Lock()
+    t0 = time.time()
+
+    def record(ok):
+        with lock:
+            counts["success" if ok else "failed"] += 1
+            done = counts["success"] + counts["failed"]
+            if done % 100 == 0:
+                elapsed = int(time.time() - t0)
+                print(
+                    f"progress: {done + counts['skipped']}/{total} places, success={counts['success']}, "
+                    f"failed={counts['failed']}, skipped={counts['skipped']}, elapsed={elapsed}s"
+                )
+
+    def upload_worker():
+        while True:
+            item = upload_queue.get()
+            if item is None:
+                return
+            job, jpg = item
+            try:
+                upload_placeholder(job[0], jpg)
+                remember_upload(job, jpg)
+                record(True)
+            except Exception as ex:
+                print(f"upload failed: {job[0]} :: {ex}")
+                record(False)
+
+    uploaders = [threading.Thread(target=upload_worker, daemon=True) for _ in range(UPLOAD_WORKERS)]
+    for t in uploaders:
+        t.start()
+
+    def hand_off(job, fut):
+        try:
+            _key, jpg = fut.result()
+        except Exception as ex:
+            print(f"render failed: {job[0]} :: {ex}")
+            record(False)
+            return
+        upload_queue.put((job, jpg))
+
+    try:
+        with ProcessPoolExecutor(max_workers=RENDER_PROCESSES) as pool:
+            in_flight = deque()
+            for job in select_changed_jobs(jobs, counts):
+                in_flight.append((job, pool.submit(render_job, job)))
+                if len(in_flight) >= RENDER_PROCESSES * 2:
+                    hand_off(*in_flight.popleft())
+            while in_flight:
+                hand_off(*in_flight.popleft())
+    finally:
+        for _ in uploaders:
+            upload_queue.put(None)
+        for t in uploaders:
+            t.join()
+    return counts["success"], counts["failed"], counts["skipped"]
+
+
 def main():
+    global ledger, remote_etags
     if not DATA_FILE.exists():
         print(f"data file not found: {DATA_FILE}")
         return 1
@@ -176,41 +403,24 @@ def main():
             print("r2 is not configured in backend")
             return 3
 
-        data = json.loads(DATA_FILE.read_text(encoding="utf-8"))
-        countries = data["countries"]
+        total_countries, total = catalog_totals()
+        print(f"upload start: countries={total_countries}, places={total}")
 
-        total = sum(len(c["places"]) for c in countries)
-        print(f"upload start: countries={len(countries)}, places={total}")
-
-        sample_key = None
-        success = 0
-        failed = 0
+        if SKIP_UNCHANGED:
+            ledger = ContentLedger(LEDGER_FILE)
+            if PLACEHOLDER_VERIFY == "list":
+                remote_etags = list_remote_etags("images/placeholders/")
+                print(f"remote objects listed: {len(remote_etags)}")
 
         t0 = time.time()
-        for ci, country in enumerate(countries, start=1):
-            code = country["country_code"]
-            country_name = country["country_name_en"]
-            for pi, place in enumerate(country["places"], start=1):
-                key = f"images/placeholders/{code}/{place['place_id']}.jpg"
-                jpg = render_placeholder(
-                    place_name=place["name_en"],
-                    city=place.get("city", ""),
-                    country_name=country_name,
-                    code=code,
-                )
-                try:
-                    upload_placeholder(key, jpg)
-                    success += 1
-                except Exception as ex:
-                    failed += 1
-                    print(f"upload failed: {key} :: {ex}")
-
-                if place["name_en"] == SAMPLE_NAME:
-                    sample_key = key
-
-            if ci % 10 == 0:
-                elapsed = int(time.time() - t0)
-                print(f"progress: {ci}/{len(countries)} countries, success={success}, failed={failed}, elapsed={elapsed}s")
+        sample = {}
+        countries = iter_countries(DATA_FILE)
+        if RENDER_PROCESSES > 0:
+            print(f"pipeline mode: render_processes={RENDER_PROCESSES}, upload_workers={UPLOAD_WORKERS}")
+            success, failed, skipped = run_render_pipeline(iter_placeholder_jobs(countries, sample), total)
+        else:
+            success, failed, skipped = run_serial_upload(countries, total_countries, t0, sample)
+        sample_key = sample.get("key")
 
         if not sample_key:
             print(f"sample place not found: {SAMPLE_NAME}")
@@ -237,6 +447,7 @@ def main():
         print("----- result -----")
         print(f"uploaded_success={success}")
         print(f"uploaded_failed={failed}")
+        print(f"skipped_unchanged={skipped}")
         print(f"sample_key={sample_key}")
         print(f"sample_public_url={pub.get('url')}")
         print(f"signed_url_ok={bool(signed.get('url'))}")
@@ -247,6 +458,9 @@ def main():
         return 0 if failed == 0 else 5
 
     finally:
+        if ledger is not None:
+            ledger.close()
+        HTTP_POOL.close()
         if server_proc is not None:
             server_proc.terminate()
             try:
@@ -0,0 +1,203 @@
+import http.client
+import io
+import ssl
+import threading
+import urllib.error
+import urllib.parse
+
+
+REDIRECT_CODES = {301, 302, 303, 307, 308}
+# a kept-alive socket the server already closed fails with one of these before any response arrives
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+    ConnectionAbortedError,
+)
+
+
+class PooledResponse:
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+
+class StreamedResponse:
+    # an unread response holding its pooled connection; read it in chunks, then close()
+    def __init__(self, http_pool, host_pool, conn, resp, url):
+        self.http_pool = http_pool
+        self.host_pool = host_pool
+        self.conn = conn
+        self.resp = resp
+        self.url = url
+        self.status = resp.status
+        self.reason = resp.reason
+        self.headers = resp.headers
+        self.closed = False
+
+    def read(self, amt=None):
+        return self.resp.read(amt)
+
+    def iter_chunks(self, size=64 * 1024):
+        while True:
+            chunk = self.resp.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # only a fully read body leaves the socket at a message boundary
+        reusable = self.resp.isclosed() and not self.resp.will_close
+        self.http_pool._checkin(self.host_pool, self.conn, reusable)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class HostPool:
+    def __init__(self, max_connections):
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.idle = []
+        self.lock = threading.Lock()
+
+
+class HttpPool:
+    def __init__(self, max_per_host=16, timeout=45, user_agent=None):
+        self.max_per_host = max(1, max_per_host)
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.ssl_context = ssl.create_default_context()
+        self.hosts = {}
+        self.lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _host_pool(self, origin):
+        with self.lock:
+            pool = self.hosts.get(origin)
+            if pool is None:
+                pool = HostPool(self.max_per_host)
+                self.hosts[origin] = pool
+            return pool
+
+    def _connect(self, origin, timeout):
+        scheme, host, port = origin
+        with self.lock:
+            self.connections_opened += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _checkout(self, origin, timeout, reuse=True):
+        pool = self._host_pool(origin)
+        # bounded wait: a caller already holding a slot on this origin must not block forever
+        if not pool.slots.acquire(timeout=timeout):
+            raise TimeoutError(f"no free connection to {origin[1]}:{origin[2]} within {timeout}s")
+        with pool.lock:
+            conn = pool.idle.pop() if reuse and pool.idle else None
+        if conn is None:
+            return pool, self._connect(origin, timeout), False
+        conn.timeout = timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(timeout)
+        return pool, conn, True
+
+    def _checkin(self, pool, conn, reusable):
+        if reusable:
+            with pool.lock:
+                pool.idle.append(conn)
+        else:
+            conn.close()
+        pool.slots.release()
+
+    def _send(self, origin, method, target, body, headers, timeout):
+        # returns (response, pool, conn); the caller must read the body and check the connection back in.
+        # a streamed (iterable) body cannot be replayed after a stale socket, so it always gets a fresh one
+        replayable = body is None or isinstance(body, (bytes, bytearray, memoryview))
+        pool, conn, reused = self._checkout(origin, timeout, reuse=replayable)
+        try:
+            conn.request(method, target, body=body, headers=headers)
+            return conn.getresponse(), pool, conn
+        except STALE_CONNECTION_ERRORS:
+            conn.close()
+            if not reused:
+                self._checkin(pool, conn, False)
+                raise
+        except BaseException:
+            self._checkin(pool, conn, False)
+            raise
+        # retry exactly once on a fresh socket
+        conn = self._connect(origin, timeout)
+        try:
+            conn.request(method, target, body=body, headers=headers)
+            return conn.getresponse(), pool, conn
+        except BaseException:
+            self._checkin(pool, conn, False)
+            raise
+
+    def stream(self, method, url, body=None, headers=None, timeout=None, max_redirects=5):
+        # like request(), but the final response comes back unread as a StreamedResponse
+        timeout = self.timeout if timeout is None else timeout
+        req_headers = dict(headers or {})
+        if self.user_agent:
+            req_headers.setdefault("User-Agent", self.user_agent)
+
+        for _ in range(max_redirects + 1):
+            parts = urllib.parse.urlsplit(url)
+            scheme = parts.scheme.lower()
+            if scheme not in {"http", "https"}:
+                raise ValueError(f"unsupported url scheme: {url}")
+            port = parts.port or (443 if scheme == "https" else 80)
+            origin = (scheme, parts.hostname, port)
+            target = parts.path or "/"
+            if parts.query:
+                target = f"{target}?{parts.query}"
+
+            resp, pool, conn = self._send(origin, method, target, body, req_headers, timeout)
+            location = resp.headers.get("Location")
+            redirect = resp.status in REDIRECT_CODES and location
+            if not redirect and resp.status < 400:
+                return StreamedResponse(self, pool, conn, resp, url)
+
+            # redirect and error bodies are small: read them and release the connection
+            try:
+                data = resp.read()
+            except BaseException:
+                self._checkin(pool, conn, False)
+                raise
+            self._checkin(pool, conn, not resp.will_close)
+
+            if redirect:
+                url = urllib.parse.urljoin(url, location)
+                if resp.status == 303 or (resp.status in {301, 302} and method == "POST"):
+                    method = "GET"
+                    body = None
+                    req_headers.pop("Content-Type", None)
+                    req_headers.pop("Content-Length", None)
+                continue
+            raise urllib.error.HTTPError(url, resp.status, resp.reason, resp.headers, io.BytesIO(data))
+        raise urllib.error.HTTPError(url, 310, "too many redirects", None, io.BytesIO(b""))
+
+    def request(self, method, url, body=None, headers=None, timeout=None, max_redirects=5):
+        with self.stream(method, url, body, headers, timeout, max_redirects) as resp:
+            data = resp.read()
+        return PooledResponse(resp.url, resp.status, resp.reason, resp.headers, data)
+
+    def close(self):
+        with self.lock:
+            pools = list(self.hosts.values())
+            self.hosts = {}
+        for pool in pools:
+            with pool.lock:
+                idle, pool.idle = pool.idle, []
+            for conn in idle:
+                conn.close()
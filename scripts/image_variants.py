@@ -0,0 +1,73 @@
+import io
+
+from PIL import Image, ImageOps
+
+
+FORMATS = {
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+    "webp": ("WEBP", "image/webp", "webp"),
+}
+
+
+def variant_format(name):
+    return FORMATS.get(name, FORMATS["jpeg"])
+
+
+def encode(img, fmt, quality):
+    pil_format, _content_type, _ext = variant_format(fmt)
+    out = io.BytesIO()
+    if pil_format == "WEBP":
+        img.save(out, format="WEBP", quality=quality, method=4)
+    else:
+        img.save(out, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def fit_width(img, width):
+    # downscale only; never upsample a small original
+    if img.width <= width:
+        return img
+    height = max(1, round(img.height * width / img.width))
+    return img.resize((width, height), Image.LANCZOS)
+
+
+def dhash(img, size=8):
+    # 64-bit difference hash: one bit per horizontally adjacent pixel pair of a 9x8 grayscale thumbnail
+    small = img.convert("L").resize((size + 1, size), Image.BILINEAR)
+    px = small.tobytes()
+    bits = 0
+    for y in range(size):
+        row = px[y * (size + 1) : (y + 1) * (size + 1)]
+        for x in range(size):
+            bits = (bits << 1) | (row[x] > row[x + 1])
+    return bits
+
+
+def image_dhash(data):
+    with Image.open(io.BytesIO(data)) as src:
+        src.draft("RGB", (64, 64))
+        return dhash(ImageOps.exif_transpose(src))
+
+
+def build_variants(data, max_width, thumb_width, fmt, quality, thumb_quality):
+    # runs in a worker process: original bytes in, encoded main + thumbnail out
+    with Image.open(io.BytesIO(data)) as src:
+        source_format = src.format
+        # jpeg decoders can scale by 1/2..1/8 while decoding; keeps at least max_width pixels across
+        src.draft("RGB", (max_width, 1))
+        img = ImageOps.exif_transpose(src).convert("RGB")
+    main = fit_width(img, max_width)
+    thumb = fit_width(main, thumb_width)
+    main_bytes = encode(main, fmt, quality)
+    if main is img and source_format == variant_format(fmt)[0] and len(data) <= len(main_bytes):
+        # already small enough and in the target format: re-encoding would only grow it
+        main_bytes = data
+    return {
+        "main": main_bytes,
+        "width": main.width,
+        "height": main.height,
+        "thumb": encode(thumb, fmt, thumb_quality),
+        "thumb_width": thumb.width,
+        "thumb_height": thumb.height,
+        "dhash": dhash(thumb),
+    }
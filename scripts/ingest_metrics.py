@@ -0,0 +1,127 @@
+import json
+import math
+import threading
+import time
+from array import array
+from collections import Counter
+from contextlib import contextmanager
+
+
+# always reported, even at zero; anything else (rate_limited, cache_hits, downloads...) appears once counted
+BASE_COUNTERS = ("calls", "errors", "bytes")
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # nearest rank
+    idx = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[idx]
+
+
+def stage_summary(samples):
+    ordered = sorted(samples)
+    total = sum(ordered)
+    return {
+        "count": len(ordered),
+        "total_ms": round(total, 1),
+        "mean_ms": round(total / len(ordered), 2) if ordered else 0.0,
+        "p50_ms": round(percentile(ordered, 50), 2),
+        "p95_ms": round(percentile(ordered, 95), 2),
+        "p99_ms": round(percentile(ordered, 99), 2),
+        "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+    }
+
+
+class IngestMetrics:
+    # stage latencies (ms) and per-provider counters shared by the ingest worker threads;
+    # snapshots go to a JSONL stream, each interval line covering only the samples since the last one
+    def __init__(self, path=None, interval_sec=30.0):
+        self.path = path
+        self.interval_sec = interval_sec
+        self.lock = threading.Lock()
+        self.samples = {}
+        self.marks = {}
+        self.providers = {}
+        self.places = Counter()
+        self.started = time.monotonic()
+        self.last_emit = self.started
+        self.out = None
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.out = path.open("a", encoding="utf-8")
+
+    def observe(self, stage, elapsed_ms, timings=None):
+        with self.lock:
+            values = self.samples.get(stage)
+            if values is None:
+                values = self.samples[stage] = array("d")
+            values.append(elapsed_ms)
+            if timings is not None:
+                # fanout searches for one place land from several threads
+                timings[stage] = round(timings.get(stage, 0.0) + elapsed_ms, 2)
+
+    @contextmanager
+    def timed(self, stage, timings=None):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, (time.perf_counter() - t0) * 1000.0, timings)
+
+    def copy_timings(self, timings):
+        with self.lock:
+            return dict(timings)
+
+    def count(self, provider, name, n=1):
+        with self.lock:
+            counters = self.providers.get(provider)
+            if counters is None:
+                counters = self.providers[provider] = Counter({k: 0 for k in BASE_COUNTERS})
+            counters[name] += n
+
+    def place_done(self, status):
+        with self.lock:
+            self.places[status] += 1
+
+    def snapshot(self, since_marks=True):
+        with self.lock:
+            stages = {}
+            for stage, values in self.samples.items():
+                start = self.marks.get(stage, 0) if since_marks else 0
+                if len(values) > start:
+                    stages[stage] = stage_summary(values[start:])
+                if since_marks:
+                    self.marks[stage] = len(values)
+            return {
+                "at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "elapsed_sec": round(time.monotonic() - self.started, 1),
+                "places": dict(self.places),
+                "stages": stages,
+                "providers": {name: dict(counters) for name, counters in sorted(self.providers.items())},
+            }
+
+    def _write(self, kind, row):
+        if self.out is None:
+            return
+        self.out.write(json.dumps({"type": kind, **row}, ensure_ascii=False) + "\n")
+        self.out.flush()
+
+    def maybe_emit(self):
+        now = time.monotonic()
+        if self.out is None or now - self.last_emit < self.interval_sec:
+            return False
+        self.last_emit = now
+        self._write("interval", self.snapshot())
+        return True
+
+    def summary(self):
+        return self.snapshot(since_marks=False)
+
+    def close(self):
+        summary = self.summary()
+        if self.out is not None:
+            self._write("summary", summary)
+            self.out.close()
+            self.out = None
+        return summary
@@ -0,0 +1,252 @@
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+
+ROOT = Path(__file__).resolve().parents[1]
+RUNTIME_DIR = ROOT / "data" / "runtime"
+DEFAULT_DB_FILE = RUNTIME_DIR / "image_ingest_manifest.v1.sqlite"
+DEFAULT_JSONL_FILE = RUNTIME_DIR / "image_ingest_manifest.v1.jsonl"
+
+
+class ManifestStore:
+    def __init__(self, path, batch_size=50, flush_interval_sec=2.0):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_sec = flush_interval_sec
+        self.buffer = []
+        self.last_flush = time.monotonic()
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS manifest_rows (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    key TEXT NOT NULL,
+                    status TEXT,
+                    row TEXT NOT NULL
+                )
+                """
+            )
+            # one row per object key: latest row pointer plus a sticky "was ever uploaded" flag,
+            # so a later failed retry does not make resume re-upload an object that exists
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS manifest_keys (
+                    key TEXT PRIMARY KEY,
+                    latest_seq INTEGER NOT NULL,
+                    status TEXT,
+                    uploaded INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS manifest_meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    def _meta(self, name):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM manifest_meta WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, name, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO manifest_meta (name, value) VALUES (?, ?)", (name, value))
+
+    def _mark_synced(self, jsonl_path, sha256):
+        # fingerprint of the JSONL as it matches the database: size/mtime say whether it changed at all,
+        # the sha256 of those `size` bytes whether a bigger file only had rows appended behind our back
+        st = jsonl_path.stat()
+        self._set_meta(
+            "jsonl_synced", json.dumps({"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha256})
+        )
+
+    def _clear(self):
+        self.flush()
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM manifest_rows")
+            self.conn.execute("DELETE FROM manifest_keys")
+
+    def _import_lines(self, lines):
+        imported = 0
+        for raw in lines:
+            if not raw.strip():
+                continue
+            try:
+                row = json.loads(raw)
+            except Exception:
+                continue
+            if not row.get("key"):
+                continue
+            self.append(row)
+            imported += 1
+        self.flush()
+        return imported
+
+    def import_jsonl(self, jsonl_path):
+        # migrates the legacy append-only manifest once, then picks up rows a MANIFEST_BACKEND=jsonl run
+        # appended since the last export, so the export at close does not drop them. a file that was
+        # rewritten instead (shrunk, compacted, edited) replaces the imported rows rather than adding to them
+        if not jsonl_path.exists():
+            return 0
+        synced = self._meta("jsonl_synced")
+        legacy = self._meta("jsonl_imported") and synced is None
+        state = json.loads(synced) if synced is not None else None
+        st = jsonl_path.stat()
+        if state is not None and st.st_size == state["size"] and st.st_mtime_ns == state["mtime_ns"]:
+            return 0
+
+        digest = hashlib.sha256()
+
+        def lines(f):
+            for raw in f:
+                digest.update(raw)
+                yield raw.decode("utf-8", "replace")
+
+        with jsonl_path.open("rb") as f:
+            if legacy:
+                # database from before sync tracking: its last export is all we know about
+                for _ in lines(f):
+                    pass
+                self._mark_synced(jsonl_path, digest.hexdigest())
+                return 0
+            appended = False
+            if state is not None and st.st_size >= state["size"]:
+                remaining = state["size"]
+                while remaining > 0:
+                    chunk = f.read(min(remaining, 1 << 20))
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    remaining -= len(chunk)
+                # states written before the hash was kept can only go by size
+                appended = remaining == 0 and state.get("sha256", digest.hexdigest()) == digest.hexdigest()
+            if not appended:
+                f.seek(0)
+                digest = hashlib.sha256()
+                if state is not None:
+                    self._clear()
+            imported = self._import_lines(lines(f))
+        self._set_meta("jsonl_imported", str(jsonl_path))
+        self._mark_synced(jsonl_path, digest.hexdigest())
+        return imported
+
+    def append(self, row):
+        with self.lock:
+            self.buffer.append(row)
+            due = len(self.buffer) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval_sec
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            rows, self.buffer = self.buffer, []
+            self.last_flush = time.monotonic()
+            if not rows:
+                return
+            with self.conn:
+                for row in rows:
+                    key = row.get("key")
+                    status = row.get("status")
+                    cur = self.conn.execute(
+                        "INSERT INTO manifest_rows (key, status, row) VALUES (?, ?, ?)",
+                        (key, status, json.dumps(row, ensure_ascii=False)),
+                    )
+                    self.conn.execute(
+                        """
+                        INSERT INTO manifest_keys (key, latest_seq, status, uploaded) VALUES (?, ?, ?, ?)
+                        ON CONFLICT(key) DO UPDATE SET
+                            latest_seq = excluded.latest_seq,
+                            status = excluded.status,
+                            uploaded = MAX(manifest_keys.uploaded, excluded.uploaded)
+                        """,
+                        (key, cur.lastrowid, status, 1 if status == "uploaded" else 0),
+                    )
+
+    def is_uploaded(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT uploaded FROM manifest_keys WHERE key = ?", (key,)).fetchone()
+        if row and row[0]:
+            return True
+        with self.lock:
+            return any(r.get("key") == key and r.get("status") == "uploaded" for r in self.buffer)
+
+    def __contains__(self, key):
+        return self.is_uploaded(key)
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM manifest_keys WHERE uploaded = 1").fetchone()[0]
+
+    def latest(self, key):
+        self.flush()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT r.row FROM manifest_keys k JOIN manifest_rows r ON r.seq = k.latest_seq WHERE k.key = ?",
+                (key,),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def compact(self):
+        self.flush()
+        with self.lock:
+            with self.conn:
+                cur = self.conn.execute(
+                    "DELETE FROM manifest_rows WHERE seq NOT IN (SELECT latest_seq FROM manifest_keys)"
+                )
+                removed = cur.rowcount
+            self.conn.execute("VACUUM")
+        return removed
+
+    def export_jsonl(self, jsonl_path):
+        self.flush()
+        jsonl_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = jsonl_path.with_suffix(jsonl_path.suffix + ".tmp")
+        written = 0
+        digest = hashlib.sha256()
+        with self.lock, tmp.open("wb") as f:
+            for (raw,) in self.conn.execute("SELECT row FROM manifest_rows ORDER BY seq"):
+                line = (raw + "\n").encode("utf-8")
+                f.write(line)
+                digest.update(line)
+                written += 1
+        os.replace(tmp, jsonl_path)
+        self._mark_synced(jsonl_path, digest.hexdigest())
+        return written
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.conn.close()
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command not in {"compact", "export"}:
+        print("usage: python scripts/manifest_store.py compact|export")
+        return 1
+
+    store = ManifestStore(DEFAULT_DB_FILE)
+    try:
+        imported = store.import_jsonl(DEFAULT_JSONL_FILE)
+        if imported:
+            print(f"imported {imported} rows from {DEFAULT_JSONL_FILE}")
+        if command == "compact":
+            removed = store.compact()
+            print(f"compacted: removed={removed} rows")
+        written = store.export_jsonl(DEFAULT_JSONL_FILE)
+        print(f"exported: rows={written} file={DEFAULT_JSONL_FILE}")
+    finally:
+        store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,548 @@
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.parse
+import zlib
+from collections import Counter
+from email.utils import formatdate
+
+
+# local stand-in for the three provider search APIs, their image CDNs and the backend's
+# health/r2 routes, with injectable latency, errors and 429s for offline load tests
+MOCK_HOST = os.getenv("MOCK_HOST", "127.0.0.1")
+MOCK_PORT = int(os.getenv("MOCK_PORT", "8790") or "8790")
+MOCK_LATENCY_MS = float(os.getenv("MOCK_LATENCY_MS", "0") or "0")
+MOCK_JITTER_MS = float(os.getenv("MOCK_JITTER_MS", "0") or "0")
+MOCK_ERROR_RATE = float(os.getenv("MOCK_ERROR_RATE", "0") or "0")
+MOCK_429_RATE = float(os.getenv("MOCK_429_RATE", "0") or "0")
+MOCK_RETRY_AFTER_SEC = float(os.getenv("MOCK_RETRY_AFTER_SEC", "1") or "1")
+# which route groups the latency/error/429 knobs apply to
+MOCK_FAULT_ROUTES = {
+    x.strip() for x in os.getenv("MOCK_FAULT_ROUTES", "providers,images,uploads").split(",") if x.strip()
+}
+MOCK_RESULTS_PER_PAGE = int(os.getenv("MOCK_RESULTS_PER_PAGE", "8") or "8")
+MOCK_IMAGE_SIZE = os.getenv("MOCK_IMAGE_SIZE", "1600x1000")
+MOCK_STORE_MAX_MB = float(os.getenv("MOCK_STORE_MAX_MB", "256") or "256")
+MOCK_SEED = int(os.getenv("MOCK_SEED", "42") or "42")
+
+MAX_RAW_UPLOAD_BYTES = 25 * 1024 * 1024
+MAX_JSON_BODY_BYTES = 15 * 1024 * 1024
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    401: "Unauthorized",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    429: "Too Many Requests",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+
+class MockConfig:
+    def __init__(self, **overrides):
+        self.latency_ms = MOCK_LATENCY_MS
+        self.jitter_ms = MOCK_JITTER_MS
+        self.error_rate = MOCK_ERROR_RATE
+        self.rate_429 = MOCK_429_RATE
+        self.retry_after_sec = MOCK_RETRY_AFTER_SEC
+        self.fault_routes = set(MOCK_FAULT_ROUTES)
+        self.results_per_page = MOCK_RESULTS_PER_PAGE
+        self.image_size = MOCK_IMAGE_SIZE
+        self.store_max_bytes = int(MOCK_STORE_MAX_MB * 1024 * 1024)
+        self.seed = MOCK_SEED
+        for name, value in overrides.items():
+            if not hasattr(self, name):
+                raise TypeError(f"unknown mock option: {name}")
+            setattr(self, name, value)
+
+
+def make_image(size):
+    # a real JPEG so downstream decoding (resize/thumbnail) works; random bytes without Pillow
+    try:
+        width, height = (int(x) for x in size.lower().split("x"))
+    except ValueError:
+        width, height = 1600, 1000
+    try:
+        from PIL import Image
+    except ImportError:
+        return random.Random(7).randbytes(64 * 1024), width, height
+    img = Image.linear_gradient("L").resize((width, height)).convert("RGB")
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=85)
+    return out.getvalue(), width, height
+
+
+class HttpRequest:
+    def __init__(self, method, target, headers, body):
+        self.method = method
+        parts = urllib.parse.urlsplit(target)
+        self.path = parts.path
+        self.query = {k: v[0] for k, v in urllib.parse.parse_qs(parts.query, keep_blank_values=True).items()}
+        self.headers = headers
+        self.body = body
+
+
+class MockServices:
+    def __init__(self, config=None):
+        self.config = config or MockConfig()
+        self.rng = random.Random(self.config.seed)
+        self.image, self.image_width, self.image_height = make_image(self.config.image_size)
+        self.image_etag = hashlib.md5(self.image).hexdigest()
+        self.objects = {}
+        self.stored_bytes = 0
+        self.stats = Counter()
+        self.base_url = ""
+
+    # -- plumbing -------------------------------------------------------------------------
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, _version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self.write_response(writer, 400, {"error": {"message": "bad request line"}}, close=True)
+                    return
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                body = await self.read_body(reader, headers)
+                request = HttpRequest(method.upper(), target, headers, body)
+                close = headers.get("connection", "").lower() == "close"
+                status, payload, extra = await self.dispatch(request)
+                await self.write_response(writer, status, payload, extra, close=close, head=request.method == "HEAD")
+                if close:
+                    return
+        except asyncio.CancelledError:
+            # server shutdown with the connection idle between requests
+            return
+        finally:
+            writer.close()
+
+    async def read_body(self, reader, headers):
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size_line = await reader.readuntil(b"\r\n")
+                size = int(size_line.split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    await reader.readuntil(b"\r\n")
+                    return b"".join(chunks)
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+        length = int(headers.get("content-length") or 0)
+        return await reader.readexactly(length) if length > 0 else b""
+
+    async def write_response(self, writer, status, payload, extra=None, close=False, head=False):
+        extra = dict(extra or {})
+        content_type = extra.pop("Content-Type", "application/json; charset=utf-8")
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        lines = [
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, 'Unknown')}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'close' if close else 'keep-alive'}",
+        ]
+        lines.extend(f"{k}: {v}" for k, v in extra.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (b"" if head else body))
+        await writer.drain()
+
+    async def dispatch(self, request):
+        route, group = self.route(request)
+        if route is None:
+            self.stats["status_404"] += 1
+            return 404, {"error": {"message": "mock route not found"}}, None
+        if group in self.config.fault_routes:
+            delay = self.config.latency_ms + (self.rng.random() * self.config.jitter_ms if self.config.jitter_ms else 0)
+            if delay > 0:
+                await asyncio.sleep(delay / 1000.0)
+            roll = self.rng.random()
+            if roll < self.config.rate_429:
+                self.stats[f"{group}_429"] += 1
+                retry = self.config.retry_after_sec
+                return 429, {"error": "rate limited"}, {"Retry-After": f"{retry:g}", "X-Ratelimit-Remaining": "0"}
+            if roll < self.config.rate_429 + self.config.error_rate:
+                self.stats[f"{group}_5xx"] += 1
+                return self.rng.choice((500, 503)), {"error": {"message": "injected failure"}}, None
+        try:
+            status, payload, extra = route(request)
+        except ValueError as ex:
+            status, payload, extra = 400, {"error": {"message": str(ex)}}, None
+        self.stats[f"{group}_{status}"] += 1
+        return status, payload, extra
+
+    def route(self, request):
+        path, method = request.path, request.method
+        if method in {"GET", "HEAD"}:
+            if path == "/api/health":
+                return self.health, "backend"
+            if path == "/api/r2/status":
+                return self.r2_status, "backend"
+            if path == "/api/r2/list":
+                return self.r2_list, "backend"
+            if path == "/api/r2/head":
+                return self.r2_head, "backend"
+            if path == "/api/r2/public-url":
+                return self.r2_public_url, "backend"
+            if path == "/api/r2/signed-url":
+                return self.r2_signed_url, "backend"
+            if path.startswith("/r2/"):
+                return self.r2_object, "backend"
+            if path == "/pixabay/api/":
+                return self.pixabay_search, "providers"
+            if path == "/pexels/v1/search":
+                return self.pexels_search, "providers"
+            if path == "/unsplash/search/photos":
+                return self.unsplash_search, "providers"
+            if path.startswith("/images/"):
+                return self.image_file, "images"
+            if path == "/__mock/stats":
+                return self.stats_route, "control"
+        if method == "POST":
+            if path == "/api/r2/upload-raw":
+                return self.upload_raw, "uploads"
+            if path == "/api/r2/upload-base64":
+                return self.upload_base64, "uploads"
+            if path == "/api/r2/copy":
+                return self.r2_copy, "uploads"
+            if path == "/__mock/reset":
+                return self.reset_route, "control"
+        return None, None
+
+    # -- backend --------------------------------------------------------------------------
+
+    def health(self, request):
+        return 200, {"ok": True, "now": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "mock": True}, None
+
+    def r2_status(self, request):
+        return 200, {"configured": True, "endpoint": "mock", "bucket": "mock", "public_base_url": self.base_url}, None
+
+    def object_key(self, request):
+        key = (request.query.get("key") or request.headers.get("x-object-key") or "").lstrip("/")
+        if not key:
+            raise ValueError("key is required")
+        return key
+
+    def store(self, key, data, content_type):
+        old = self.objects.get(key)
+        if old is not None and old["body"] is not None:
+            self.stored_bytes -= len(old["body"])
+        keep = self.stored_bytes + len(data) <= self.config.store_max_bytes
+        self.objects[key] = {
+            "body": data if keep else None,
+            "size": len(data),
+            "etag": hashlib.md5(data).hexdigest(),
+            "content_type": content_type,
+            "last_modified": formatdate(usegmt=True),
+        }
+        if keep:
+            self.stored_bytes += len(data)
+        self.stats["uploaded_bytes"] += len(data)
+        return {"message": "object uploaded", "bytes": len(data), "key": key, "bucket": "mock", "url": self.object_url(key)}
+
+    def object_url(self, key):
+        return f"{self.base_url}/r2/{urllib.parse.quote(key)}"
+
+    def upload_raw(self, request):
+        key = self.object_key(request)
+        if "content-length" not in request.headers and not request.body:
+            return 411, {"error": {"message": "content-length is required"}}, None
+        if len(request.body) > MAX_RAW_UPLOAD_BYTES:
+            return 413, {"error": {"message": "body too large"}}, None
+        content_type = request.query.get("content_type") or request.headers.get("content-type") or "application/octet-stream"
+        return 201, self.store(key, request.body, content_type), None
+
+    def upload_base64(self, request):
+        if len(request.body) > MAX_JSON_BODY_BYTES:
+            return 413, {"error": {"message": "body too large"}}, None
+        payload = json.loads(request.body or b"{}")
+        key = str(payload.get("key") or "").lstrip("/")
+        if not key:
+            raise ValueError("key is required")
+        if not payload.get("content_base64"):
+            raise ValueError("content_base64 is required")
+        data = base64.b64decode(payload["content_base64"])
+        return 201, self.store(key, data, str(payload.get("content_type") or "application/octet-stream")), None
+
+    def r2_copy(self, request):
+        payload = json.loads(request.body or b"{}")
+        source_key = str(payload.get("source_key") or "").lstrip("/")
+        key = str(payload.get("key") or "").lstrip("/")
+        if not source_key or not key:
+            raise ValueError("key is required")
+        source = self.objects.get(source_key)
+        if source is None:
+            return 404, {"error": {"message": "source object not found"}}, None
+        old = self.objects.get(key)
+        if old is not None and old["body"] is not None:
+            self.stored_bytes -= len(old["body"])
+        if source["body"] is not None:
+            self.stored_bytes += len(source["body"])
+        self.objects[key] = dict(source, last_modified=formatdate(usegmt=True))
+        self.stats["copied_bytes"] += source["size"]
+        return 201, {
+            "message": "object copied",
+            "key": key,
+            "source_key": source_key,
+            "bucket": "mock",
+            "etag": f'"{source["etag"]}"',
+            "url": self.object_url(key),
+        }, None
+
+    def r2_head(self, request):
+        key = self.object_key(request)
+        obj = self.objects.get(key)
+        if obj is None:
+            return 404, {"error": {"message": "object not found"}}, None
+        info = {
+            "content_type": obj["content_type"],
+            "content_length": obj["size"],
+            "etag": f'"{obj["etag"]}"',
+            "last_modified": obj["last_modified"],
+        }
+        return 200, {"key": key, "info": info}, None
+
+    def r2_list(self, request):
+        prefix = request.query.get("prefix", "")
+        start_after = request.query.get("start_after", "")
+        limit = max(1, min(int(request.query.get("limit") or 100), 1000))
+        keys = sorted(k for k in self.objects if k.startswith(prefix) and k > start_after)[:limit]
+        objects = [
+            {
+                "key": k,
+                "size": self.objects[k]["size"],
+                "last_modified": self.objects[k]["last_modified"],
+                "etag": f'"{self.objects[k]["etag"]}"',
+            }
+            for k in keys
+        ]
+        return 200, {"objects": objects}, None
+
+    def r2_public_url(self, request):
+        key = self.object_key(request)
+        return 200, {"key": key, "url": self.object_url(key)}, None
+
+    def r2_signed_url(self, request):
+        key = self.object_key(request)
+        expires = int(request.query.get("expires") or 900)
+        return 200, {"key": key, "url": f"{self.object_url(key)}?expires={expires}", "expires_in": expires}, None
+
+    def r2_object(self, request):
+        key = urllib.parse.unquote(request.path[len("/r2/") :])
+        obj = self.objects.get(key)
+        if obj is None or obj["body"] is None:
+            return 404, {"error": {"message": "object not found"}}, None
+        return 200, obj["body"], {"Content-Type": obj["content_type"], "ETag": f'"{obj["etag"]}"'}
+
+    # -- providers ------------------------------------------------------------------------
+
+    def search_hits(self, provider, query, per_page):
+        # deterministic per query: the same search always returns the same assets
+        words = [w for w in query.lower().split() if w]
+        seed = zlib.crc32(f"{provider}:{query.lower()}".encode("utf-8"))
+        count = max(0, min(per_page, self.config.results_per_page))
+        for i in range(count):
+            asset_id = f"{seed:08x}{i:02d}"
+            tags = words[: max(1, len(words) - (i % 3))]
+            yield asset_id, tags
+
+    def image_url(self, provider, asset_id):
+        return f"{self.base_url}/images/{provider}/{asset_id}.jpg"
+
+    def provider_headers(self):
+        return {"X-Ratelimit-Limit": "100000", "X-Ratelimit-Remaining": "99999", "X-Ratelimit-Reset": "3600"}
+
+    def pixabay_search(self, request):
+        if not request.query.get("key"):
+            return 400, {"error": "[ERROR 400] key is required"}, None
+        query = request.query.get("q", "")
+        per_page = int(request.query.get("per_page") or 20)
+        hits = [
+            {
+                "id": asset_id,
+                "pageURL": f"{self.base_url}/pixabay/photo/{asset_id}",
+                "type": "photo",
+                "tags": ", ".join(tags),
+                "webformatURL": self.image_url("pixabay", asset_id),
+                "largeImageURL": self.image_url("pixabay", asset_id),
+                "imageWidth": self.image_width,
+                "imageHeight": self.image_height,
+                "user": "mock_user",
+            }
+            for asset_id, tags in self.search_hits("pixabay", query, per_page)
+        ]
+        return 200, {"total": len(hits), "totalHits": len(hits), "hits": hits}, self.provider_headers()
+
+    def pexels_search(self, request):
+        if not request.headers.get("authorization"):
+            return 401, {"error": "Unauthorized"}, None
+        query = request.query.get("query", "")
+        per_page = int(request.query.get("per_page") or 15)
+        photos = [
+            {
+                "id": asset_id,
+                "width": self.image_width,
+                "height": self.image_height,
+                "url": f"{self.base_url}/pexels/photo/{asset_id}",
+                "photographer": "Mock Photographer",
+                "alt": " ".join(tags),
+                "src": {
+                    "original": self.image_url("pexels", asset_id),
+                    "large2x": self.image_url("pexels", asset_id),
+                    "large": self.image_url("pexels", asset_id),
+                },
+            }
+            for asset_id, tags in self.search_hits("pexels", query, per_page)
+        ]
+        return 200, {"page": 1, "per_page": per_page, "total_results": len(photos), "photos": photos}, self.provider_headers()
+
+    def unsplash_search(self, request):
+        if not request.query.get("client_id") and not request.headers.get("authorization"):
+            return 401, {"errors": ["OAuth error: The access token is invalid"]}, None
+        query = request.query.get("query", "")
+        per_page = int(request.query.get("per_page") or 10)
+        results = [
+            {
+                "id": asset_id,
+                "width": self.image_width,
+                "height": self.image_height,
+                "alt_description": " ".join(tags),
+                "description": None,
+                "urls": {"regular": self.image_url("unsplash", asset_id), "full": self.image_url("unsplash", asset_id)},
+                "user": {"name": "Mock User"},
+                "links": {"html": f"{self.base_url}/unsplash/photos/{asset_id}"},
+                "tags": [{"title": t} for t in tags],
+                "location": {},
+            }
+            for asset_id, tags in self.search_hits("unsplash", query, per_page)
+        ]
+        return 200, {"total": len(results), "total_pages": 1, "results": results}, self.provider_headers()
+
+    def image_file(self, request):
+        return 200, self.image, {"Content-Type": "image/jpeg", "ETag": f'"{self.image_etag}"'}
+
+    # -- control --------------------------------------------------------------------------
+
+    def stats_route(self, request):
+        return 200, self.snapshot(), None
+
+    def reset_route(self, request):
+        self.stats.clear()
+        self.objects.clear()
+        self.stored_bytes = 0
+        return 200, {"ok": True}, None
+
+    def snapshot(self):
+        return {"counters": dict(self.stats), "objects": len(self.objects), "stored_bytes": self.stored_bytes}
+
+
+async def start_server(services, host=MOCK_HOST, port=MOCK_PORT):
+    server = await asyncio.start_server(services.handle_connection, host, port, limit=1 << 20)
+    bound = server.sockets[0].getsockname()
+    services.base_url = f"http://{bound[0]}:{bound[1]}"
+    return server
+
+
+class MockServerThread:
+    # runs the mock on its own event loop so synchronous scripts (bench, smoke tests) can use it
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.services = MockServices(config)
+        self.loop = asyncio.new_event_loop()
+        self.ready = threading.Event()
+        self.server = None
+        self.thread = threading.Thread(target=self._run, args=(host, port), name="mock-services", daemon=True)
+
+    def _run(self, host, port):
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(start_server(self.services, host, port))
+        self.ready.set()
+        self.loop.run_forever()
+        self.server.close()
+        # keep-alive connections still sit in readuntil(); cancel them before the loop goes away
+        pending = asyncio.all_tasks(self.loop)
+        for task in pending:
+            task.cancel()
+        self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        self.loop.run_until_complete(self.server.wait_closed())
+        self.loop.close()
+
+    def start(self):
+        self.thread.start()
+        self.ready.wait()
+        return self
+
+    @property
+    def base_url(self):
+        return self.services.base_url
+
+    def env(self):
+        return mock_env(self.base_url)
+
+    def stats(self):
+        return asyncio.run_coroutine_threadsafe(self._snapshot(), self.loop).result()
+
+    async def _snapshot(self):
+        return self.services.snapshot()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+
+def mock_env(base_url):
+    return {
+        "BACKEND_URL": base_url,
+        "START_SERVER": "0",
+        "PIXABAY_API_URL": f"{base_url}/pixabay/api/",
+        "PEXELS_API_URL": f"{base_url}/pexels/v1/search",
+        "UNSPLASH_API_URL": f"{base_url}/unsplash/search/photos",
+        "PIXABAY_API_KEY": "mock",
+        "PEXELS_API_KEY": "mock",
+        "UNSPLASH_ACCESS_KEY": "mock",
+    }
+
+
+async def serve_forever():
+    services = MockServices()
+    server = await start_server(services)
+    print(f"mock services listening on {services.base_url}")
+    print("point the batch scripts at it with:")
+    for key, value in mock_env(services.base_url).items():
+        print(f"  {key}={value}")
+    cfg = services.config
+    print(
+        f"faults: latency={cfg.latency_ms}ms jitter={cfg.jitter_ms}ms error_rate={cfg.error_rate} "
+        f"rate_429={cfg.rate_429} routes={','.join(sorted(cfg.fault_routes))}"
+    )
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    try:
+        asyncio.run(serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
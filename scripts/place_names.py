@@ -0,0 +1,111 @@
+import re
+
+
+# generic "{city} {suffix}" names produced by the phase 1 seed generator.
+# keys double as the synthetic suffix set; values are search hints for the image ingest.
+NAME_SUFFIX_HINTS = {
+    "old town quarter": ["old town", "historic center"],
+    "national museum": ["museum", "heritage"],
+    "art district": ["art", "gallery"],
+    "historic fortress": ["fortress", "castle"],
+    "royal palace": ["palace", "historic"],
+    "temple complex": ["temple", "shrine"],
+    "riverside walk": ["river", "waterfront"],
+    "seaside promenade": ["seaside", "coast"],
+    "city beach": ["beach", "coast"],
+    "island bay": ["bay", "island"],
+    "mountain trail": ["mountain", "hiking"],
+    "national park": ["national park", "nature"],
+    "botanic garden": ["garden", "nature"],
+    "food street": ["food market", "street food"],
+    "street food alley": ["street food", "market"],
+    "shopping avenue": ["shopping street", "market"],
+    "designer mall": ["shopping mall", "shopping"],
+    "skyline observatory": ["skyline", "city view"],
+    "modern marina": ["marina", "waterfront"],
+    "adventure park": ["adventure", "outdoor"],
+    "diving point": ["diving", "sea"],
+    "surf beach": ["surf", "beach"],
+    "cultural village": ["cultural village", "heritage"],
+    "heritage site": ["heritage", "historical"],
+    "landmark plaza": ["landmark", "architecture"],
+    "old port": ["port", "harbor"],
+    "wine region": ["vineyard", "countryside"],
+    "spa resort": ["resort", "spa"],
+    "desert camp": ["desert", "camp"],
+    "snow peak": ["snow mountain", "peak"],
+}
+
+SYNTHETIC_SUFFIXES = frozenset(NAME_SUFFIX_HINTS)
+
+# "{city} {generic noun}" with at most this many words is treated as generated
+CITY_PREFIX_MAX_WORDS = 4
+GENERIC_TERMS = frozenset({"park", "beach", "mall", "walk", "museum", "palace", "port", "bay"})
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+_END = "$suffix"
+
+
+def build_suffix_trie(suffixes):
+    # keyed by characters from the end of the name, so a lookup walks at most the longest suffix and
+    # matches exactly what str.endswith() did (including a suffix that starts mid-word: "bold port")
+    trie = {}
+    for rank, suffix in enumerate(suffixes):
+        node = trie
+        for ch in reversed(suffix):
+            node = node.setdefault(ch, {})
+        node[_END] = (rank, suffix)
+    return trie
+
+
+SUFFIX_TRIE = build_suffix_trie(NAME_SUFFIX_HINTS)
+
+
+def match_suffixes(name):
+    matches = []
+    node = SUFFIX_TRIE
+    for ch in reversed(name):
+        node = node.get(ch)
+        if node is None:
+            break
+        if _END in node:
+            matches.append(node[_END])
+    return [suffix for _rank, suffix in sorted(matches)]
+
+
+def classify_name(name, city=""):
+    # one pass per name: synthetic verdict, matched suffix and search hints
+    n = (name or "").strip().lower()
+    c = (city or "").strip().lower()
+    info = {
+        "synthetic": False,
+        "reason": "",
+        "suffix": "",
+        "hints": [],
+        "city_prefix_short": False,
+        "generic_term": False,
+    }
+    if not n:
+        info["synthetic"] = True
+        info["reason"] = "empty_name"
+        return info
+
+    matches = match_suffixes(n)
+    if matches:
+        hints = []
+        for suffix in matches:
+            for hint in NAME_SUFFIX_HINTS[suffix]:
+                if hint not in hints:
+                    hints.append(hint)
+        info["synthetic"] = True
+        info["suffix"] = max(matches, key=len)
+        info["reason"] = f"synthetic_suffix:{info['suffix']}"
+        info["hints"] = hints
+        return info
+
+    if c and n.startswith(c + " "):
+        words = WORD_RE.findall(n)
+        if len(words) <= CITY_PREFIX_MAX_WORDS:
+            info["city_prefix_short"] = True
+            info["generic_term"] = any(w in GENERIC_TERMS for w in words)
+    return info
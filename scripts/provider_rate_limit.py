@@ -0,0 +1,116 @@
+import email.utils
+import threading
+import time
+
+
+def parse_retry_after(value, now=None):
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if at is None:
+        return None
+    now = time.time() if now is None else now
+    return max(0.0, at.timestamp() - now)
+
+
+def parse_reset(value, now=None):
+    # pexels sends an epoch timestamp, pixabay sends seconds until the window resets
+    if not value:
+        return None
+    try:
+        reset = float(str(value).strip())
+    except ValueError:
+        return None
+    now = time.time() if now is None else now
+    if reset > 1_000_000_000:
+        return max(0.0, reset - now)
+    return max(0.0, reset)
+
+
+class ProviderBudget:
+    def __init__(self, name, per_sec, per_hour, backoff_base_sec=2.0, backoff_max_sec=300.0):
+        self.name = name
+        self.per_sec = max(0.01, float(per_sec))
+        self.per_hour = max(1.0, float(per_hour))
+        self.backoff_base_sec = backoff_base_sec
+        self.backoff_max_sec = backoff_max_sec
+        self.sec_capacity = max(1.0, self.per_sec)
+        self.sec_tokens = self.sec_capacity
+        self.hour_tokens = self.per_hour
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.strikes = 0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = max(0.0, now - self.updated)
+        self.updated = now
+        self.sec_tokens = min(self.sec_capacity, self.sec_tokens + elapsed * self.per_sec)
+        self.hour_tokens = min(self.per_hour, self.hour_tokens + elapsed * self.per_hour / 3600.0)
+
+    def reserve(self):
+        # takes a token and returns 0, or returns how long to wait before asking again
+        with self.lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self.blocked_until:
+                return self.blocked_until - now
+            if self.sec_tokens >= 1.0 and self.hour_tokens >= 1.0:
+                self.sec_tokens -= 1.0
+                self.hour_tokens -= 1.0
+                return 0.0
+            wait_sec = (1.0 - self.sec_tokens) / self.per_sec if self.sec_tokens < 1.0 else 0.0
+            wait_hour = (1.0 - self.hour_tokens) * 3600.0 / self.per_hour if self.hour_tokens < 1.0 else 0.0
+            return max(wait_sec, wait_hour, 0.001)
+
+    def acquire(self, stop=None):
+        # False once `stop` (a threading.Event) is set before a token came free: the caller drops the request
+        while True:
+            if stop is not None and stop.is_set():
+                return False
+            wait_for = self.reserve()
+            if wait_for <= 0:
+                return True
+            if stop is None:
+                time.sleep(wait_for)
+            elif stop.wait(wait_for):
+                return False
+
+    def block_for(self, seconds):
+        with self.lock:
+            until = time.monotonic() + max(0.0, seconds)
+            self.blocked_until = max(self.blocked_until, until)
+
+    def observe(self, headers):
+        self.strikes = 0
+        if headers is None:
+            return
+        remaining = headers.get("X-Ratelimit-Remaining")
+        if remaining is None:
+            return
+        try:
+            remaining = int(float(remaining))
+        except ValueError:
+            return
+        if remaining > 0:
+            return
+        reset = parse_reset(headers.get("X-Ratelimit-Reset"))
+        self.block_for(reset if reset is not None else 60.0)
+
+    def on_429(self, headers):
+        retry_after = parse_retry_after(headers.get("Retry-After")) if headers is not None else None
+        if retry_after is None and headers is not None:
+            retry_after = parse_reset(headers.get("X-Ratelimit-Reset"))
+        if retry_after is None:
+            retry_after = min(self.backoff_max_sec, self.backoff_base_sec * (2 ** self.strikes))
+        self.strikes += 1
+        self.block_for(retry_after)
+        return retry_after
@@ -0,0 +1,314 @@
+import heapq
+import json
+import os
+import re
+import sys
+from pathlib import Path
+
+import catalog_binary
+from catalog_stream import iter_country_places
+from content_ledger import input_fingerprint
+from place_names import NAME_SUFFIX_HINTS, classify_name
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+ROOT = Path(__file__).resolve().parents[1]
+DATA_FILE = ROOT / "data" / "countries.v1.json"
+PLAN_FILE = ROOT / "data" / "runtime" / "query_plan.v1.jsonl"
+PLAN_VERSION = 1
+PLAN_BATCH_SIZE = int(os.getenv("QUERY_PLAN_BATCH_SIZE", "4096") or "4096")
+TOP_TAGS = 2
+
+STOPWORDS = {
+    "the",
+    "and",
+    "for",
+    "with",
+    "from",
+    "into",
+    "near",
+    "city",
+    "town",
+    "district",
+    "travel",
+    "destination",
+    "tourism",
+}
+
+TAG_HINTS = {
+    0: ["forest", "nature", "mountain"],
+    1: ["beach", "coast", "sea", "river"],
+    2: ["city", "downtown", "skyline"],
+    3: ["relax", "resort", "scenic"],
+    4: ["historical", "heritage", "temple", "museum"],
+    5: ["food", "market", "street food"],
+    6: ["night", "neon", "nightlife"],
+    7: ["hiking", "adventure", "outdoor"],
+    8: ["shopping", "mall", "market"],
+    9: ["luxury", "hotel"],
+    10: ["exotic", "tropical"],
+    11: ["landmark", "architecture", "monument"],
+}
+
+
+def tokenize(text):
+    tokens = re.findall(r"[a-z0-9]+", (text or "").lower())
+    out = []
+    for t in tokens:
+        if len(t) <= 2:
+            continue
+        if t in STOPWORDS:
+            continue
+        out.append(t)
+    return out
+
+
+def unique_keep_order(items):
+    out = []
+    seen = set()
+    for x in items:
+        if x in seen:
+            continue
+        seen.add(x)
+        out.append(x)
+    return out
+
+
+def is_synthetic_info(info):
+    # very short "City + generic noun" shape is often synthetic in current seed
+    return info["synthetic"] or (info["city_prefix_short"] and info["generic_term"])
+
+
+def is_synthetic_name(place):
+    return is_synthetic_info(classify_name(place.get("name_en"), place.get("city")))
+
+
+def top_tag_indices(vectors, dim, limit=TOP_TAGS):
+    # vectors: flat n*dim sequence (list, array or float32 memoryview). ties keep the lower
+    # index first, same as the per-place stable sort, so both paths produce identical plans.
+    if not dim or not len(vectors):
+        return []
+    if np is not None:
+        matrix = np.asarray(vectors, dtype=np.float64).reshape(-1, dim)
+        return np.argsort(-matrix, axis=1, kind="stable")[:, :limit].tolist()
+    out = []
+    for start in range(0, len(vectors), dim):
+        row = vectors[start : start + dim]
+        out.append(heapq.nlargest(limit, range(dim), key=row.__getitem__))
+    return out
+
+
+def top_tag_keywords(place, limit=TOP_TAGS, top_indices=None):
+    if top_indices is None:
+        vec = place.get("tags_vector") or []
+        if not vec:
+            return []
+        top_indices = heapq.nlargest(limit, range(len(vec)), key=vec.__getitem__)
+    kws = []
+    for idx in top_indices[:limit]:
+        kws.extend(TAG_HINTS.get(idx, []))
+    return unique_keep_order(kws)
+
+
+def name_suffix_keywords(place_name):
+    return list(classify_name(place_name)["hints"])
+
+
+def build_query_profiles(place, country_name, top_indices=None):
+    city = (place.get("city") or "").strip()
+    place_name = (place.get("name_en") or "").strip()
+    base = " ".join(x for x in [city, country_name] if x).strip()
+    if not base:
+        base = country_name.strip()
+
+    name_info = classify_name(place_name, city)
+    required_tokens = unique_keep_order(tokenize(f"{city} {country_name}"))
+    keyword_tokens = unique_keep_order(top_tag_keywords(place, top_indices=top_indices) + name_info["hints"])
+
+    candidates = []
+    for kw in keyword_tokens[:2]:
+        candidates.append({"query": f"{base} {kw}", "strategy": f"city_country_semantic_{kw}"})
+    candidates.extend(
+        [
+            {"query": f"{base} travel", "strategy": "city_country_travel"},
+            {"query": f"{base} landmarks", "strategy": "city_country_landmarks"},
+            {"query": f"{base} tourism", "strategy": "city_country_tourism"},
+        ]
+    )
+    for kw in keyword_tokens[2:5]:
+        candidates.append({"query": f"{base} {kw}", "strategy": f"city_country_tag_{kw}"})
+
+    if place_name and not is_synthetic_info(name_info):
+        candidates.insert(0, {"query": f"{place_name} {country_name}".strip(), "strategy": "trusted_place_name"})
+
+    out = []
+    seen = set()
+    for row in candidates:
+        q = " ".join(row["query"].split())
+        if not q:
+            continue
+        qk = q.lower()
+        if qk in seen:
+            continue
+        seen.add(qk)
+        out.append(
+            {
+                "query": q,
+                "strategy": row["strategy"],
+                "required_tokens": required_tokens,
+                "optional_tokens": keyword_tokens,
+            }
+        )
+    return out
+
+
+def country_display_name(country):
+    return country.get("country_name_en") or country.get("country_code")
+
+
+def plan_header(src=DATA_FILE):
+    st = os.stat(src)
+    return {
+        "plan_version": PLAN_VERSION,
+        "source_size": st.st_size,
+        "source_mtime_ns": st.st_mtime_ns,
+        # the plan is stale once any of the query-building tables change
+        "rules_hash": input_fingerprint(sorted(STOPWORDS), TAG_HINTS, NAME_SUFFIX_HINTS, TOP_TAGS),
+    }
+
+
+def iter_catalog_batches(src, batch_size):
+    # (rows, flat vectors, dim); straight from the float32 matrix when the binary catalog is fresh
+    catalog = catalog_binary.open_fresh(src) if catalog_binary.USE_BINARY else None
+    if catalog is not None:
+        try:
+            countries = {}
+            dim = catalog.dim
+            for start in range(0, catalog.n_places, batch_size):
+                end = min(start + batch_size, catalog.n_places)
+                rows = []
+                for pi in range(start, end):
+                    ci = catalog.place_country_index(pi)
+                    if ci not in countries:
+                        countries = {ci: catalog.country(ci)}
+                    rows.append((countries[ci], catalog.place(pi)))
+                vectors = catalog.place_vectors[start * dim : end * dim]
+                try:
+                    yield rows, vectors, dim
+                finally:
+                    vectors.release()
+        finally:
+            catalog.close()
+        return
+
+    batch = []
+    for row in iter_country_places(src):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            yield from split_by_dim(batch)
+            batch = []
+    if batch:
+        yield from split_by_dim(batch)
+
+
+def split_by_dim(batch):
+    # the JSON path has no fixed width guarantee; group consecutive rows sharing a vector length
+    group = []
+    dim = None
+    for country, place in batch:
+        n = len(place.get("tags_vector") or [])
+        if group and n != dim:
+            yield group, [v for _c, p in group for v in (p.get("tags_vector") or [])], dim
+            group = []
+        group.append((country, place))
+        dim = n
+    if group:
+        yield group, [v for _c, p in group for v in (p.get("tags_vector") or [])], dim
+
+
+def plan_entry(place, profiles):
+    first = profiles[0] if profiles else {}
+    return {
+        "place_id": place.get("place_id"),
+        "required_tokens": first.get("required_tokens", []),
+        "optional_tokens": first.get("optional_tokens", []),
+        "profiles": [[p["query"], p["strategy"]] for p in profiles],
+    }
+
+
+def expand_entry(entry):
+    required = entry["required_tokens"]
+    optional = entry["optional_tokens"]
+    return [
+        {"query": query, "strategy": strategy, "required_tokens": required, "optional_tokens": optional}
+        for query, strategy in entry["profiles"]
+    ]
+
+
+def build_plan(src=DATA_FILE, out=PLAN_FILE, batch_size=PLAN_BATCH_SIZE):
+    out.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out.with_suffix(out.suffix + ".tmp")
+    places = 0
+    with tmp.open("w", encoding="utf-8") as f:
+        f.write(json.dumps(plan_header(src), ensure_ascii=False) + "\n")
+        for rows, vectors, dim in iter_catalog_batches(src, max(1, batch_size)):
+            tops = top_tag_indices(vectors, dim) if dim else [[] for _ in rows]
+            for (country, place), top in zip(rows, tops):
+                profiles = build_query_profiles(place, country_display_name(country), top_indices=top)
+                f.write(json.dumps(plan_entry(place, profiles), ensure_ascii=False, separators=(",", ":")) + "\n")
+                places += 1
+    os.replace(tmp, out)
+    return places
+
+
+def plan_is_fresh(src=DATA_FILE, path=PLAN_FILE):
+    if not path.exists():
+        return False
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+    except (OSError, ValueError):
+        return False
+    return header == plan_header(src)
+
+
+def ensure_plan(src=DATA_FILE, path=PLAN_FILE):
+    if plan_is_fresh(src, path):
+        return False
+    build_plan(src, path)
+    return True
+
+
+def iter_with_plan(rows, path=PLAN_FILE):
+    # the plan is written in catalog order, so it is read in lockstep with the catalog rather
+    # than loaded; a row whose place_id does not line up gets profiles=None (built on demand)
+    with path.open("r", encoding="utf-8") as f:
+        f.readline()
+        for country, place in rows:
+            line = f.readline()
+            entry = json.loads(line) if line.strip() else None
+            if entry is None or entry.get("place_id") != place.get("place_id"):
+                yield country, place, None
+                continue
+            yield country, place, expand_entry(entry)
+
+
+def main():
+    if not DATA_FILE.exists():
+        print(f"data file not found: {DATA_FILE}")
+        return 1
+    if "--if-stale" in sys.argv[1:] and plan_is_fresh():
+        print(f"query plan is up to date: {PLAN_FILE}")
+        return 0
+    places = build_plan()
+    print(f"query plan written: {PLAN_FILE}")
+    print(f"summary: places={places} numpy={'yes' if np is not None else 'no'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import urllib.parse
+from concurrent.futures import Future
+
+
+SECRET_PARAMS = {"key", "client_id", "access_key", "api_key"}
+
+
+def search_cache_key(provider, url):
+    # credentials are dropped so rotating a key does not invalidate the cache
+    parts = urllib.parse.urlsplit(url)
+    params = sorted(
+        (k, v) for k, v in urllib.parse.parse_qsl(parts.query, keep_blank_values=True) if k not in SECRET_PARAMS
+    )
+    canonical = f"{provider}|{parts.netloc}{parts.path}?{urllib.parse.urlencode(params)}"
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class SearchCache:
+    def __init__(self, path, ttl_sec, max_bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+        self.evictions = 0
+        self.shared = 0
+        self.lock = threading.Lock()
+        # cache_key -> Future of the provider call one caller is making for everyone asking meanwhile
+        self.inflight = {}
+        self.conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_cache (
+                cache_key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                body TEXT NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS search_cache_accessed ON search_cache (accessed_at)")
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM search_cache").fetchone()[0]
+
+    def _read(self, cache_key):
+        # caller holds the lock; -> stored body or None (missing or expired)
+        now = time.time()
+        row = self.conn.execute(
+            "SELECT created_at, size, body FROM search_cache WHERE cache_key = ?", (cache_key,)
+        ).fetchone()
+        if row is None:
+            return None
+        created_at, size, body = row
+        if now - created_at > self.ttl_sec:
+            self.conn.execute("DELETE FROM search_cache WHERE cache_key = ?", (cache_key,))
+            self.total_bytes -= size
+            self.expired += 1
+            return None
+        self.conn.execute("UPDATE search_cache SET accessed_at = ? WHERE cache_key = ?", (now, cache_key))
+        return body
+
+    def get(self, cache_key):
+        with self.lock:
+            body = self._read(cache_key)
+            if body is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(body)
+
+    def lookup(self, cache_key):
+        # -> (data, flight, leader). a miss makes the caller the leader: it asks the provider and hands the
+        # answer to settle(). callers arriving before that get the same flight to wait on instead of
+        # spending quota on the identical query. in-flight is checked before the table and settle() stores
+        # before it lets go, so a key is always in one of the two
+        with self.lock:
+            flight = self.inflight.get(cache_key)
+            if flight is not None:
+                self.hits += 1
+                self.shared += 1
+                return None, flight, False
+            body = self._read(cache_key)
+            if body is not None:
+                self.hits += 1
+                return json.loads(body), None, False
+            self.misses += 1
+            flight = self.inflight[cache_key] = Future()
+            # running futures can't be cancelled by one impatient waiter (asyncio.wrap_future does that)
+            flight.set_running_or_notify_cancel()
+        return None, flight, True
+
+    def settle(self, cache_key, flight, provider=None, data=None, error=None):
+        # leader only. data=None without an error (the leader was stopped or cancelled) wakes the waiters
+        # with None so they look the key up again and one of them asks the provider
+        if data is not None:
+            self.put(cache_key, provider, data)
+        with self.lock:
+            self.inflight.pop(cache_key, None)
+        if error is not None:
+            flight.set_exception(error)
+        else:
+            flight.set_result(data)
+
+    def put(self, cache_key, provider, data):
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        size = len(body.encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            old = self.conn.execute("SELECT size FROM search_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO search_cache (cache_key, provider, created_at, accessed_at, size, body) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key, provider, now, now, size, body),
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            self.stores += 1
+            if self.total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # least recently used rows go first, down to 90% of the budget
+        target = int(self.max_bytes * 0.9)
+        self.conn.execute("DELETE FROM search_cache WHERE created_at < ?", (time.time() - self.ttl_sec,))
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM search_cache").fetchone()[0]
+        rows = self.conn.execute("SELECT cache_key, size FROM search_cache ORDER BY accessed_at ASC")
+        doomed = []
+        for cache_key, size in rows:
+            if self.total_bytes <= target:
+                break
+            doomed.append((cache_key,))
+            self.total_bytes -= size
+        self.conn.executemany("DELETE FROM search_cache WHERE cache_key = ?", doomed)
+        self.evictions += len(doomed)
+
+    def stats(self):
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": self.total_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "shared": self.shared,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
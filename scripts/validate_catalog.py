@@ -0,0 +1,235 @@
+import json
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+from catalog_stream import CatalogStreamError, walk_catalog
+
+
+ROOT = Path(__file__).resolve().parents[1]
+TAXONOMY_FILE = ROOT / "data" / "tag_taxonomy.v1.json"
+DATA_FILE = ROOT / "data" / "countries.v1.json"
+OUT_FILE = ROOT / "data" / "runtime" / "catalog_validation.v1.json"
+# per-rule cap on violation details kept in the report; counts are always complete (0 = no cap)
+MAX_DETAILS_PER_RULE = int(os.getenv("VALIDATE_MAX_DETAILS", "1000") or "1000")
+EXPECTED_COUNTRIES = int(os.getenv("VALIDATE_EXPECTED_COUNTRIES", "100") or "100")
+
+VECTOR_DIM = 12
+REGIONS = {"asia", "europe", "middle_east", "africa", "north_america", "south_america", "oceania"}
+PLACE_SOURCES = {"manual_review", "wikidata"}
+PLACE_REQUIRED_FIELDS = ("country_code", "name_en", "source")
+
+# docs/DATA_VALIDATION_RULES.v1.md, one id per check
+RULES = {
+    "dataset.country_count": f"exactly {EXPECTED_COUNTRIES} countries",
+    "identity.country_code_unique": "no duplicate country_code",
+    "identity.place_id_unique": "no duplicate place_id",
+    "identity.country_code_type": "country_code is a string",
+    "identity.place_id_type": "place_id is a string",
+    "coverage.place_object": "every place is an object",
+    "taxonomy.dimension": f"exactly {VECTOR_DIM} tags",
+    "taxonomy.index_sequence": f"tag indexes are 0..{VECTOR_DIM - 1} in order",
+    "taxonomy.id_unique": "no duplicate tag id",
+    "vector.length": f"every tags_vector has length {VECTOR_DIM}",
+    "vector.range": "every tags_vector value is a number in 0.00..1.00",
+    "bucket.seed_place_count": "seed_place_count == len(places)",
+    "bucket.place_count_bucket": "place_count_bucket matches seed_place_count",
+    "coverage.places_nonempty": "every country has at least one place",
+    "coverage.place_required_fields": "every place has country_code, name_en and source",
+    "coverage.place_country_match": "place country_code equals its country's country_code",
+    "coverage.place_source": "place source is manual_review or wikidata",
+    "region.enum": "region is one of the allowed values",
+}
+
+
+def expected_bucket(n):
+    if n >= 30:
+        return "30_plus"
+    if n >= 20:
+        return "20_29"
+    if n >= 10:
+        return "10_19"
+    if n >= 6:
+        return "6_9"
+    return "0_5"
+
+
+def vector_problem(vec):
+    # one C-level pass for the common case; only a failing vector is inspected value by value
+    if not isinstance(vec, list):
+        return "length", f"tags_vector is {type(vec).__name__}, not a list"
+    if len(vec) != VECTOR_DIM:
+        return "length", f"tags_vector length {len(vec)} != {VECTOR_DIM}"
+    # exact type set, so bools (an int subclass) and other number-likes fall through to the slow check
+    if set(map(type, vec)) <= {int, float}:
+        lo = min(vec)
+        hi = max(vec)
+        total = sum(vec)
+        if total == total and 0.0 <= lo and hi <= 1.0:
+            return None
+    bad = [i for i, v in enumerate(vec) if isinstance(v, bool) or not isinstance(v, (int, float)) or not 0.0 <= v <= 1.0]
+    if not bad:
+        return None
+    return "range", f"tags_vector values out of range at {bad[:VECTOR_DIM]}"
+
+
+class CatalogValidator:
+    def __init__(self, max_details=MAX_DETAILS_PER_RULE):
+        self.max_details = max_details
+        self.counts = Counter()
+        self.details = {}
+        self.country_codes = set()
+        self.place_ids = set()
+        self.countries = 0
+        self.places = 0
+
+    def violation(self, rule, message, **where):
+        self.counts[rule] += 1
+        rows = self.details.setdefault(rule, [])
+        if self.max_details <= 0 or len(rows) < self.max_details:
+            rows.append({"message": message, **where})
+
+    def check_taxonomy(self, taxonomy):
+        tags = taxonomy.get("tags") or []
+        if len(tags) != VECTOR_DIM:
+            self.violation("taxonomy.dimension", f"{len(tags)} tags, expected {VECTOR_DIM}")
+        indexes = [t.get("index") for t in tags]
+        if indexes != list(range(len(tags))):
+            self.violation("taxonomy.index_sequence", f"tag indexes {indexes}")
+        seen = set()
+        for t in tags:
+            tag_id = t.get("id")
+            if tag_id in seen:
+                self.violation("taxonomy.id_unique", f"duplicate tag id {tag_id!r}", tag_id=tag_id)
+            seen.add(tag_id)
+
+    def check_place(self, country, place):
+        self.places += 1
+        code = country.get("country_code")
+        if not isinstance(place, dict):
+            self.violation("coverage.place_object", f"place is {type(place).__name__}", country_code=code)
+            return
+        place_id = place.get("place_id")
+        where = {"country_code": code, "place_id": place_id}
+        # type first: an unhashable id (list, object) can't go through the uniqueness set
+        if not isinstance(place_id, str):
+            self.violation("identity.place_id_type", f"place_id is {type(place_id).__name__}", **where)
+        elif place_id in self.place_ids:
+            self.violation("identity.place_id_unique", f"duplicate place_id {place_id!r}", **where)
+        else:
+            self.place_ids.add(place_id)
+        missing = [f for f in PLACE_REQUIRED_FIELDS if not place.get(f)]
+        if missing:
+            self.violation("coverage.place_required_fields", f"missing {', '.join(missing)}", **where)
+        place_code = place.get("country_code")
+        if place_code and place_code != code:
+            self.violation("coverage.place_country_match", f"place country_code {place_code!r} != {code!r}", **where)
+        source = place.get("source")
+        if source and (not isinstance(source, str) or source not in PLACE_SOURCES):
+            self.violation("coverage.place_source", f"unknown source {source!r}", **where)
+        problem = vector_problem(place.get("tags_vector"))
+        if problem:
+            self.violation(f"vector.{problem[0]}", problem[1], **where)
+
+    def check_country(self, country, place_count):
+        # called once the country's places have been streamed
+        self.countries += 1
+        code = country.get("country_code")
+        where = {"country_code": code}
+        if not isinstance(code, str):
+            self.violation("identity.country_code_type", f"country_code is {type(code).__name__}", **where)
+        elif code in self.country_codes:
+            self.violation("identity.country_code_unique", f"duplicate country_code {code!r}", **where)
+        else:
+            self.country_codes.add(code)
+        region = country.get("region")
+        if not isinstance(region, str) or region not in REGIONS:
+            self.violation("region.enum", f"region {region!r} not allowed", **where)
+        problem = vector_problem(country.get("tags_vector"))
+        if problem:
+            self.violation(f"vector.{problem[0]}", f"country {problem[1]}", **where)
+        if place_count == 0:
+            self.violation("coverage.places_nonempty", "country has no places", **where)
+        seed = country.get("seed_place_count")
+        if seed != place_count:
+            self.violation("bucket.seed_place_count", f"seed_place_count {seed!r} != {place_count} places", **where)
+        bucket = expected_bucket(seed if isinstance(seed, int) else place_count)
+        if country.get("place_count_bucket") != bucket:
+            self.violation(
+                "bucket.place_count_bucket",
+                f"place_count_bucket {country.get('place_count_bucket')!r}, expected {bucket!r}",
+                **where,
+            )
+
+    def finish(self):
+        if self.countries != EXPECTED_COUNTRIES:
+            self.violation("dataset.country_count", f"{self.countries} countries, expected {EXPECTED_COUNTRIES}")
+
+    def report(self, elapsed_sec):
+        total = sum(self.counts.values())
+        return {
+            "ok": total == 0,
+            "summary": {
+                "countries": self.countries,
+                "places": self.places,
+                "violations": total,
+                "elapsed_sec": round(elapsed_sec, 3),
+            },
+            "rules": {
+                rule: {"description": desc, "violations": self.counts.get(rule, 0)} for rule, desc in RULES.items()
+            },
+            "violations": {
+                rule: {"count": self.counts[rule], "truncated": self.counts[rule] > len(rows), "details": rows}
+                for rule, rows in self.details.items()
+            },
+        }
+
+
+def validate(taxonomy_file=TAXONOMY_FILE, data_file=DATA_FILE):
+    validator = CatalogValidator()
+    validator.check_taxonomy(json.loads(taxonomy_file.read_text(encoding="utf-8")))
+    # single streaming pass: places are checked as they are read, each country once it closes
+    place_count = 0
+    for country, place in walk_catalog(data_file):
+        if place is None:
+            validator.check_country(country, place_count)
+            place_count = 0
+            continue
+        place_count += 1
+        validator.check_place(country, place)
+    validator.finish()
+    return validator
+
+
+def main():
+    for path in (TAXONOMY_FILE, DATA_FILE):
+        if not path.exists():
+            print(f"missing data file: {path}")
+            return 2
+
+    started = time.perf_counter()
+    try:
+        validator = validate(TAXONOMY_FILE, DATA_FILE)
+    except (CatalogStreamError, ValueError) as ex:
+        print(f"catalog could not be parsed: {ex}")
+        return 2
+    report = validator.report(time.perf_counter() - started)
+
+    OUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    OUT_FILE.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    summary = report["summary"]
+    print(f"validation written: {OUT_FILE}")
+    print(
+        f"summary: countries={summary['countries']} places={summary['places']} "
+        f"violations={summary['violations']} elapsed={summary['elapsed_sec']}s"
+    )
+    for rule, count in sorted(validator.counts.items()):
+        print(f"  {rule}: {count}")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,37 @@
+from asset_index import AssetIndex
+
+
+def entry(sha256, dhash):
+    return {"content_type": "image/jpeg", "sha256": sha256, "md5": "m", "bytes": 10, "dhash": dhash}
+
+
+def test_overwritten_key_drops_the_previous_asset(tmp_path):
+    index = AssetIndex(tmp_path / "index.sqlite")
+    try:
+        index.record("pexels", "old", "v", "places/a.jpg", entry("aaa", 0x0F0F))
+        # bands loaded before the overwrite must forget the old asset too
+        assert index.find_near("v", 0x0F0F, 0)[0]["asset_id"] == "old"
+
+        index.record("pexels", "new", "v", "places/a.jpg", entry("bbb", 0xF0F0_0000_0000_0000))
+
+        assert index.get("pexels", "old", "v") is None
+        assert index.find_content("v", "aaa") is None
+        assert index.find_near("v", 0x0F0F, 0) == (None, None)
+        assert index.get("pexels", "new", "v")["key"] == "places/a.jpg"
+        assert index.find_content("v", "bbb")["asset_id"] == "new"
+    finally:
+        index.close()
+
+
+def test_asset_moved_to_another_key_keeps_one_row(tmp_path):
+    index = AssetIndex(tmp_path / "index.sqlite")
+    try:
+        index.find_near("v", 0, 0)
+        index.record("pexels", "x", "v", "places/a.jpg", entry("aaa", 0x1234))
+        index.record("pexels", "x", "v", "places/b.jpg", entry("aaa", 0x1234))
+
+        assert index.get("pexels", "x", "v")["key"] == "places/b.jpg"
+        assert index.find_near("v", 0x1234, 0)[0]["key"] == "places/b.jpg"
+        assert sum(len(items) for items in index.bands.values()) == 4
+    finally:
+        index.close()
@@ -0,0 +1,75 @@
+import json
+import os
+
+from manifest_store import ManifestStore
+
+
+def write_rows(path, rows, mode="w"):
+    with path.open(mode, encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+def stored_keys(store):
+    return [json.loads(raw)["key"] for (raw,) in store.conn.execute("SELECT row FROM manifest_rows ORDER BY seq")]
+
+
+def bump_mtime(path):
+    st = path.stat()
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_appended_rows_are_imported_once(tmp_path):
+    jsonl = tmp_path / "manifest.jsonl"
+    store = ManifestStore(tmp_path / "manifest.sqlite")
+    try:
+        write_rows(jsonl, [{"key": "a", "status": "uploaded"}])
+        assert store.import_jsonl(jsonl) == 1
+        store.export_jsonl(jsonl)
+        write_rows(jsonl, [{"key": "b", "status": "uploaded"}], mode="a")
+        assert store.import_jsonl(jsonl) == 1
+        assert store.import_jsonl(jsonl) == 0
+        assert stored_keys(store) == ["a", "b"]
+    finally:
+        store.close()
+
+
+def test_rewritten_file_replaces_imported_rows(tmp_path):
+    jsonl = tmp_path / "manifest.jsonl"
+    store = ManifestStore(tmp_path / "manifest.sqlite")
+    try:
+        write_rows(jsonl, [{"key": k, "status": "uploaded"} for k in ("a", "b", "a")])
+        store.import_jsonl(jsonl)
+        store.export_jsonl(jsonl)
+
+        # shrunk (compacted elsewhere)
+        write_rows(jsonl, [{"key": "b", "status": "uploaded"}, {"key": "a", "status": "uploaded"}])
+        assert store.import_jsonl(jsonl) == 2
+        assert stored_keys(store) == ["b", "a"]
+
+        # same size, different content
+        write_rows(jsonl, [{"key": "c", "status": "uploaded"}, {"key": "a", "status": "failed"}])
+        bump_mtime(jsonl)
+        assert store.import_jsonl(jsonl) == 2
+        assert stored_keys(store) == ["c", "a"]
+        assert "b" not in store and "a" not in store
+
+        # grown, but not by appending
+        write_rows(jsonl, [{"key": "d", "status": "uploaded"}] * 3)
+        assert store.import_jsonl(jsonl) == 3
+        assert stored_keys(store) == ["d", "d", "d"]
+    finally:
+        store.close()
+
+
+def test_touched_file_is_not_imported_again(tmp_path):
+    jsonl = tmp_path / "manifest.jsonl"
+    store = ManifestStore(tmp_path / "manifest.sqlite")
+    try:
+        write_rows(jsonl, [{"key": "a", "status": "uploaded"}])
+        store.import_jsonl(jsonl)
+        bump_mtime(jsonl)
+        assert store.import_jsonl(jsonl) == 0
+        assert stored_keys(store) == ["a"]
+    finally:
+        store.close()
@@ -0,0 +1,22 @@
+import threading
+import time
+
+from provider_rate_limit import ProviderBudget
+
+
+def test_acquire_gives_up_when_stopped_while_waiting():
+    budget = ProviderBudget("test", per_sec=0.5, per_hour=1000)
+    assert budget.acquire() is True
+    stop = threading.Event()
+    threading.Timer(0.1, stop.set).start()
+    started = time.monotonic()
+    assert budget.acquire(stop) is False
+    assert time.monotonic() - started < 1.0
+
+
+def test_acquire_skips_the_token_once_stopped():
+    budget = ProviderBudget("test", per_sec=10, per_hour=1000)
+    stop = threading.Event()
+    stop.set()
+    assert budget.acquire(stop) is False
+    assert budget.sec_tokens == budget.sec_capacity
@@ -0,0 +1,47 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from search_cache import SearchCache
+
+
+def test_concurrent_lookups_share_one_provider_call(tmp_path):
+    cache = SearchCache(tmp_path / "cache.sqlite", ttl_sec=3600, max_bytes=1 << 20)
+    calls = []
+    release = threading.Event()
+
+    def search():
+        data, flight, leader = cache.lookup("k")
+        if not leader:
+            return data if flight is None else flight.result()
+        calls.append(1)
+        release.wait(5)
+        cache.settle("k", flight, "pexels", {"hits": [1]})
+        return {"hits": [1]}
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        futures = [pool.submit(search) for _ in range(8)]
+        release.set()
+        results = [f.result() for f in futures]
+    try:
+        assert len(calls) == 1
+        assert results == [{"hits": [1]}] * 8
+        assert cache.lookup("k")[0] == {"hits": [1]}
+    finally:
+        cache.close()
+
+
+def test_stopped_leader_hands_the_key_to_a_waiter(tmp_path):
+    cache = SearchCache(tmp_path / "cache.sqlite", ttl_sec=3600, max_bytes=1 << 20)
+    try:
+        _, flight, leader = cache.lookup("k")
+        _, waiting, follower_leader = cache.lookup("k")
+        assert leader and not follower_leader and waiting is flight
+        cache.settle("k", flight)
+        assert waiting.result() is None
+        _, retry, leader = cache.lookup("k")
+        assert leader and retry is not flight
+        cache.settle("k", retry, error=RuntimeError("HTTP 500"))
+        assert isinstance(retry.exception(), RuntimeError)
+        assert cache.stats()["entries"] == 0
+    finally:
+        cache.close()
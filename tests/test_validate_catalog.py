@@ -0,0 +1,71 @@
+import json
+
+import validate_catalog
+from validate_catalog import TAXONOMY_FILE, validate
+
+
+def country(code, places, **fields):
+    row = {
+        "country_code": code,
+        "region": "asia",
+        "tags_vector": [0.5] * 12,
+        "seed_place_count": len(places),
+        "place_count_bucket": validate_catalog.expected_bucket(len(places)),
+        "places": places,
+    }
+    row.update(fields)
+    return row
+
+
+def place(place_id, code="JP", **fields):
+    row = {"place_id": place_id, "country_code": code, "name_en": "Somewhere", "source": "wikidata"}
+    row["tags_vector"] = [0.5] * 12
+    row.update(fields)
+    return row
+
+
+def run(tmp_path, countries):
+    data_file = tmp_path / "countries.json"
+    data_file.write_text(json.dumps({"countries": countries}), encoding="utf-8")
+    return validate(TAXONOMY_FILE, data_file)
+
+
+def test_unhashable_ids_are_violations(tmp_path):
+    validator = run(
+        tmp_path,
+        [
+            country("JP", [place(["jp-1"]), place({"id": 2}), place("jp-3"), place("jp-3")]),
+            country(["KR"], [place("kr-1", ["KR"])]),
+        ],
+    )
+    assert validator.counts["identity.place_id_type"] == 2
+    assert validator.counts["identity.place_id_unique"] == 1
+    assert validator.counts["identity.country_code_type"] == 1
+    assert validator.places == 5
+
+
+def test_non_object_places_and_unhashable_enums_are_violations(tmp_path):
+    validator = run(
+        tmp_path,
+        [
+            country("JP", ["jp-1", 7, place("jp-2", source=["wikidata"])], region=["asia"]),
+        ],
+    )
+    assert validator.counts["coverage.place_object"] == 2
+    assert validator.counts["coverage.place_source"] == 1
+    assert validator.counts["region.enum"] == 1
+
+
+def test_bool_vectors_are_out_of_range():
+    assert validate_catalog.vector_problem([True] * 12)[0] == "range"
+    assert validate_catalog.vector_problem([1] * 12) is None
+
+
+def test_main_reports_violations_instead_of_crashing(tmp_path, monkeypatch):
+    data_file = tmp_path / "countries.json"
+    data_file.write_text(json.dumps({"countries": [country(["JP"], [place(["x"])])]}), encoding="utf-8")
+    monkeypatch.setattr(validate_catalog, "DATA_FILE", data_file)
+    monkeypatch.setattr(validate_catalog, "OUT_FILE", tmp_path / "report.json")
+    assert validate_catalog.main() == 1
+    report = json.loads((tmp_path / "report.json").read_text(encoding="utf-8"))
+    assert report["rules"]["identity.place_id_type"]["violations"] == 1